@@ -0,0 +1,230 @@
+"""schema base (database/init.sql + migracoes 001-003)
+
+Banco novo: cria todas as tabelas. Banco anterior ao Alembic (init.sql ou
+create_all antigos, sem alembic_version): as tabelas ja existem e esta revisao
+so as adota; as seguintes completam o schema, e as antigas migracoes SQL
+001-003, com seus backfills, sao as revisoes 0006-0008. Nos dois casos basta
+`alembic upgrade head`, sem stamp. O database/init.sql atual ja grava a
+revisao head em alembic_version.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _id() -> sa.Column:
+    # gen_random_uuid() e nativo desde o PostgreSQL 13 (dispensa uuid-ossp)
+    return sa.Column("id", UUID(as_uuid=True), primary_key=True, server_default=sa.text("gen_random_uuid()"))
+
+
+def _colaborador_id() -> sa.Column:
+    return sa.Column("colaborador_id", UUID(as_uuid=True), sa.ForeignKey("colaboradores.id", ondelete="CASCADE"), nullable=False)
+
+
+def _created_at() -> sa.Column:
+    return sa.Column("created_at", sa.DateTime, server_default=sa.func.current_timestamp())
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("colaboradores"):
+        # Banco anterior ao Alembic: o schema base ja existe
+        return
+    op.create_table(
+        "colaboradores",
+        _id(),
+        sa.Column("matricula", sa.String(20), unique=True, nullable=False),
+        sa.Column("nome", sa.String(100), nullable=False),
+        sa.Column("data_nascimento", sa.Date, nullable=False),
+        sa.Column("sexo", sa.CHAR(1), nullable=False),
+        sa.Column("altura_cm", sa.Numeric(5, 2)),
+        sa.Column("cargo", sa.String(100)),
+        sa.Column("nivel_atividade", sa.String(20), server_default="moderado"),
+        sa.Column("turno_atual", sa.String(10), server_default="diurno"),
+        sa.Column("regime_embarque", sa.String(10), server_default="14x14"),
+        sa.Column("meta_principal", sa.String(30), server_default="saude_geral"),
+        _created_at(),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.current_timestamp()),
+    )
+    op.create_table(
+        "medicoes",
+        _id(),
+        _colaborador_id(),
+        sa.Column("data_medicao", sa.Date, nullable=False),
+        sa.Column("peso_kg", sa.Numeric(5, 2)),
+        sa.Column("circunferencia_abdominal_cm", sa.Numeric(5, 2)),
+        sa.Column("percentual_gordura", sa.Numeric(4, 2)),
+        sa.Column("pressao_sistolica", sa.Integer),
+        sa.Column("pressao_diastolica", sa.Integer),
+        sa.Column("glicemia_jejum", sa.Numeric(5, 1)),
+        sa.Column("colesterol_total", sa.Numeric(5, 1)),
+        sa.Column("hdl", sa.Numeric(5, 1)),
+        sa.Column("ldl", sa.Numeric(5, 1)),
+        sa.Column("triglicerides", sa.Numeric(5, 1)),
+        sa.Column("fonte", sa.String(20), server_default="auto_relato"),
+        _created_at(),
+    )
+    op.create_table(
+        "condicoes_saude",
+        _id(),
+        _colaborador_id(),
+        sa.Column("condicao", sa.String(50), nullable=False),
+        sa.Column("severidade", sa.String(20)),
+        sa.Column("data_diagnostico", sa.Date),
+        sa.Column("medicamentos", ARRAY(sa.Text)),
+        sa.Column("observacoes", sa.Text),
+        sa.Column("ativo", sa.Boolean, server_default=sa.true()),
+        _created_at(),
+    )
+    op.create_table(
+        "preferencias_alimentares",
+        _id(),
+        _colaborador_id(),
+        sa.Column("tipo", sa.String(30), nullable=False),
+        sa.Column("item", sa.String(100), nullable=False),
+        sa.Column("severidade", sa.String(20)),
+        _created_at(),
+    )
+    op.create_table(
+        "planos_nutricionais",
+        _id(),
+        _colaborador_id(),
+        sa.Column("meta_calorica", sa.Integer, nullable=False),
+        sa.Column("proteina_g", sa.Integer, nullable=False),
+        sa.Column("carboidratos_g", sa.Integer, nullable=False),
+        sa.Column("gorduras_g", sa.Integer, nullable=False),
+        sa.Column("objetivo", sa.String(30)),
+        sa.Column("refeicoes_detalhadas", JSONB),
+        sa.Column("suplementacao", JSONB),
+        sa.Column("observacoes", sa.Text),
+        sa.Column("data_inicio", sa.Date, nullable=False),
+        sa.Column("data_fim", sa.Date),
+        sa.Column("ativo", sa.Boolean, server_default=sa.true()),
+        sa.Column("created_by", sa.String(50), server_default="nutrioffshore_ai"),
+        _created_at(),
+    )
+    op.create_table(
+        "cardapios",
+        _id(),
+        sa.Column("plataforma_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("data", sa.Date, nullable=False),
+        sa.Column("refeicao", sa.String(20), nullable=False),
+        sa.Column("itens", JSONB, nullable=False),
+        sa.Column("kcal_total", sa.Float),
+        sa.Column("proteina_total_g", sa.Float),
+        sa.Column("carb_total_g", sa.Float),
+        sa.Column("gordura_total_g", sa.Float),
+        sa.Column("indexado_em", sa.DateTime),
+        _created_at(),
+        sa.UniqueConstraint("plataforma_id", "data", "refeicao", name="uq_cardapio"),
+    )
+    op.create_table(
+        "cardapio_itens",
+        _id(),
+        sa.Column("cardapio_id", UUID(as_uuid=True), sa.ForeignKey("cardapios.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("plataforma_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("data", sa.Date, nullable=False),
+        sa.Column("refeicao", sa.String(20), nullable=False),
+        sa.Column("posicao", sa.Integer, nullable=False),
+        sa.Column("item", sa.String(200), nullable=False),
+        sa.Column("categoria", sa.String(50)),
+        sa.Column("kcal", sa.Float, nullable=False),
+        sa.Column("proteina_g", sa.Float, nullable=False),
+        sa.Column("carb_g", sa.Float, nullable=False),
+        sa.Column("gordura_g", sa.Float, nullable=False),
+        sa.Column("indice_glicemico", sa.String(10)),
+        sa.Column("estimado", sa.Boolean, nullable=False, server_default=sa.false()),
+    )
+    op.create_table(
+        "refeicoes_log",
+        _id(),
+        _colaborador_id(),
+        sa.Column("plano_id", UUID(as_uuid=True), sa.ForeignKey("planos_nutricionais.id")),
+        sa.Column("data", sa.Date, nullable=False),
+        sa.Column("refeicao", sa.String(20), nullable=False),
+        sa.Column("itens_consumidos", JSONB, nullable=False),
+        sa.Column("calorias_estimadas", sa.Integer),
+        sa.Column("proteina_g", sa.Integer),
+        sa.Column("carboidratos_g", sa.Integer),
+        sa.Column("gorduras_g", sa.Integer),
+        sa.Column("aderencia_percentual", sa.Integer),
+        sa.Column("observacoes", sa.Text),
+        _created_at(),
+        sa.CheckConstraint("aderencia_percentual BETWEEN 0 AND 100", name="check_aderencia"),
+    )
+    op.create_table(
+        "consumo_diario",
+        sa.Column("colaborador_id", UUID(as_uuid=True), sa.ForeignKey("colaboradores.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("data", sa.Date, primary_key=True),
+        *[sa.Column(c, sa.Integer, nullable=False, server_default="0") for c in (
+            "calorias", "proteina_g", "carboidratos_g", "gorduras_g", "refeicoes", "aderencia_soma", "aderencia_registros",
+        )],
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.current_timestamp()),
+    )
+    op.create_table(
+        "alertas_medicos",
+        _id(),
+        _colaborador_id(),
+        sa.Column("tipo", sa.String(20), nullable=False),
+        sa.Column("motivo", sa.Text, nullable=False),
+        sa.Column("recomendacao", sa.Text),
+        sa.Column("status", sa.String(20), server_default="aberto"),
+        sa.Column("visualizado_por", sa.String(100)),
+        sa.Column("visualizado_em", sa.DateTime),
+        _created_at(),
+    )
+    op.create_table(
+        "conversas_agente",
+        _id(),
+        _colaborador_id(),
+        sa.Column("messages", JSONB, nullable=False, server_default=sa.text("'[]'::jsonb")),
+        sa.Column("total_mensagens", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("tokens_utilizados", sa.Integer, server_default="0"),
+        _created_at(),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.current_timestamp()),
+    )
+    op.create_table(
+        "mensagens_conversa",
+        _id(),
+        sa.Column("conversa_id", UUID(as_uuid=True), sa.ForeignKey("conversas_agente.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("ordem", sa.Integer, nullable=False),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("content", sa.Text, nullable=False),
+        _created_at(),
+        sa.UniqueConstraint("conversa_id", "ordem", name="uq_mensagem_conversa_ordem"),
+    )
+
+    op.create_index("idx_medicoes_colaborador", "medicoes", ["colaborador_id"])
+    op.create_index("idx_medicoes_data", "medicoes", ["data_medicao"])
+    op.create_index("idx_condicoes_colaborador", "condicoes_saude", ["colaborador_id"])
+    op.create_index("idx_preferencias_colaborador", "preferencias_alimentares", ["colaborador_id"])
+    op.create_index("idx_planos_colaborador", "planos_nutricionais", ["colaborador_id"])
+    op.create_index("idx_planos_ativo", "planos_nutricionais", ["ativo"])
+    op.create_index("idx_cardapios_data", "cardapios", ["data"])
+    op.create_index("idx_cardapios_plataforma", "cardapios", ["plataforma_id"])
+    op.create_index("idx_cardapio_itens_plataforma_data", "cardapio_itens", ["plataforma_id", "data", "refeicao"])
+    op.create_index("idx_cardapio_itens_cardapio", "cardapio_itens", ["cardapio_id"])
+    op.create_index("idx_refeicoes_colaborador", "refeicoes_log", ["colaborador_id"])
+    op.create_index("idx_refeicoes_data", "refeicoes_log", ["data"])
+    op.create_index("idx_alertas_colaborador", "alertas_medicos", ["colaborador_id"])
+    op.create_index("idx_alertas_status", "alertas_medicos", ["status"])
+    op.create_index("idx_conversas_colaborador", "conversas_agente", ["colaborador_id"])
+
+
+def downgrade() -> None:
+    for tabela in (
+        "mensagens_conversa", "conversas_agente", "alertas_medicos", "consumo_diario", "refeicoes_log",
+        "cardapio_itens", "cardapios", "planos_nutricionais", "preferencias_alimentares", "condicoes_saude",
+        "medicoes", "colaboradores",
+    ):
+        op.drop_table(tabela)
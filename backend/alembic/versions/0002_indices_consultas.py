@@ -0,0 +1,66 @@
+"""indices compostos e parciais no formato das consultas quentes
+
+- refeicoes_log (colaborador_id, data, created_at): refeicoes do dia e historico
+  (ORDER BY data DESC, created_at DESC LIMIT n sai do indice, sem sort)
+- medicoes (colaborador_id, data_medicao): ultima medicao e historico de peso
+- planos_nutricionais (colaborador_id) WHERE ativo: plano ativo
+- alertas_medicos (created_at) WHERE status = 'aberto': fila de alertas abertos;
+  (status, created_at) para os demais status; (colaborador_id, created_at)
+- cardapios (plataforma_id, data): ja coberto por uq_cardapio; o indice so de
+  plataforma_id vira redundante
+
+Os indices de coluna unica que viram prefixo dos compostos sao removidos.
+Criados com CONCURRENTLY (fora de transacao) para nao bloquear escrita.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# nome, tabela, colunas, predicado do indice parcial
+INDICES = [
+    ("idx_refeicoes_colaborador_data", "refeicoes_log", ["colaborador_id", "data", "created_at"], None),
+    ("idx_medicoes_colaborador_data", "medicoes", ["colaborador_id", "data_medicao"], None),
+    ("idx_planos_colaborador_ativo", "planos_nutricionais", ["colaborador_id"], "ativo"),
+    ("idx_alertas_abertos", "alertas_medicos", ["created_at"], "status = 'aberto'"),
+    ("idx_alertas_status_created", "alertas_medicos", ["status", "created_at"], None),
+    ("idx_alertas_colaborador_created", "alertas_medicos", ["colaborador_id", "created_at"], None),
+]
+
+# substituidos pelos compostos acima (nome, tabela, colunas)
+SUBSTITUIDOS = [
+    ("idx_refeicoes_colaborador", "refeicoes_log", ["colaborador_id"]),
+    ("idx_medicoes_colaborador", "medicoes", ["colaborador_id"]),
+    ("idx_planos_ativo", "planos_nutricionais", ["ativo"]),
+    ("idx_alertas_status", "alertas_medicos", ["status"]),
+    ("idx_alertas_colaborador", "alertas_medicos", ["colaborador_id"]),
+    ("idx_cardapios_plataforma", "cardapios", ["plataforma_id"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas, predicado in INDICES:
+            op.create_index(
+                nome, tabela, colunas, if_not_exists=True, postgresql_concurrently=True,
+                postgresql_where=sa.text(predicado) if predicado else None,
+            )
+        for nome, tabela, _ in SUBSTITUIDOS:
+            op.drop_index(nome, table_name=tabela, if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas in SUBSTITUIDOS:
+            op.create_index(nome, tabela, colunas, if_not_exists=True, postgresql_concurrently=True)
+        for nome, tabela, _, _ in INDICES:
+            op.drop_index(nome, table_name=tabela, if_exists=True, postgresql_concurrently=True)
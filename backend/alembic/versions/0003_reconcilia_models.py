@@ -0,0 +1,88 @@
+"""reconcilia o schema com os models (senha_hash, cascades, nomes de indice)
+
+O schema existia em duas fontes que divergiam: database/init.sql e o
+create_all dos models no startup. Esta revisao leva os dois tipos de banco ao
+mesmo ponto:
+
+- colaboradores.senha_hash (so existia nos bancos do create_all)
+- FKs para colaboradores com ON DELETE CASCADE (o create_all criava sem)
+- indice (colaborador_id, updated_at) do historico de conversas, que substitui
+  o de colaborador_id sozinho
+- indices com os nomes do init.sql no lugar dos ix_* gerados pelo create_all
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS_COLABORADOR = [
+    "medicoes", "condicoes_saude", "preferencias_alimentares", "planos_nutricionais",
+    "refeicoes_log", "alertas_medicos", "conversas_agente",
+]
+
+# nome, tabela, colunas (garantidos tambem em bancos vindos do create_all)
+INDICES = [
+    ("ix_conversas_colab_updated", "conversas_agente", ["colaborador_id", "updated_at"]),
+    ("idx_condicoes_colaborador", "condicoes_saude", ["colaborador_id"]),
+    ("idx_preferencias_colaborador", "preferencias_alimentares", ["colaborador_id"]),
+    ("idx_planos_colaborador", "planos_nutricionais", ["colaborador_id"]),
+    ("idx_medicoes_data", "medicoes", ["data_medicao"]),
+    ("idx_refeicoes_data", "refeicoes_log", ["data"]),
+    ("idx_cardapios_data", "cardapios", ["data"]),
+]
+
+# nome, tabela: prefixo de ix_conversas_colab_updated e duplicatas geradas pelo create_all
+REMOVIDOS = [
+    ("idx_conversas_colaborador", "conversas_agente"),
+    ("ix_conversas_agente_colaborador_id", "conversas_agente"),
+    ("ix_condicoes_saude_colaborador_id", "condicoes_saude"),
+    ("ix_preferencias_alimentares_colaborador_id", "preferencias_alimentares"),
+    ("ix_planos_nutricionais_colaborador_id", "planos_nutricionais"),
+    ("ix_medicoes_colaborador_id", "medicoes"),
+    ("ix_refeicoes_log_colaborador_id", "refeicoes_log"),
+    ("ix_refeicoes_log_plano_id", "refeicoes_log"),
+    ("ix_alertas_medicos_colaborador_id", "alertas_medicos"),
+]
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE colaboradores ADD COLUMN IF NOT EXISTS senha_hash VARCHAR")
+    # Recria so as FKs sem CASCADE: a revalidacao percorre a tabela inteira
+    tabelas = ", ".join(f"'{t}'" for t in TABELAS_COLABORADOR)
+    op.execute(f"""
+        DO $$
+        DECLARE t text;
+        BEGIN
+            FOREACH t IN ARRAY ARRAY[{tabelas}] LOOP
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_constraint WHERE conname = t || '_colaborador_id_fkey' AND confdeltype = 'c'
+                ) THEN
+                    EXECUTE format('ALTER TABLE %I DROP CONSTRAINT IF EXISTS %I', t, t || '_colaborador_id_fkey');
+                    EXECUTE format(
+                        'ALTER TABLE %I ADD CONSTRAINT %I FOREIGN KEY (colaborador_id) REFERENCES colaboradores(id) ON DELETE CASCADE',
+                        t, t || '_colaborador_id_fkey'
+                    );
+                END IF;
+            END LOOP;
+        END $$
+    """)
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas in INDICES:
+            op.create_index(nome, tabela, colunas, if_not_exists=True, postgresql_concurrently=True)
+        for nome, tabela in REMOVIDOS:
+            op.drop_index(nome, table_name=tabela, if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    # senha_hash e os CASCADE ficam: desfaze-los apagaria credenciais e mudaria exclusoes
+    with op.get_context().autocommit_block():
+        op.create_index("idx_conversas_colaborador", "conversas_agente", ["colaborador_id"], if_not_exists=True, postgresql_concurrently=True)
+        op.drop_index("ix_conversas_colab_updated", table_name="conversas_agente", if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""ledger de tokens do LLM (uso_tokens)
+
+Uma linha por colaborador, dia, modelo e rodada de tools, somada com upsert a
+cada lote gravado pelo agente. A PK (colaborador_id, data, ...) atende o
+consumo do dia usado pelo orcamento e os agregados por periodo.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "uso_tokens",
+        sa.Column("colaborador_id", UUID(as_uuid=True), sa.ForeignKey("colaboradores.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("data", sa.Date, primary_key=True),
+        sa.Column("modelo", sa.String(100), primary_key=True),
+        sa.Column("rodada", sa.Integer, primary_key=True),
+        *[sa.Column(c, sa.Integer, nullable=False, server_default="0") for c in ("prompt_tokens", "completion_tokens", "chamadas")],
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.current_timestamp()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("uso_tokens")
@@ -0,0 +1,27 @@
+"""tokens de prompt servidos do cache do provedor (uso_tokens.cached_tokens)
+
+Parte de prompt_tokens que o provedor leu do cache de prefixo
+(usage.prompt_tokens_details.cached_tokens), por rodada de tools, para
+acompanhar se o layout do prompt esta sendo reaproveitado.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("uso_tokens", sa.Column("cached_tokens", sa.Integer, nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("uso_tokens", "cached_tokens")
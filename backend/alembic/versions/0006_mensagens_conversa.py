@@ -0,0 +1,54 @@
+"""historico de conversas em mensagens_conversa (antiga migracao SQL 001)
+
+Move o historico de conversas_agente.messages (blob JSONB reescrito a cada
+turno) para mensagens_conversa, uma linha por mensagem. Idempotente: em bancos
+criados pela 0001 ou pelo init.sql atual nao ha nada a fazer; em bancos
+anteriores ao Alembic cria tabela e coluna e copia os blobs ainda nao migrados.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE conversas_agente ADD COLUMN IF NOT EXISTS total_mensagens INTEGER NOT NULL DEFAULT 0")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS mensagens_conversa (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            conversa_id UUID NOT NULL REFERENCES conversas_agente(id) ON DELETE CASCADE,
+            ordem INTEGER NOT NULL,
+            role VARCHAR(20) NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT uq_mensagem_conversa_ordem UNIQUE (conversa_id, ordem)
+        )
+    """)
+    # Backfill so das conversas que ainda tem o blob (as migradas ficam com '[]')
+    op.execute("""
+        INSERT INTO mensagens_conversa (conversa_id, ordem, role, content, created_at)
+        SELECT c.id, m.ordinality - 1, m.value->>'role', COALESCE(m.value->>'content', ''), c.updated_at
+        FROM conversas_agente c
+        CROSS JOIN LATERAL jsonb_array_elements(c.messages) WITH ORDINALITY AS m(value, ordinality)
+        WHERE jsonb_typeof(c.messages) = 'array' AND jsonb_array_length(c.messages) > 0
+        ON CONFLICT (conversa_id, ordem) DO NOTHING
+    """)
+    op.execute("""
+        UPDATE conversas_agente c
+        SET total_mensagens = sub.total, messages = '[]'::jsonb
+        FROM (SELECT conversa_id, MAX(ordem) + 1 AS total FROM mensagens_conversa GROUP BY conversa_id) sub
+        WHERE sub.conversa_id = c.id AND jsonb_typeof(c.messages) = 'array' AND jsonb_array_length(c.messages) > 0
+    """)
+
+
+def downgrade() -> None:
+    # A tabela e o contador fazem parte do schema base (0001); o blob nao e reconstruido
+    pass
@@ -0,0 +1,52 @@
+"""indice nutricional dos cardapios (antiga migracao SQL 002)
+
+Totais por refeicao em cardapios e uma linha por item normalizado em
+cardapio_itens. Idempotente: so cria o que faltar (bancos anteriores ao
+Alembic). Os cardapios existentes ficam sem indexado_em e as rotas os calculam
+em memoria ate o backfill em Python: scripts/indexar_cardapios.py.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for coluna, tipo in (
+        ("kcal_total", "FLOAT"), ("proteina_total_g", "FLOAT"), ("carb_total_g", "FLOAT"),
+        ("gordura_total_g", "FLOAT"), ("indexado_em", "TIMESTAMP"),
+    ):
+        op.execute(f"ALTER TABLE cardapios ADD COLUMN IF NOT EXISTS {coluna} {tipo}")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS cardapio_itens (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            cardapio_id UUID NOT NULL REFERENCES cardapios(id) ON DELETE CASCADE,
+            plataforma_id UUID NOT NULL,
+            data DATE NOT NULL,
+            refeicao VARCHAR(20) NOT NULL,
+            posicao INTEGER NOT NULL,
+            item VARCHAR(200) NOT NULL,
+            categoria VARCHAR(50),
+            kcal FLOAT NOT NULL,
+            proteina_g FLOAT NOT NULL,
+            carb_g FLOAT NOT NULL,
+            gordura_g FLOAT NOT NULL,
+            indice_glicemico VARCHAR(10),
+            estimado BOOLEAN NOT NULL DEFAULT FALSE
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS idx_cardapio_itens_plataforma_data ON cardapio_itens (plataforma_id, data, refeicao)")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_cardapio_itens_cardapio ON cardapio_itens (cardapio_id)")
+
+
+def downgrade() -> None:
+    # Parte do schema base (0001)
+    pass
@@ -0,0 +1,51 @@
+"""agregado diario de consumo (antiga migracao SQL 003)
+
+consumo_diario guarda os totais por colaborador e dia, mantidos pela API a cada
+refeicao registrada. Idempotente: cria a tabela se faltar (banco anterior ao
+Alembic) e preenche a partir de refeicoes_log os dias sem agregado; os dias ja
+agregados pela API nao sao tocados.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS consumo_diario (
+            colaborador_id UUID NOT NULL REFERENCES colaboradores(id) ON DELETE CASCADE,
+            data DATE NOT NULL,
+            calorias INTEGER NOT NULL DEFAULT 0,
+            proteina_g INTEGER NOT NULL DEFAULT 0,
+            carboidratos_g INTEGER NOT NULL DEFAULT 0,
+            gorduras_g INTEGER NOT NULL DEFAULT 0,
+            refeicoes INTEGER NOT NULL DEFAULT 0,
+            aderencia_soma INTEGER NOT NULL DEFAULT 0,
+            aderencia_registros INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (colaborador_id, data)
+        )
+    """)
+    op.execute("""
+        INSERT INTO consumo_diario (colaborador_id, data, calorias, proteina_g, carboidratos_g, gorduras_g, refeicoes, aderencia_soma, aderencia_registros)
+        SELECT colaborador_id, data,
+               COALESCE(SUM(calorias_estimadas), 0), COALESCE(SUM(proteina_g), 0), COALESCE(SUM(carboidratos_g), 0),
+               COALESCE(SUM(gorduras_g), 0), COUNT(*), COALESCE(SUM(aderencia_percentual), 0), COUNT(aderencia_percentual)
+        FROM refeicoes_log
+        GROUP BY colaborador_id, data
+        ON CONFLICT (colaborador_id, data) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    # Parte do schema base (0001)
+    pass
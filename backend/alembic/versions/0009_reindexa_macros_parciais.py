@@ -0,0 +1,35 @@
+"""invalida o indice dos cardapios com itens de macros parciais
+
+Itens com kcal e so parte dos macros foram indexados com os macros ausentes
+tirados das kcal inteiras (somando mais kcal que o item). Os cardapios com
+algum item assim perdem indexado_em: as leituras voltam a normalizar em memoria
+(ja corrigido) ate scripts/indexar_cardapios.py regravar o indice.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        UPDATE cardapios c SET indexado_em = NULL
+        WHERE c.indexado_em IS NOT NULL AND jsonb_typeof(c.itens) = 'array' AND EXISTS (
+            SELECT 1 FROM jsonb_array_elements(c.itens) e
+            WHERE jsonb_typeof(e) = 'object'
+              AND e->>'calorias_porcao' IS NOT NULL
+              AND num_nonnulls(e->>'proteina_g', e->>'carb_g', e->>'gordura_g') BETWEEN 1 AND 2
+        )
+    """)
+
+
+def downgrade() -> None:
+    pass
@@ -56,6 +56,21 @@ Ao gerar plano, estruture:
 7. Acompanhamento
 </formato_plano>
 
-O ID do colaborador atual é: {colaborador_id}
+O ID do colaborador atual está no contexto logo após estas instruções.
 
 Use as tools disponíveis para buscar dados do colaborador, cardápio, salvar planos e registrar refeições. Sempre busque o perfil do colaborador antes de fazer recomendações."""
+
+# SYSTEM_PROMPT e TOOLS sao iguais byte a byte para todos os colaboradores: o provedor
+# reaproveita esse prefixo entre requisicoes (prompt caching). O que varia por
+# colaborador vem depois dele, em uma segunda mensagem de sistema.
+CONTEXTO_COLABORADOR = """<contexto_colaborador>
+O ID do colaborador atual é: {colaborador_id}
+</contexto_colaborador>"""
+
+
+def mensagens_iniciais(colaborador_id: str) -> list[dict]:
+    """Prefixo fixo (instrucoes) seguido do contexto do colaborador"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": CONTEXTO_COLABORADOR.format(colaborador_id=colaborador_id)},
+    ]
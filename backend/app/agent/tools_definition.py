@@ -22,7 +22,7 @@ TOOLS = [
         "type": "function",
         "function": {
             "name": "get_cardapio_dia",
-            "description": "Retorna cardápio do refeitório da plataforma para um dia específico",
+            "description": "Retorna cardápio do refeitório da plataforma para um dia específico, com kcal/macros por item e totais de cada refeição já calculados",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -213,5 +213,21 @@ TOOLS = [
                 "required": ["peso_kg", "altura_cm", "idade", "sexo", "nivel_atividade", "objetivo"]
             }
         }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "sugerir_refeicoes_cardapio",
+            "description": "Monta, a partir do cardápio do refeitório do dia, a seleção de itens e porções de cada refeição que mais se aproxima das metas do plano ativo do colaborador, já excluindo alergias, intolerâncias, restrições e itens contraindicados pelas condições de saúde. Use em vez de escolher os itens manualmente",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "colaborador_id": {"type": "string", "description": "ID do colaborador (UUID)"},
+                    "data": {"type": "string", "description": "Data no formato YYYY-MM-DD (padrão: hoje)"},
+                    "plataforma_id": {"type": "string", "description": "ID da plataforma (UUID). Obrigatório quando mais de uma plataforma tem cardápio na data"}
+                },
+                "required": ["colaborador_id"]
+            }
+        }
     }
 ]
@@ -4,9 +4,14 @@ Utilitarios JWT (PyJWT) e hashing de senhas (bcrypt)
 """
 import jwt
 import bcrypt
+import asyncio
+import hmac
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Callable, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -34,6 +39,96 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     )
 
 
+class PasswordPool:
+    """Executa bcrypt fora do event loop em um pool de threads limitado.
+
+    bcrypt libera o GIL durante o hash, entao threads bastam para paralelizar.
+    Pedidos alem de max_fila sao recusados com 503 em vez de acumular latencia.
+    """
+
+    def __init__(self, max_workers: int, max_fila: int):
+        self.max_workers = max_workers
+        self.max_fila = max_fila
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pendentes = 0
+        self._em_execucao = 0
+        self._lock = threading.Lock()
+        self._pico_fila = 0
+        self._total = 0
+        self._recusados = 0
+        self._espera_total_ms = 0.0
+        self._execucao_total_ms = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, func: Callable, *args):
+        if self._pendentes >= self.max_fila:
+            self._recusados += 1
+            logger.warning(f"Fila de bcrypt cheia ({self._pendentes}), recusando pedido")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servico de autenticacao sobrecarregado, tente novamente",
+                headers={"Retry-After": "2"},
+            )
+        enfileirado = time.perf_counter()
+        self._pendentes += 1
+        self._pico_fila = max(self._pico_fila, self._pendentes)
+
+        def tarefa():
+            inicio = time.perf_counter()
+            with self._lock:
+                self._em_execucao += 1
+            try:
+                return func(*args), (inicio - enfileirado) * 1000, (time.perf_counter() - inicio) * 1000
+            finally:
+                with self._lock:
+                    self._em_execucao -= 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            resultado, espera_ms, execucao_ms = await loop.run_in_executor(self._get_executor(), tarefa)
+        finally:
+            self._pendentes -= 1
+        self._total += 1
+        self._espera_total_ms += espera_ms
+        self._execucao_total_ms += execucao_ms
+        return resultado
+
+    def metricas(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_fila": self.max_fila,
+            "fila_atual": self._pendentes - self._em_execucao,
+            "em_execucao": self._em_execucao,
+            "pico_fila": self._pico_fila,
+            "total": self._total,
+            "recusados": self._recusados,
+            "espera_media_ms": round(self._espera_total_ms / self._total, 1) if self._total else 0.0,
+            "execucao_media_ms": round(self._execucao_total_ms / self._total, 1) if self._total else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordPool(settings.BCRYPT_MAX_WORKERS, settings.BCRYPT_MAX_FILA)
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password executado no pool de bcrypt (nao bloqueia o event loop)."""
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password executado no pool de bcrypt (nao bloqueia o event loop)."""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Cria um JWT assinado com HS256.
@@ -92,3 +187,19 @@ def get_current_user(token: Optional[str] = Depends(oauth2_scheme)) -> dict:
     except jwt.InvalidTokenError as e:
         logger.warning(f"Token JWT invalido: {type(e).__name__}")
         raise credentials_exception
+
+
+def verificar_token_metricas(token: Optional[str] = Depends(oauth2_scheme)) -> None:
+    """
+    Dependencia de /metrics: exige `Authorization: Bearer <METRICS_TOKEN>`.
+    Sem METRICS_TOKEN configurado o endpoint nao existe (404): as metricas expoem
+    internos (pool, filas, erros do provedor) e nao sao publicas.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if token is None or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de metricas invalido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -8,14 +8,66 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     DATABASE_URL: str = ""
     DATABASE_URL_SYNC: str = "postgresql://postgres:postgres@db:5432/nutrioffshore"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_SCHEMA_EXIGIR_HEAD: bool = True
+    STARTUP_ORCAMENTO_MS: int = 3000
     OPENROUTER_API_KEY: str = ""
     OPENROUTER_MODEL: str = "google/gemma-3-27b-it:free"
     OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
+    OPENROUTER_FALLBACK_MODELS: str = ""
+    OPENROUTER_MODELO_ECONOMICO: str = ""
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_INICIAL_MS: int = 15000
+    LLM_HEDGE_MIN_MS: int = 1500
+    LLM_CIRCUIT_FALHAS: int = 3
+    LLM_CIRCUIT_RESET_SECONDS: int = 60
+    LLM_MAX_CONNECTIONS: int = 50
+    LLM_MAX_KEEPALIVE: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_HTTP2: bool = True
+    LLM_CACHE_CONTROL_PREFIXOS: str = "anthropic/,google/gemini"
+    LLM_ADMISSAO_MAX_CONCORRENTES: int = 4
+    LLM_ADMISSAO_PRAZO_S: float = 45.0
+    LLM_ADMISSAO_MAX_FILA: int = 100
+    LLM_ADMISSAO_MAX_POR_USUARIO: int = 2
+    LLM_ADMISSAO_DURACAO_INICIAL_S: float = 10.0
+    TOKENS_ORCAMENTO_DIARIO_SOFT: int = 150000
+    TOKENS_ORCAMENTO_DIARIO_HARD: int = 300000
+    TOKENS_FILA_MAX: int = 10000
     AUTH_ENABLED: bool = False
     JWT_SECRET: str = ""
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480
+    # /metrics so com este bearer token; vazio = endpoint desligado
+    METRICS_TOKEN: str = ""
     CORS_ORIGINS: str = "http://localhost:3000"
+    SSE_FLUSH_MS: int = 50
+    SSE_FRAME_MAX_BYTES: int = 1024
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_FILA_MAX: int = 64
+    BCRYPT_MAX_WORKERS: int = 4
+    BCRYPT_MAX_FILA: int = 128
+    PROFILE_CACHE_TTL_SECONDS: int = 300
+    PROFILE_CACHE_MAX_ENTRIES: int = 1024
+    CONTEXT_MAX_TOKENS: int = 12000
+    CONTEXT_TOKENIZER: str = "auto"
+    CONTEXT_RESUMIR_HISTORICO: bool = False
+    TOOLS_SELECAO_ENABLED: bool = True
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: int = 21600
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2048
+    RATE_LIMIT_LLM_POR_MINUTO: float = 10
+    RATE_LIMIT_LLM_RAJADA: float = 5
+    RATE_LIMIT_LEVE_POR_MINUTO: float = 120
+    RATE_LIMIT_LEVE_RAJADA: float = 60
+    RATE_LIMIT_FATOR_IP: float = 20
+    RATE_LIMIT_MAX_CHAVES: int = 10000
 
     class Config:
         env_file = ".env"
@@ -1,11 +1,141 @@
+from bisect import bisect_left
+from pathlib import Path
+from sqlalchemy import event, text
+from sqlalchemy.exc import ProgrammingError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+import logging
+import re
+import time
+
 from app.config import get_settings
 
 settings = get_settings()
-engine = create_async_engine(settings.DATABASE_URL, echo=settings.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Limites superiores (ms) dos buckets do histograma de espera no checkout
+BUCKETS_CHECKOUT_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolMetricas:
+    """Telemetria do pool de conexoes: espera no checkout, conexoes em uso e overflow"""
+
+    def __init__(self):
+        self.histograma = [0] * (len(BUCKETS_CHECKOUT_MS) + 1)
+        self.checkouts = 0
+        self.espera_total_ms = 0.0
+        self.espera_max_ms = 0.0
+        self.timeouts = 0
+        self.overflows = 0
+        self.em_uso = 0
+        self.em_uso_max = 0
+        self.conexoes_abertas = 0
+        self.invalidacoes = 0
+
+    def registrar_espera(self, espera_ms: float) -> None:
+        self.checkouts += 1
+        self.espera_total_ms += espera_ms
+        self.espera_max_ms = max(self.espera_max_ms, espera_ms)
+        self.histograma[bisect_left(BUCKETS_CHECKOUT_MS, espera_ms)] += 1
+
+    def percentil(self, p: float) -> float:
+        """Limite superior do bucket que contem o percentil p (0-1) da espera"""
+        alvo = p * self.checkouts
+        acumulado = 0
+        for i, n in enumerate(self.histograma):
+            acumulado += n
+            if n and acumulado >= alvo:
+                return BUCKETS_CHECKOUT_MS[i] if i < len(BUCKETS_CHECKOUT_MS) else float("inf")
+        return 0.0
+
+    def snapshot(self, pool) -> dict:
+        return {
+            "pool_size": pool.size(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "em_uso": self.em_uso,
+            "em_uso_max": self.em_uso_max,
+            "ociosas": pool.checkedin(),
+            "overflow_atual": max(pool.overflow(), 0),
+            "overflows": self.overflows,
+            "timeouts": self.timeouts,
+            "conexoes_abertas": self.conexoes_abertas,
+            "invalidacoes": self.invalidacoes,
+            "checkouts": self.checkouts,
+            "espera_media_ms": round(self.espera_total_ms / self.checkouts, 2) if self.checkouts else 0.0,
+            "espera_p95_ms": self.percentil(0.95),
+            "espera_max_ms": round(self.espera_max_ms, 2),
+            "histograma_espera_ms": {
+                (f"<={b}" if i < len(BUCKETS_CHECKOUT_MS) else f">{BUCKETS_CHECKOUT_MS[-1]}"): n
+                for i, (b, n) in enumerate(zip(BUCKETS_CHECKOUT_MS + (None,), self.histograma))
+            },
+        }
+
+
+pool_metricas = PoolMetricas()
+
+
+class PoolInstrumentado(AsyncAdaptedQueuePool):
+    """QueuePool que mede o tempo de espera por uma conexao livre"""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except PoolTimeoutError:
+            pool_metricas.timeouts += 1
+            raise
+        pool_metricas.registrar_espera((time.perf_counter() - inicio) * 1000)
+        return conexao
+
+
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=settings.DEBUG,
+    poolclass=PoolInstrumentado,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    # 0 desativa o cache de prepared statements (necessario atras de pgbouncer em modo transaction)
+    connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metricas.conexoes_abertas += 1
+    # Conexao aberta alem de pool_size (o contador de overflow ja foi incrementado)
+    if engine.sync_engine.pool.overflow() > 0:
+        pool_metricas.overflows += 1
+
+
+@event.listens_for(engine.sync_engine, "close")
+def _on_close(dbapi_connection, connection_record):
+    pool_metricas.conexoes_abertas -= 1
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metricas.em_uso += 1
+    pool_metricas.em_uso_max = max(pool_metricas.em_uso_max, pool_metricas.em_uso)
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_metricas.em_uso -= 1
+
+
+@event.listens_for(engine.sync_engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metricas.invalidacoes += 1
+
+
+def metricas_pool() -> dict:
+    return pool_metricas.snapshot(engine.sync_engine.pool)
+
 class Base(DeclarativeBase):
     pass
 
@@ -16,6 +146,42 @@ async def get_db():
         finally:
             await session.close()
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+ALEMBIC_VERSOES = Path(__file__).resolve().parent.parent / "alembic" / "versions"
+_RE_REVISAO = re.compile(r"^revision\b[^=]*=\s*['\"]([^'\"]+)['\"]", re.M)
+_RE_ANTERIOR = re.compile(r"^down_revision\b[^=]*=\s*['\"]([^'\"]+)['\"]", re.M)
+
+
+def revisao_head() -> str:
+    """Head da cadeia do Alembic lida direto dos arquivos de versao
+    (importar o alembic so para isso custa ~100 ms no cold start)"""
+    revisoes, anteriores = set(), set()
+    for arquivo in ALEMBIC_VERSOES.glob("*.py"):
+        conteudo = arquivo.read_text(encoding="utf-8")
+        if m := _RE_REVISAO.search(conteudo):
+            revisoes.add(m.group(1))
+        if m := _RE_ANTERIOR.search(conteudo):
+            anteriores.add(m.group(1))
+    heads = revisoes - anteriores
+    if len(heads) != 1:
+        raise RuntimeError(f"Cadeia do Alembic deve ter uma unica head, encontradas: {sorted(heads)}")
+    return heads.pop()
+
+
+async def verificar_schema() -> str | None:
+    """Confere no startup que o banco esta na head do Alembic, com uma unica consulta.
+    O schema e aplicado fora da API (`alembic upgrade head`); nada e refletido ou criado aqui."""
+    esperada = revisao_head()
+    async with engine.connect() as conn:
+        try:
+            atual = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+        except ProgrammingError:
+            atual = None
+    if atual != esperada:
+        mensagem = (
+            f"Schema do banco na revisao {atual or 'nenhuma (sem alembic_version)'}, esperada {esperada}. "
+            "Rode `alembic upgrade head` (tambem em bancos anteriores ao Alembic; a imagem ja roda antes da API)."
+        )
+        if settings.DB_SCHEMA_EXIGIR_HEAD:
+            raise RuntimeError(mensagem)
+        logger.warning(mensagem)
+    return atual
@@ -1,16 +1,24 @@
-from fastapi import FastAPI, Request
+import time
+
+_INICIO_IMPORT = time.perf_counter()
+
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from app.rate_limit import limiter
+from app.rate_limit import limitar, limiter
 from app.routes import colaboradores, planos, cardapios, refeicoes, chat, alertas
 from app.routes import auth as auth_routes
-from app.database import init_db
+from app.database import metricas_pool, verificar_schema
+from app.auth import password_pool, verificar_token_metricas
+from app.services.cache_service import perfil_cache, resposta_cache
+from app.services.llm_service import llm_clients, model_router
+from app.services.sse_service import sse_metricas
+from app.services.admissao_service import controle_admissao
+from app.services.tokens_service import registro_tokens
+from app.services.selecao_tools import seletor_tools
 from app.config import get_settings
 from app.logging_config import setup_logging
 import logging
-import time
 import uuid
 import traceback
 
@@ -23,10 +31,6 @@ app = FastAPI(
     version="1.0.0",
 )
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Catch-all handler ensures unhandled errors return proper JSON
@@ -110,13 +114,15 @@ async def request_logging_middleware(request: Request, call_next):
         raise
 
 
+# Login nao tem sub: limitar por IP dividiria o limite da plataforma inteira
+_leve = [Depends(limitar("leve"))]
 app.include_router(auth_routes.router, prefix="/api/v1/auth", tags=["Autenticacao"])
-app.include_router(colaboradores.router, prefix="/api/v1/colaboradores", tags=["Colaboradores"])
-app.include_router(planos.router, prefix="/api/v1/planos", tags=["Planos Nutricionais"])
-app.include_router(cardapios.router, prefix="/api/v1/cardapios", tags=["Cardápios"])
-app.include_router(refeicoes.router, prefix="/api/v1/refeicoes", tags=["Refeições"])
+app.include_router(colaboradores.router, prefix="/api/v1/colaboradores", tags=["Colaboradores"], dependencies=_leve)
+app.include_router(planos.router, prefix="/api/v1/planos", tags=["Planos Nutricionais"], dependencies=_leve)
+app.include_router(cardapios.router, prefix="/api/v1/cardapios", tags=["Cardápios"], dependencies=_leve)
+app.include_router(refeicoes.router, prefix="/api/v1/refeicoes", tags=["Refeições"], dependencies=_leve)
 app.include_router(chat.router, prefix="/api/v1/chat", tags=["Chat AI"])
-app.include_router(alertas.router, prefix="/api/v1/alertas", tags=["Alertas Médicos"])
+app.include_router(alertas.router, prefix="/api/v1/alertas", tags=["Alertas Médicos"], dependencies=_leve)
 
 
 @app.api_route("/health", methods=["GET", "HEAD", "POST", "OPTIONS"])
@@ -124,8 +130,45 @@ async def health_check():
     return {"status": "healthy", "service": "NutriOffshore AI"}
 
 
+@app.get("/metrics", dependencies=[Depends(verificar_token_metricas)], include_in_schema=False)
+async def metrics():
+    """Metricas operacionais em memoria desta instancia (Bearer METRICS_TOKEN)"""
+    return {
+        "bcrypt": password_pool.metricas(),
+        "db_pool": metricas_pool(),
+        "perfil_cache": perfil_cache.metricas(),
+        "resposta_cache": resposta_cache.metricas(),
+        "sse": sse_metricas.snapshot(),
+        "llm": model_router.metricas(),
+        "admissao": controle_admissao.metricas(),
+        "tokens": registro_tokens.metricas(),
+        "selecao_tools": seletor_tools.metricas(),
+        "startup": metricas_startup,
+        "rate_limit": limiter.metricas(),
+    }
+
+
+# Cold start desta instancia: import do app (a maior parte) + startup
+metricas_startup: dict = {}
+
+
 @app.on_event("startup")
 async def startup():
+    inicio = time.perf_counter()
+    metricas_startup["import_ms"] = round((inicio - _INICIO_IMPORT) * 1000, 1)
     _settings.validate_settings()
-    await init_db()
-    logger.info("NutriOffshore AI Backend started successfully")
+    metricas_startup["schema_revisao"] = await verificar_schema()
+    metricas_startup["schema_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    total = metricas_startup["total_ms"] = round((time.perf_counter() - _INICIO_IMPORT) * 1000, 1)
+    metricas_startup["orcamento_ms"] = _settings.STARTUP_ORCAMENTO_MS
+    resumo = f"cold start {total:.0f} ms (import {metricas_startup['import_ms']:.0f} ms, schema {metricas_startup['schema_ms']:.0f} ms)"
+    if total > _settings.STARTUP_ORCAMENTO_MS:
+        logger.warning(f"{resumo} acima do orcamento de {_settings.STARTUP_ORCAMENTO_MS} ms")
+    logger.info(f"NutriOffshore AI Backend started successfully - {resumo}")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    password_pool.shutdown()
+    await registro_tokens.fechar()
+    await llm_clients.fechar()
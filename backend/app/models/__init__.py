@@ -4,6 +4,10 @@ from app.models.condicao_saude import CondicaoSaude
 from app.models.preferencia_alimentar import PreferenciaAlimentar
 from app.models.plano_nutricional import PlanoNutricional
 from app.models.cardapio import Cardapio
+from app.models.cardapio_item import CardapioItem
 from app.models.refeicao_log import RefeicaoLog
+from app.models.consumo_diario import ConsumoDiario
+from app.models.uso_tokens import UsoTokens
 from app.models.alerta_medico import AlertaMedico
 from app.models.conversa import ConversaAgente
+from app.models.mensagem_conversa import MensagemConversa
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -8,7 +8,7 @@ from app.database import Base
 class AlertaMedico(Base):
     __tablename__ = "alertas_medicos"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id"), nullable=False, index=True)
+    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id", ondelete="CASCADE"), nullable=False)
     tipo = Column(String(20), nullable=False)
     motivo = Column(Text, nullable=False)
     recomendacao = Column(Text)
@@ -16,4 +16,9 @@ class AlertaMedico(Base):
     visualizado_por = Column(String(100))
     visualizado_em = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        Index('idx_alertas_abertos', 'created_at', postgresql_where=text("status = 'aberto'")),
+        Index('idx_alertas_status_created', 'status', 'created_at'),
+        Index('idx_alertas_colaborador_created', 'colaborador_id', 'created_at'),
+    )
     colaborador = relationship("Colaborador", back_populates="alertas")
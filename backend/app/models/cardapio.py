@@ -1,7 +1,8 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Date, DateTime, UniqueConstraint
+from sqlalchemy import Column, String, Date, DateTime, Float, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Cardapio(Base):
@@ -11,5 +12,18 @@ class Cardapio(Base):
     data = Column(Date, nullable=False)
     refeicao = Column(String(20), nullable=False)
     itens = Column(JSONB, nullable=False)
+    # Totais da refeicao (uma porcao de cada item), preenchidos na ingestao
+    kcal_total = Column(Float)
+    proteina_total_g = Column(Float)
+    carb_total_g = Column(Float)
+    gordura_total_g = Column(Float)
+    indexado_em = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
-    __table_args__ = (UniqueConstraint('plataforma_id', 'data', 'refeicao', name='uq_cardapio'),)
+    itens_indexados = relationship(
+        "CardapioItem", back_populates="cardapio", lazy="raise_on_sql",
+        cascade="all, delete-orphan", passive_deletes=True, order_by="CardapioItem.posicao",
+    )
+    __table_args__ = (
+        UniqueConstraint('plataforma_id', 'data', 'refeicao', name='uq_cardapio'),
+        Index('idx_cardapios_data', 'data'),
+    )
@@ -0,0 +1,29 @@
+import uuid
+from sqlalchemy import Column, String, Date, Integer, Float, Boolean, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class CardapioItem(Base):
+    """Item do cardapio com a nutricao por porcao ja calculada (indice de Cardapio.itens)"""
+    __tablename__ = "cardapio_itens"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    cardapio_id = Column(UUID(as_uuid=True), ForeignKey("cardapios.id", ondelete="CASCADE"), nullable=False)
+    plataforma_id = Column(UUID(as_uuid=True), nullable=False)
+    data = Column(Date, nullable=False)
+    refeicao = Column(String(20), nullable=False)
+    posicao = Column(Integer, nullable=False)
+    item = Column(String(200), nullable=False)
+    categoria = Column(String(50))
+    kcal = Column(Float, nullable=False)
+    proteina_g = Column(Float, nullable=False)
+    carb_g = Column(Float, nullable=False)
+    gordura_g = Column(Float, nullable=False)
+    indice_glicemico = Column(String(10))
+    estimado = Column(Boolean, nullable=False, default=False)
+    cardapio = relationship("Cardapio", back_populates="itens_indexados")
+
+    __table_args__ = (
+        Index('idx_cardapio_itens_plataforma_data', 'plataforma_id', 'data', 'refeicao'),
+        Index('idx_cardapio_itens_cardapio', 'cardapio_id'),
+    )
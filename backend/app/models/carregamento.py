@@ -0,0 +1,37 @@
+"""Perfis de carregamento do Colaborador por endpoint.
+
+Os relacionamentos de Colaborador usam lazy="raise_on_sql": nada alem das colunas
+e carregado por padrao, e cada consulta declara explicitamente o que precisa.
+"""
+from sqlalchemy.orm import load_only, selectinload
+
+from app.models.colaborador import Colaborador
+from app.models.plano_nutricional import PlanoNutricional
+
+# Login/registro: apenas credenciais
+CARREGAMENTO_LOGIN = (
+    load_only(Colaborador.id, Colaborador.matricula, Colaborador.senha_hash),
+)
+
+# Perfil (GET /colaboradores/{id}): dados clinicos exibidos no perfil
+CARREGAMENTO_PERFIL = (
+    selectinload(Colaborador.medicoes),
+    selectinload(Colaborador.condicoes),
+    selectinload(Colaborador.preferencias),
+)
+
+# Tool get_colaborador_profile: condicoes, preferencias e somente o plano ativo
+# (a ultima medicao e buscada a parte, com LIMIT 1)
+CARREGAMENTO_AGENTE = (
+    selectinload(Colaborador.condicoes),
+    selectinload(Colaborador.preferencias),
+    selectinload(Colaborador.planos.and_(PlanoNutricional.ativo == True)),
+)
+
+# Completo: todos os relacionamentos (exclusao em cascata, exportacao)
+CARREGAMENTO_COMPLETO = CARREGAMENTO_PERFIL + (
+    selectinload(Colaborador.planos),
+    selectinload(Colaborador.refeicoes),
+    selectinload(Colaborador.alertas),
+    selectinload(Colaborador.conversas),
+)
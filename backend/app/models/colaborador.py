@@ -21,10 +21,10 @@ class Colaborador(Base):
     senha_hash = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    medicoes = relationship("Medicao", back_populates="colaborador", lazy="selectin", cascade="all, delete-orphan")
-    condicoes = relationship("CondicaoSaude", back_populates="colaborador", lazy="selectin", cascade="all, delete-orphan")
-    preferencias = relationship("PreferenciaAlimentar", back_populates="colaborador", lazy="selectin", cascade="all, delete-orphan")
-    planos = relationship("PlanoNutricional", back_populates="colaborador", lazy="selectin", cascade="all, delete-orphan")
-    refeicoes = relationship("RefeicaoLog", back_populates="colaborador", lazy="selectin", cascade="all, delete-orphan")
-    alertas = relationship("AlertaMedico", back_populates="colaborador", lazy="selectin", cascade="all, delete-orphan")
-    conversas = relationship("ConversaAgente", back_populates="colaborador", lazy="selectin", cascade="all, delete-orphan")
+    medicoes = relationship("Medicao", back_populates="colaborador", lazy="raise_on_sql", cascade="all, delete-orphan")
+    condicoes = relationship("CondicaoSaude", back_populates="colaborador", lazy="raise_on_sql", cascade="all, delete-orphan")
+    preferencias = relationship("PreferenciaAlimentar", back_populates="colaborador", lazy="raise_on_sql", cascade="all, delete-orphan")
+    planos = relationship("PlanoNutricional", back_populates="colaborador", lazy="raise_on_sql", cascade="all, delete-orphan")
+    refeicoes = relationship("RefeicaoLog", back_populates="colaborador", lazy="raise_on_sql", cascade="all, delete-orphan")
+    alertas = relationship("AlertaMedico", back_populates="colaborador", lazy="raise_on_sql", cascade="all, delete-orphan")
+    conversas = relationship("ConversaAgente", back_populates="colaborador", lazy="raise_on_sql", cascade="all, delete-orphan")
@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+
+class ConsumoDiario(Base):
+    """Totais do dia por colaborador, mantidos a cada RefeicaoLog registrado"""
+    __tablename__ = "consumo_diario"
+    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id", ondelete="CASCADE"), primary_key=True)
+    data = Column(Date, primary_key=True)
+    calorias = Column(Integer, nullable=False, default=0)
+    proteina_g = Column(Integer, nullable=False, default=0)
+    carboidratos_g = Column(Integer, nullable=False, default=0)
+    gorduras_g = Column(Integer, nullable=False, default=0)
+    refeicoes = Column(Integer, nullable=False, default=0)
+    # Media de aderencia = soma / registros (refeicoes sem aderencia nao entram)
+    aderencia_soma = Column(Integer, nullable=False, default=0)
+    aderencia_registros = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def aderencia_media(self):
+        return round(self.aderencia_soma / self.aderencia_registros) if self.aderencia_registros else None
@@ -8,12 +8,15 @@ from app.database import Base
 class ConversaAgente(Base):
     __tablename__ = "conversas_agente"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id"), nullable=False, index=True)
+    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id", ondelete="CASCADE"), nullable=False)
+    # Legado: historico agora vive em mensagens_conversa (uma linha por mensagem)
     messages = Column(JSONB, nullable=False, default=list)
+    total_mensagens = Column(Integer, nullable=False, default=0)
     tokens_utilizados = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     colaborador = relationship("Colaborador", back_populates="conversas")
+    mensagens = relationship("MensagemConversa", back_populates="conversa", lazy="raise_on_sql", cascade="all, delete-orphan", passive_deletes=True, order_by="MensagemConversa.ordem")
 
     __table_args__ = (
         Index('ix_conversas_colab_updated', 'colaborador_id', 'updated_at'),
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, Date, Numeric, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Date, Numeric, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -8,7 +8,7 @@ from app.database import Base
 class Medicao(Base):
     __tablename__ = "medicoes"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id"), nullable=False, index=True)
+    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id", ondelete="CASCADE"), nullable=False)
     data_medicao = Column(Date, nullable=False)
     peso_kg = Column(Numeric(5, 2))
     circunferencia_abdominal_cm = Column(Numeric(5, 2))
@@ -22,4 +22,8 @@ class Medicao(Base):
     triglicerides = Column(Numeric(5, 1))
     fonte = Column(String(20), default="auto_relato")
     created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        Index('idx_medicoes_colaborador_data', 'colaborador_id', 'data_medicao'),
+        Index('idx_medicoes_data', 'data_medicao'),
+    )
     colaborador = relationship("Colaborador", back_populates="medicoes")
@@ -0,0 +1,20 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class MensagemConversa(Base):
+    __tablename__ = "mensagens_conversa"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    conversa_id = Column(UUID(as_uuid=True), ForeignKey("conversas_agente.id", ondelete="CASCADE"), nullable=False)
+    ordem = Column(Integer, nullable=False)
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    conversa = relationship("ConversaAgente", back_populates="mensagens")
+
+    __table_args__ = (
+        UniqueConstraint('conversa_id', 'ordem', name='uq_mensagem_conversa_ordem'),
+    )
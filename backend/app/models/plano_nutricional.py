@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Date, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Date, Text, Boolean, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -8,7 +8,7 @@ from app.database import Base
 class PlanoNutricional(Base):
     __tablename__ = "planos_nutricionais"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id"), nullable=False, index=True)
+    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id", ondelete="CASCADE"), nullable=False)
     meta_calorica = Column(Integer, nullable=False)
     proteina_g = Column(Integer, nullable=False)
     carboidratos_g = Column(Integer, nullable=False)
@@ -22,5 +22,9 @@ class PlanoNutricional(Base):
     ativo = Column(Boolean, default=True)
     created_by = Column(String(50), default="nutrioffshore_ai")
     created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        Index('idx_planos_colaborador', 'colaborador_id'),
+        Index('idx_planos_colaborador_ativo', 'colaborador_id', postgresql_where=text('ativo')),
+    )
     colaborador = relationship("Colaborador", back_populates="planos")
-    refeicoes_log = relationship("RefeicaoLog", back_populates="plano", lazy="selectin")
+    refeicoes_log = relationship("RefeicaoLog", back_populates="plano", lazy="raise_on_sql")
@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+
+class UsoTokens(Base):
+    """Ledger de tokens do LLM por colaborador, dia, modelo e rodada de tools do turno"""
+    __tablename__ = "uso_tokens"
+    colaborador_id = Column(UUID(as_uuid=True), ForeignKey("colaboradores.id", ondelete="CASCADE"), primary_key=True)
+    data = Column(Date, primary_key=True)
+    modelo = Column(String(100), primary_key=True)
+    # 0 = primeira chamada do turno; cada rodada de tools soma 1 (a sintese final fica na ultima)
+    rodada = Column(Integer, primary_key=True)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    # Parte de prompt_tokens lida do cache de prefixo do provedor
+    cached_tokens = Column(Integer, nullable=False, default=0)
+    chamadas = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,5 +1,147 @@
-"""Rate limiting configuration for NutriOffshore API"""
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+"""
+NutriOffshore - Rate limiting
+Token bucket por colaborador autenticado (sub do JWT), com fallback para o IP.
+Uma plataforma inteira sai pelo mesmo IP (NAT do satelite): limitar por IP faz a
+tripulacao dividir um unico limite na troca de turno. Rotas que chamam o LLM e
+rotas baratas tem baldes separados. O estado dos baldes fica em um BucketStore:
+memoria por padrao, substituivel por um store compartilhado (ex.: Redis) entre
+instancias.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+import logging
+import math
+import time
 
-limiter = Limiter(key_func=get_remote_address)
+from fastapi import Depends, HTTPException, Request, status
+
+from app.auth import get_current_user
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class Balde:
+    """Rajada maxima (capacidade) e reposicao continua de um tipo de rota"""
+    nome: str
+    capacidade: float
+    por_minuto: float
+
+    @property
+    def taxa(self) -> float:
+        """Tokens repostos por segundo"""
+        return self.por_minuto / 60.0
+
+
+class BucketStore(ABC):
+    """Armazenamento dos baldes usado por RateLimiter"""
+
+    @abstractmethod
+    async def consumir(self, chave: str, capacidade: float, taxa: float, custo: float = 1.0) -> tuple[bool, float, float]:
+        """Repoe e consome `custo` tokens de forma atomica no store (no Redis, um script Lua).
+        Retorna (permitido, tokens restantes, segundos ate haver `custo` tokens)."""
+
+
+class MemoryBucketStore(BucketStore):
+    """Baldes em processo com LRU; um balde descartado volta cheio, o que so favorece o cliente"""
+
+    def __init__(self, max_chaves: int = 10000, relogio: Callable[[], float] = time.monotonic):
+        self.max_chaves = max_chaves
+        self.relogio = relogio
+        self._baldes: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def consumir(self, chave: str, capacidade: float, taxa: float, custo: float = 1.0) -> tuple[bool, float, float]:
+        agora = self.relogio()
+        tokens, ultimo = self._baldes.get(chave, (capacidade, agora))
+        tokens = min(capacidade, tokens + (agora - ultimo) * taxa)
+        permitido = tokens >= custo
+        if permitido:
+            tokens -= custo
+        self._baldes[chave] = (tokens, agora)
+        self._baldes.move_to_end(chave)
+        while len(self._baldes) > self.max_chaves:
+            self._baldes.popitem(last=False)
+        return permitido, tokens, 0.0 if permitido else (custo - tokens) / taxa
+
+    def __len__(self) -> int:
+        return len(self._baldes)
+
+
+class RateLimiter:
+    """Aplica os baldes por cliente; contadores por balde e por tipo de chave para monitoramento"""
+
+    def __init__(self, baldes: list[Balde], store: Optional[BucketStore] = None, fator_ip: float = 1.0):
+        self.baldes = {b.nome: b for b in baldes}
+        self.store = store if store is not None else MemoryBucketStore(settings.RATE_LIMIT_MAX_CHAVES)
+        # Sem sub, o IP pode ser a plataforma inteira: baldes por IP sao fator_ip vezes maiores
+        self.fator_ip = fator_ip
+        self.enabled = True
+        self._contadores = {nome: {"permitidos": 0, "recusados": 0, "recusados_por_ip": 0} for nome in self.baldes}
+
+    @staticmethod
+    def chave(request: Request, current_user: dict) -> tuple[str, str]:
+        """("sub", colaborador) com autenticacao; ("ip", endereco) sem ela"""
+        if not current_user.get("auth_disabled") and current_user.get("sub"):
+            return "sub", str(current_user["sub"])
+        return "ip", request.client.host if request.client else "desconhecido"
+
+    async def verificar(self, nome_balde: str, request: Request, current_user: dict) -> None:
+        if not self.enabled:
+            return
+        balde = self.baldes[nome_balde]
+        tipo, identificador = self.chave(request, current_user)
+        fator = self.fator_ip if tipo == "ip" else 1.0
+        permitido, _, espera = await self.store.consumir(
+            f"{balde.nome}:{tipo}:{identificador}", balde.capacidade * fator, balde.taxa * fator
+        )
+        contadores = self._contadores[nome_balde]
+        if permitido:
+            contadores["permitidos"] += 1
+            return
+        contadores["recusados"] += 1
+        contadores["recusados_por_ip"] += tipo == "ip"
+        logger.debug(f"Rate limit '{nome_balde}' excedido por {tipo}", extra={"path": request.url.path})
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas requisicoes, tente novamente em instantes",
+            headers={"Retry-After": str(max(1, math.ceil(espera)))},
+        )
+
+    def dependencia(self, nome_balde: str) -> Callable:
+        """Dependencia FastAPI que consome um token do balde (reusa o get_current_user da rota)"""
+        if nome_balde not in self.baldes:
+            raise ValueError(f"Balde de rate limit desconhecido: {nome_balde}")
+
+        async def limitar(request: Request, current_user: dict = Depends(get_current_user)) -> None:
+            await self.verificar(nome_balde, request, current_user)
+
+        return limitar
+
+    def metricas(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "baldes": {
+                nome: {"capacidade": b.capacidade, "por_minuto": b.por_minuto, **self._contadores[nome]}
+                for nome, b in self.baldes.items()
+            },
+            "fator_ip": self.fator_ip,
+            "chaves": len(self.store) if isinstance(self.store, MemoryBucketStore) else None,
+        }
+
+
+limiter = RateLimiter(
+    [
+        Balde("llm", settings.RATE_LIMIT_LLM_RAJADA, settings.RATE_LIMIT_LLM_POR_MINUTO),
+        Balde("leve", settings.RATE_LIMIT_LEVE_RAJADA, settings.RATE_LIMIT_LEVE_POR_MINUTO),
+    ],
+    fator_ip=settings.RATE_LIMIT_FATOR_IP,
+)
+
+
+def limitar(nome_balde: str) -> Callable:
+    """Uso: @router.post(..., dependencies=[Depends(limitar("llm"))])"""
+    return limiter.dependencia(nome_balde)
@@ -1,7 +1,7 @@
 """Rotas de Alertas Médicos"""
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, literal
 from uuid import UUID
 from datetime import datetime
 
@@ -19,9 +19,11 @@ async def listar_alertas(
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
+    # Status inline no SQL: com parametro o plano generico do prepared statement
+    # nao pode usar o indice parcial de alertas abertos (idx_alertas_abertos)
     stmt = (
         select(AlertaMedico)
-        .where(AlertaMedico.status == status)
+        .where(AlertaMedico.status == literal(status, literal_execute=True))
         .order_by(AlertaMedico.created_at.desc())
         .limit(limit)
     )
@@ -7,7 +7,8 @@ from pydantic import BaseModel, Field
 
 from app.database import get_db
 from app.models.colaborador import Colaborador
-from app.auth import create_access_token, hash_password, verify_password
+from app.models.carregamento import CARREGAMENTO_LOGIN
+from app.auth import create_access_token, hash_password_async, verify_password_async
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +34,7 @@ class TokenResponse(BaseModel):
 @router.post("/login", response_model=TokenResponse)
 async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
     """Autentica colaborador por matricula e senha, retorna JWT."""
-    stmt = select(Colaborador).where(Colaborador.matricula == data.matricula)
+    stmt = select(Colaborador).options(*CARREGAMENTO_LOGIN).where(Colaborador.matricula == data.matricula)
     result = await db.execute(stmt)
     colaborador = result.scalar_one_or_none()
 
@@ -43,7 +44,7 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
             detail="Matricula ou senha invalida",
         )
 
-    if not verify_password(data.senha, colaborador.senha_hash):
+    if not await verify_password_async(data.senha, colaborador.senha_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Matricula ou senha invalida",
@@ -60,14 +61,14 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
 async def register(data: RegisterRequest, db: AsyncSession = Depends(get_db)):
     """Registra novo colaborador com senha e retorna JWT."""
     # Verificar se matricula ja existe
-    stmt = select(Colaborador).where(Colaborador.matricula == data.matricula)
+    stmt = select(Colaborador).options(*CARREGAMENTO_LOGIN).where(Colaborador.matricula == data.matricula)
     result = await db.execute(stmt)
     existing = result.scalar_one_or_none()
 
     if existing:
         # Se ja existe mas nao tem senha, permitir definir senha
         if not existing.senha_hash:
-            existing.senha_hash = hash_password(data.senha)
+            existing.senha_hash = await hash_password_async(data.senha)
             await db.commit()
             token = create_access_token(
                 data={"sub": str(existing.id), "matricula": existing.matricula}
@@ -83,10 +84,11 @@ async def register(data: RegisterRequest, db: AsyncSession = Depends(get_db)):
     # Campos obrigatorios recebem valores padrao temporarios
     from datetime import date
 
+    senha_hash = await hash_password_async(data.senha)
     colaborador = Colaborador(
         matricula=data.matricula,
         nome=data.nome,
-        senha_hash=hash_password(data.senha),
+        senha_hash=senha_hash,
         data_nascimento=date(2000, 1, 1),  # Placeholder — atualizar no perfil
         sexo="M",  # Placeholder — atualizar no perfil
     )
@@ -1,7 +1,6 @@
 """Rotas de Cardápios do Refeitório"""
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
 from uuid import UUID
 from datetime import date, timedelta
 
@@ -9,6 +8,9 @@ from app.database import get_db
 from app.auth import get_current_user
 from app.models.cardapio import Cardapio
 from app.schemas.cardapio import CardapioCreate, CardapioResponse
+from app.services.cache_service import resposta_cache
+from app.services.cardapio_service import buscar_cardapios, indexar, nutricao_refeicao
+from app.services.otimizador_service import sugerir_para_colaborador
 
 router = APIRouter()
 
@@ -25,9 +27,13 @@ async def criar_cardapio(
         refeicao=data.refeicao,
         itens=[item.model_dump() for item in data.itens],
     )
+    # Kcal/macros por item e por refeicao calculados uma vez, na ingestao
+    indexar(cardapio)
     db.add(cardapio)
     await db.commit()
     await db.refresh(cardapio)
+    # Respostas do agente sobre o cardapio do dia ficam desatualizadas
+    await resposta_cache.limpar()
     return cardapio
 
 
@@ -39,16 +45,12 @@ async def cardapio_do_dia(
     current_user: dict = Depends(get_current_user),
 ):
     data_cardapio = date.fromisoformat(data_str)
-    stmt = select(Cardapio).where(Cardapio.data == data_cardapio)
-    if plataforma_id:
-        stmt = stmt.where(Cardapio.plataforma_id == plataforma_id)
-
-    result = await db.execute(stmt)
-    cardapios = result.scalars().all()
+    cardapios = await buscar_cardapios(db, data_cardapio, plataforma_id=plataforma_id)
 
     refeicoes = {}
     for c in cardapios:
-        refeicoes[c.refeicao] = {"id": str(c.id), "itens": c.itens}
+        itens, totais = nutricao_refeicao(c)
+        refeicoes[c.refeicao] = {"id": str(c.id), "itens": [i.to_dict() for i in itens], "totais": totais}
 
     return {"data": data_str, "refeicoes": refeicoes}
 
@@ -63,21 +65,36 @@ async def cardapio_semana(
     inicio = hoje - timedelta(days=hoje.weekday())
     fim = inicio + timedelta(days=6)
 
-    stmt = select(Cardapio).where(
-        and_(Cardapio.data >= inicio, Cardapio.data <= fim)
-    ).order_by(Cardapio.data)
-
-    if plataforma_id:
-        stmt = stmt.where(Cardapio.plataforma_id == plataforma_id)
-
-    result = await db.execute(stmt)
-    cardapios = result.scalars().all()
+    cardapios = await buscar_cardapios(db, inicio, fim, plataforma_id=plataforma_id)
 
     semana = {}
+    totais_semana = {}
     for c in cardapios:
         dia = str(c.data)
         if dia not in semana:
             semana[dia] = {}
-        semana[dia][c.refeicao] = c.itens
+            totais_semana[dia] = {}
+        itens, totais = nutricao_refeicao(c)
+        semana[dia][c.refeicao] = [i.to_dict() for i in itens]
+        totais_semana[dia][c.refeicao] = totais
+
+    return {"inicio": str(inicio), "fim": str(fim), "cardapios": semana, "totais": totais_semana}
+
 
-    return {"inicio": str(inicio), "fim": str(fim), "cardapios": semana}
+@router.get("/dia/{data_str}/sugestao/{colaborador_id}")
+async def sugestao_do_dia(
+    data_str: str,
+    colaborador_id: UUID,
+    plataforma_id: UUID = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Itens e porcoes do cardapio do dia que atendem o plano ativo do colaborador"""
+    if not current_user.get("auth_disabled") and str(colaborador_id) != current_user["sub"]:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    sugestao = await sugerir_para_colaborador(db, colaborador_id, date.fromisoformat(data_str), plataforma_id)
+    if "plataformas" in sugestao:
+        raise HTTPException(status_code=422, detail=sugestao)
+    if "error" in sugestao:
+        raise HTTPException(status_code=404, detail=sugestao["error"])
+    return sugestao
@@ -1,19 +1,24 @@
 """Rotas de Chat com Agente AI NutriOffshore"""
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 from uuid import UUID
-import json
 import logging
 
 from app.database import get_db
 from app.auth import get_current_user
 from app.services.agent_service import AgentService
-from app.rate_limit import limiter
+from app.services.sse_service import SSEStream
+from app.services.admissao_service import FilaCheia, Senha, controle_admissao
+from app.services.tokens_service import nivel_orcamento, registro_tokens, uso_periodo
+from app.config import get_settings
+from app.rate_limit import limitar
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 router = APIRouter()
 
@@ -38,70 +43,88 @@ def _verify_colaborador_ownership(data: ChatMessage, current_user: dict) -> None
         raise HTTPException(status_code=403, detail="Acesso negado: colaborador_id nao corresponde ao usuario autenticado")
 
 
-@router.post("/mensagem", response_model=ChatResponse)
-@limiter.limit("10/minute")
+def _recusa(e: FilaCheia) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Muitas conversas em andamento, tente novamente em instantes",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def _solicitar_vaga(data: ChatMessage) -> Senha:
+    """Vaga no controle de admissao do LLM; recusa com 429 + Retry-After se a fila nao comporta"""
+    try:
+        return controle_admissao.solicitar(str(data.colaborador_id))
+    except FilaCheia as e:
+        raise _recusa(e)
+
+
+async def _liberar_vaga(senha: Senha) -> None:
+    senha.liberar()
+
+
+@router.post("/mensagem", response_model=ChatResponse, dependencies=[Depends(limitar("llm"))])
 async def enviar_mensagem(
-    request: Request,
     data: ChatMessage,
-    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """Envia mensagem para o agente NutriOffshore e recebe resposta"""
     _verify_colaborador_ownership(data, current_user)
+    senha = _solicitar_vaga(data)
     try:
-        agent = AgentService(db)
+        # Sem sessao do request: o agente abre sessoes curtas e nao segura conexao durante o LLM
+        agent = AgentService()
         resultado = await agent.processar_mensagem(
             colaborador_id=str(data.colaborador_id),
             mensagem=data.mensagem,
             conversa_id=str(data.conversa_id) if data.conversa_id else None,
+            senha=senha,
         )
         return ChatResponse(
             resposta=resultado["resposta"],
             conversa_id=resultado["conversa_id"],
             tokens_utilizados=resultado.get("tokens"),
         )
+    except FilaCheia as e:
+        raise _recusa(e)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Erro no chat: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Erro interno ao processar mensagem")
+    finally:
+        senha.liberar()
 
 
-@router.post("/mensagem/stream")
-@limiter.limit("10/minute")
+@router.post("/mensagem/stream", dependencies=[Depends(limitar("llm"))])
 async def enviar_mensagem_stream(
     request: Request,
     data: ChatMessage,
-    db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """Envia mensagem com resposta em streaming"""
     _verify_colaborador_ownership(data, current_user)
-    agent = AgentService(db)
-
-    async def generate():
-        try:
-            async for chunk in agent.processar_mensagem_stream(
-                colaborador_id=str(data.colaborador_id),
-                mensagem=data.mensagem,
-                conversa_id=str(data.conversa_id) if data.conversa_id else None,
-            ):
-                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
-        except Exception as e:
-            logger.error(f"Erro no streaming: {e}", exc_info=True)
-            error_payload = {"type": "error", "content": "Erro interno ao processar mensagem"}
-            yield f"data: {json.dumps(error_payload, ensure_ascii=False)}\n\n"
-        yield "data: [DONE]\n\n"
-
-    return StreamingResponse(generate(), media_type="text/event-stream")
-
-
-@router.get("/historico/{colaborador_id}")
-@limiter.limit("60/minute")
+    senha = _solicitar_vaga(data)
+    agent = AgentService()
+    eventos = agent.processar_mensagem_stream(
+        colaborador_id=str(data.colaborador_id),
+        mensagem=data.mensagem,
+        conversa_id=str(data.conversa_id) if data.conversa_id else None,
+        senha=senha,
+    )
+    # O agente devolve a vaga ao terminar o LLM; o background cobre o stream que nem chegou a rodar
+    return StreamingResponse(
+        SSEStream(eventos, request).frames_sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(_liberar_vaga, senha),
+    )
+
+
+@router.get("/historico/{colaborador_id}", dependencies=[Depends(limitar("leve"))])
 async def historico_conversas(
-    request: Request,
     colaborador_id: UUID,
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
@@ -112,17 +135,44 @@ async def historico_conversas(
     return await agent.listar_conversas(str(colaborador_id), limit)
 
 
-@router.get("/conversa/{conversa_id}")
-@limiter.limit("60/minute")
+@router.get("/conversa/{conversa_id}", dependencies=[Depends(limitar("leve"))])
 async def buscar_conversa(
-    request: Request,
     conversa_id: UUID,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    antes_de: Optional[int] = Query(None, ge=1),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
-    """Busca uma conversa específica"""
+    """Busca uma conversa específica.
+    Sem limit nem antes_de devolve o historico inteiro; com eles, paginas de ate `limit`
+    mensagens (50 por padrao) antes de antes_de: use proximo_cursor como o proximo antes_de."""
+    if limit is None and antes_de is not None:
+        limit = 50
     agent = AgentService(db)
-    conversa = await agent.buscar_conversa(str(conversa_id))
+    conversa = await agent.buscar_conversa(str(conversa_id), limit=limit, antes_de=antes_de)
     if not conversa:
         raise HTTPException(status_code=404, detail="Conversa não encontrada")
     return conversa
+
+
+@router.get("/uso/{colaborador_id}", dependencies=[Depends(limitar("leve"))])
+async def uso_tokens(
+    colaborador_id: UUID,
+    dias: int = 7,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Consumo de tokens do LLM (por dia, modelo e rodada de tools) e orcamento de hoje"""
+    if not current_user.get("auth_disabled") and str(colaborador_id) != current_user["sub"]:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    consumo = await registro_tokens.consumo_hoje(str(colaborador_id))
+    return {
+        "colaborador_id": str(colaborador_id),
+        "hoje": {
+            "tokens": consumo,
+            "nivel": nivel_orcamento(consumo),
+            "orcamento_soft": settings.TOKENS_ORCAMENTO_DIARIO_SOFT,
+            "orcamento_hard": settings.TOKENS_ORCAMENTO_DIARIO_HARD,
+        },
+        **await uso_periodo(db, colaborador_id, min(max(dias, 1), 90)),
+    }
@@ -2,16 +2,17 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from uuid import UUID
 from datetime import date
 
 from app.database import get_db
 from app.auth import get_current_user
 from app.models.colaborador import Colaborador
+from app.models.carregamento import CARREGAMENTO_PERFIL, CARREGAMENTO_COMPLETO
 from app.models.medicao import Medicao
 from app.models.condicao_saude import CondicaoSaude
 from app.models.preferencia_alimentar import PreferenciaAlimentar
+from app.services.cache_service import invalidar_colaborador
 from app.schemas.colaborador import (
     ColaboradorCreate, ColaboradorUpdate, ColaboradorResponse,
     ColaboradorFullResponse, MedicaoSchema, CondicaoSaudeSchema, PreferenciaSchema
@@ -78,11 +79,7 @@ async def buscar_colaborador(
     _check_ownership(colaborador_id, current_user)
     stmt = (
         select(Colaborador)
-        .options(
-            selectinload(Colaborador.medicoes),
-            selectinload(Colaborador.condicoes),
-            selectinload(Colaborador.preferencias),
-        )
+        .options(*CARREGAMENTO_PERFIL)
         .where(Colaborador.id == colaborador_id)
     )
     result = await db.execute(stmt)
@@ -110,6 +107,7 @@ async def atualizar_colaborador(
         setattr(colaborador, field, value)
 
     await db.commit()
+    await invalidar_colaborador(colaborador_id)
     await db.refresh(colaborador)
     return colaborador
 
@@ -121,13 +119,14 @@ async def deletar_colaborador(
     current_user: dict = Depends(get_current_user),
 ):
     _check_ownership(colaborador_id, current_user)
-    stmt = select(Colaborador).where(Colaborador.id == colaborador_id)
+    stmt = select(Colaborador).options(*CARREGAMENTO_COMPLETO).where(Colaborador.id == colaborador_id)
     result = await db.execute(stmt)
     colaborador = result.scalar_one_or_none()
     if not colaborador:
         raise HTTPException(status_code=404, detail="Colaborador não encontrado")
     await db.delete(colaborador)
     await db.commit()
+    await invalidar_colaborador(colaborador_id)
 
 
 @router.post("/{colaborador_id}/medicoes", status_code=201)
@@ -141,6 +140,7 @@ async def registrar_medicao(
     medicao = Medicao(colaborador_id=colaborador_id, **data.model_dump())
     db.add(medicao)
     await db.commit()
+    await invalidar_colaborador(colaborador_id)
     await db.refresh(medicao)
     return {"id": str(medicao.id), "mensagem": "Medição registrada"}
 
@@ -194,6 +194,7 @@ async def registrar_condicao(
     condicao = CondicaoSaude(colaborador_id=colaborador_id, **data.model_dump())
     db.add(condicao)
     await db.commit()
+    await invalidar_colaborador(colaborador_id)
     return {"mensagem": "Condição de saúde registrada"}
 
 
@@ -208,4 +209,5 @@ async def registrar_preferencia(
     pref = PreferenciaAlimentar(colaborador_id=colaborador_id, **data.model_dump())
     db.add(pref)
     await db.commit()
+    await invalidar_colaborador(colaborador_id)
     return {"mensagem": "Preferência registrada"}
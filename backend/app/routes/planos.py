@@ -8,6 +8,7 @@ from app.database import get_db
 from app.auth import get_current_user
 from app.models.plano_nutricional import PlanoNutricional
 from app.schemas.plano import PlanoCreate, PlanoUpdate, PlanoResponse
+from app.services.cache_service import invalidar_colaborador
 
 router = APIRouter()
 
@@ -29,6 +30,7 @@ async def criar_plano(
     novo_plano = PlanoNutricional(**data.model_dump())
     db.add(novo_plano)
     await db.commit()
+    await invalidar_colaborador(data.colaborador_id)
     await db.refresh(novo_plano)
     return novo_plano
 
@@ -81,6 +83,7 @@ async def atualizar_plano(
         setattr(plano, field, value)
 
     await db.commit()
+    await invalidar_colaborador(plano.colaborador_id)
     await db.refresh(plano)
     return plano
 
@@ -98,3 +101,4 @@ async def deletar_plano(
         raise HTTPException(status_code=404, detail="Plano não encontrado")
     await db.delete(plano)
     await db.commit()
+    await invalidar_colaborador(plano.colaborador_id)
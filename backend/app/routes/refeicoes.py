@@ -1,17 +1,23 @@
 """Rotas de Registro de Refeições"""
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_
 from uuid import UUID
 from datetime import date, timedelta
 
 from app.database import get_db
 from app.auth import get_current_user
 from app.models.refeicao_log import RefeicaoLog
-from app.schemas.refeicao import RefeicaoLogCreate, RefeicaoLogResponse, ResumoDiario
+from app.models.consumo_diario import ConsumoDiario
+from app.schemas.refeicao import RefeicaoLogCreate, RefeicaoLogResponse, ResumoDiario, ConsumoPeriodo
+from app.services.cache_service import invalidar_colaborador
+from app.services.consumo_service import acumular_refeicao, consumo_periodo, resumo_dia
 
 router = APIRouter()
 
+# Limite do endpoint de periodo (uma linha do agregado por dia)
+MAX_DIAS_PERIODO = 731
+
 
 @router.post("/", response_model=RefeicaoLogResponse, status_code=201)
 async def registrar_refeicao(
@@ -35,7 +41,10 @@ async def registrar_refeicao(
         observacoes=data.observacoes,
     )
     db.add(log)
+    await db.flush()
+    await acumular_refeicao(db, log)
     await db.commit()
+    await invalidar_colaborador(data.colaborador_id)
     await db.refresh(log)
     return log
 
@@ -55,11 +64,7 @@ async def refeicoes_do_dia(
     )
     result = await db.execute(stmt)
     refeicoes = result.scalars().all()
-
-    total_cal = sum(r.calorias_estimadas or 0 for r in refeicoes)
-    total_prot = sum(r.proteina_g or 0 for r in refeicoes)
-    total_carb = sum(r.carboidratos_g or 0 for r in refeicoes)
-    total_gord = sum(r.gorduras_g or 0 for r in refeicoes)
+    dia = await db.get(ConsumoDiario, (colaborador_id, data_ref))
 
     return {
         "data": data_str,
@@ -74,10 +79,10 @@ async def refeicoes_do_dia(
             for r in refeicoes
         ],
         "totais": {
-            "calorias": total_cal,
-            "proteina_g": total_prot,
-            "carboidratos_g": total_carb,
-            "gorduras_g": total_gord,
+            "calorias": dia.calorias if dia else 0,
+            "proteina_g": dia.proteina_g if dia else 0,
+            "carboidratos_g": dia.carboidratos_g if dia else 0,
+            "gorduras_g": dia.gorduras_g if dia else 0,
         },
     }
 
@@ -91,36 +96,50 @@ async def resumo_semanal(
     hoje = date.today()
     inicio = hoje - timedelta(days=6)
 
-    stmt = (
-        select(RefeicaoLog)
-        .where(
-            and_(
-                RefeicaoLog.colaborador_id == colaborador_id,
-                RefeicaoLog.data >= inicio,
-            )
-        )
-        .order_by(RefeicaoLog.data)
-    )
-    result = await db.execute(stmt)
-    refeicoes = result.scalars().all()
+    dias = {
+        str(c.data): {
+            "calorias": c.calorias,
+            "proteina": c.proteina_g,
+            "carbs": c.carboidratos_g,
+            "gordura": c.gorduras_g,
+            "refeicoes": c.refeicoes,
+            "aderencia_media": c.aderencia_media,
+        }
+        for c in await consumo_periodo(db, colaborador_id, inicio, hoje)
+    }
 
-    dias = {}
-    for r in refeicoes:
-        dia = str(r.data)
-        if dia not in dias:
-            dias[dia] = {"calorias": 0, "proteina": 0, "carbs": 0, "gordura": 0, "refeicoes": 0, "aderencia": []}
-        dias[dia]["calorias"] += r.calorias_estimadas or 0
-        dias[dia]["proteina"] += r.proteina_g or 0
-        dias[dia]["carbs"] += r.carboidratos_g or 0
-        dias[dia]["gordura"] += r.gorduras_g or 0
-        dias[dia]["refeicoes"] += 1
-        if r.aderencia_percentual:
-            dias[dia]["aderencia"].append(r.aderencia_percentual)
+    return {"colaborador_id": str(colaborador_id), "periodo": f"{inicio} a {hoje}", "dias": dias}
 
-    # Calcular média de aderência por dia
-    for dia in dias:
-        ad = dias[dia]["aderencia"]
-        dias[dia]["aderencia_media"] = round(sum(ad) / len(ad)) if ad else None
-        del dias[dia]["aderencia"]
 
-    return {"colaborador_id": str(colaborador_id), "periodo": f"{inicio} a {hoje}", "dias": dias}
+@router.get("/colaborador/{colaborador_id}/consumo", response_model=ConsumoPeriodo)
+async def consumo_do_periodo(
+    colaborador_id: UUID,
+    inicio: date,
+    fim: date = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Totais por dia e do periodo [inicio, fim] (padrao: ate hoje), lidos do agregado diario"""
+    fim = fim or date.today()
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="Data final anterior a data inicial")
+    if (fim - inicio).days > MAX_DIAS_PERIODO:
+        raise HTTPException(status_code=400, detail=f"Periodo maximo de {MAX_DIAS_PERIODO} dias")
+
+    dias = await consumo_periodo(db, colaborador_id, inicio, fim)
+    aderencia_registros = sum(c.aderencia_registros for c in dias)
+    total_calorias = sum(c.calorias for c in dias)
+    return {
+        "colaborador_id": colaborador_id,
+        "inicio": inicio,
+        "fim": fim,
+        "dias_registrados": len(dias),
+        "total_calorias": total_calorias,
+        "total_proteina_g": sum(c.proteina_g for c in dias),
+        "total_carboidratos_g": sum(c.carboidratos_g for c in dias),
+        "total_gorduras_g": sum(c.gorduras_g for c in dias),
+        "refeicoes_registradas": sum(c.refeicoes for c in dias),
+        "media_calorias_dia": round(total_calorias / len(dias)) if dias else None,
+        "aderencia_media": round(sum(c.aderencia_soma for c in dias) / aderencia_registros) if aderencia_registros else None,
+        "dias": [resumo_dia(c) for c in dias],
+    }
@@ -24,6 +24,10 @@ class CardapioResponse(BaseModel):
     data: date
     refeicao: str
     itens: Any
+    kcal_total: Optional[float] = None
+    proteina_total_g: Optional[float] = None
+    carb_total_g: Optional[float] = None
+    gordura_total_g: Optional[float] = None
     created_at: datetime
     class Config:
         from_attributes = True
@@ -42,3 +42,17 @@ class ResumoDiario(BaseModel):
     total_gorduras_g: int = 0
     refeicoes_registradas: int = 0
     aderencia_media: Optional[int] = None
+
+class ConsumoPeriodo(BaseModel):
+    colaborador_id: UUID
+    inicio: date
+    fim: date
+    dias_registrados: int = 0
+    total_calorias: int = 0
+    total_proteina_g: int = 0
+    total_carboidratos_g: int = 0
+    total_gorduras_g: int = 0
+    refeicoes_registradas: int = 0
+    media_calorias_dia: Optional[int] = None
+    aderencia_media: Optional[int] = None
+    dias: List[ResumoDiario] = []
@@ -0,0 +1,235 @@
+"""
+NutriOffshore - Controle de Admissao do LLM
+Limita os turnos de chat com LLM em andamento (LLM_ADMISSAO_MAX_CONCORRENTES) para
+nao estourar o rate limit do OpenRouter free tier em rajada. Quem chega com todas
+as vagas ocupadas espera em uma fila justa: uma fila por colaborador, atendidas em
+rodizio, entao quem manda varias mensagens nao passa na frente dos outros. Se a
+espera estimada (ou a real) passar de LLM_ADMISSAO_PRAZO_S, a requisicao e
+recusada com Retry-After em vez de virar 429 do provedor no meio do turno.
+"""
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import asyncio
+import logging
+import math
+import time
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Intervalo para reenviar a posicao na fila enquanto ela nao muda
+INTERVALO_POSICAO_S = 1.0
+
+
+class FilaCheia(Exception):
+    """Requisicao recusada pela admissao; retry_after em segundos"""
+
+    def __init__(self, retry_after: float, motivo: str):
+        super().__init__(motivo)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.motivo = motivo
+
+
+class Senha:
+    """Lugar de um turno no controle: na fila, admitido ou liberado"""
+
+    def __init__(self, controle: "ControleAdmissao", usuario: str, admitida: bool):
+        self.controle = controle
+        self.usuario = usuario
+        self.criada = time.monotonic()
+        self.admitida_em: Optional[float] = self.criada if admitida else None
+        self.liberada = False
+        # So turnos que chegaram a usar a vaga entram na media de duracao (resposta do cache nao)
+        self.usada = False
+        self._vez: asyncio.Future = asyncio.get_running_loop().create_future()
+        if admitida:
+            self._vez.set_result(None)
+
+    @property
+    def admitida(self) -> bool:
+        return self.admitida_em is not None
+
+    async def aguardar(self) -> AsyncIterator[int]:
+        """Gera a posicao na fila (1 = proximo) ate ser admitida. Levanta FilaCheia se o prazo vencer."""
+        prazo = self.criada + self.controle.prazo_s
+        ultima = None
+        while not self._vez.done():
+            posicao = self.controle.posicao(self)
+            if posicao != ultima:
+                ultima = posicao
+                yield posicao
+            restante = prazo - time.monotonic()
+            if self._vez.done():
+                break
+            if restante <= 0:
+                self.controle._expirar(self)
+                raise FilaCheia(self.controle.espera_estimada(posicao), "prazo da fila esgotado")
+            try:
+                await asyncio.wait_for(asyncio.shield(self._vez), timeout=min(INTERVALO_POSICAO_S, restante))
+            except asyncio.TimeoutError:
+                pass
+        self.usada = True
+
+    async def esperar(self) -> None:
+        """aguardar() sem as posicoes"""
+        async for _ in self.aguardar():
+            pass
+
+    def liberar(self) -> None:
+        """Devolve a vaga (ou sai da fila). Idempotente; chamar sempre em finally."""
+        if not self.liberada:
+            self.liberada = True
+            self.controle._liberar(self)
+
+
+class ControleAdmissao:
+    """Vagas globais para turnos com LLM e fila justa por colaborador"""
+
+    def __init__(
+        self,
+        max_concorrentes: int,
+        prazo_s: float,
+        max_fila: int,
+        max_por_usuario: int,
+        duracao_inicial_s: float,
+    ):
+        self.max_concorrentes = max_concorrentes
+        self.prazo_s = prazo_s
+        self.max_fila = max_fila
+        self.max_por_usuario = max_por_usuario
+        self.ativos = 0
+        # Rodizio: o primeiro usuario da vez e atendido e vai para o fim se ainda tiver senhas
+        self._filas: OrderedDict[str, deque[Senha]] = OrderedDict()
+        self.na_fila = 0
+        # Media movel da duracao de um turno, para estimar a espera
+        self.duracao_media_s = duracao_inicial_s
+        self.admitidos = 0
+        self.enfileirados = 0
+        self.recusados = 0
+        self.expirados = 0
+        self.desistencias = 0
+        self.atendidos_da_fila = 0
+        self.espera_total_s = 0.0
+
+    def espera_estimada(self, posicao: int) -> float:
+        """Segundos ate a vaga de quem esta na posicao (1 = proximo)"""
+        return math.ceil(posicao / self.max_concorrentes) * self.duracao_media_s
+
+    def posicao(self, senha: Senha) -> int:
+        """Posicao atual da senha no rodizio (1 = proxima a ser admitida); 0 fora da fila"""
+        fila = self._filas.get(senha.usuario)
+        if senha.admitida or fila is None or senha not in fila:
+            return 0
+        k = fila.index(senha)
+        # Rodadas 0..k-1 completas, mais os usuarios antes deste no rodizio na rodada k
+        posicao = 1
+        antes = True
+        for usuario, f in self._filas.items():
+            antes = antes and usuario != senha.usuario
+            posicao += min(len(f), k) + (antes and len(f) > k)
+        return posicao
+
+    def solicitar(self, usuario: str) -> Senha:
+        """Admite na hora se houver vaga livre e fila vazia; senao enfileira ou levanta FilaCheia"""
+        if self.ativos < self.max_concorrentes and not self.na_fila:
+            self.ativos += 1
+            self.admitidos += 1
+            return Senha(self, usuario, admitida=True)
+
+        fila = self._filas.get(usuario)
+        if self.na_fila >= self.max_fila or (fila is not None and len(fila) >= self.max_por_usuario):
+            raise self._recusar(self.espera_estimada(self.na_fila + 1), "fila cheia")
+        if fila is None:
+            fila = self._filas[usuario] = deque()
+        senha = Senha(self, usuario, admitida=False)
+        fila.append(senha)
+        self.na_fila += 1
+        espera = self.espera_estimada(self.posicao(senha))
+        if espera > self.prazo_s:
+            self._remover(senha)
+            raise self._recusar(espera, "espera estimada acima do prazo")
+        self.enfileirados += 1
+        return senha
+
+    def _recusar(self, espera: float, motivo: str) -> FilaCheia:
+        self.recusados += 1
+        logger.info(f"Admissao LLM recusada ({motivo}): {self.ativos} ativos, {self.na_fila} na fila, espera ~{espera:.0f}s")
+        return FilaCheia(espera, motivo)
+
+    @asynccontextmanager
+    async def admitir(self, usuario: str) -> AsyncIterator[Senha]:
+        """Espera a vaga (sem eventos de posicao) e libera ao sair"""
+        senha = self.solicitar(usuario)
+        try:
+            await senha.esperar()
+            yield senha
+        finally:
+            senha.liberar()
+
+    def _remover(self, senha: Senha) -> None:
+        fila = self._filas.get(senha.usuario)
+        if fila is not None and senha in fila:
+            fila.remove(senha)
+            self.na_fila -= 1
+            if not fila:
+                del self._filas[senha.usuario]
+
+    def _expirar(self, senha: Senha) -> None:
+        self._remover(senha)
+        senha.liberada = True
+        self.expirados += 1
+
+    def _liberar(self, senha: Senha) -> None:
+        if not senha.admitida:
+            # Desistiu na fila (cliente desconectou, resposta veio do cache)
+            self._remover(senha)
+            self.desistencias += 1
+            return
+        self.ativos -= 1
+        if senha.usada:
+            duracao = time.monotonic() - senha.admitida_em
+            self.duracao_media_s = 0.8 * self.duracao_media_s + 0.2 * duracao
+        self._despachar()
+
+    def _despachar(self) -> None:
+        while self.ativos < self.max_concorrentes and self._filas:
+            usuario, fila = next(iter(self._filas.items()))
+            senha = fila.popleft()
+            self.na_fila -= 1
+            if fila:
+                self._filas.move_to_end(usuario)
+            else:
+                del self._filas[usuario]
+            self.ativos += 1
+            self.admitidos += 1
+            senha.admitida_em = time.monotonic()
+            self.atendidos_da_fila += 1
+            self.espera_total_s += senha.admitida_em - senha.criada
+            senha._vez.set_result(None)
+
+    def metricas(self) -> dict:
+        return {
+            "max_concorrentes": self.max_concorrentes,
+            "ativos": self.ativos,
+            "na_fila": self.na_fila,
+            "usuarios_na_fila": len(self._filas),
+            "admitidos": self.admitidos,
+            "enfileirados": self.enfileirados,
+            "recusados": self.recusados,
+            "expirados": self.expirados,
+            "desistencias": self.desistencias,
+            "espera_media_s": round(self.espera_total_s / self.atendidos_da_fila, 2) if self.atendidos_da_fila else 0.0,
+            "duracao_media_s": round(self.duracao_media_s, 2),
+        }
+
+
+controle_admissao = ControleAdmissao(
+    max_concorrentes=settings.LLM_ADMISSAO_MAX_CONCORRENTES,
+    prazo_s=settings.LLM_ADMISSAO_PRAZO_S,
+    max_fila=settings.LLM_ADMISSAO_MAX_FILA,
+    max_por_usuario=settings.LLM_ADMISSAO_MAX_POR_USUARIO,
+    duracao_inicial_s=settings.LLM_ADMISSAO_DURACAO_INICIAL_S,
+)
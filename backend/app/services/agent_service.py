@@ -2,254 +2,292 @@
 NutriOffshore - Servico do Agente AI
 Integracao com OpenRouter via OpenAI SDK (modelos gratuitos)
 """
-import openai
 import json
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, AsyncIterator, Optional
 from uuid import UUID, uuid4
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, update, func
+from sqlalchemy.orm import defer
 
 from app.config import get_settings
+from app.database import async_session
 from app.models.conversa import ConversaAgente
-from app.agent.system_prompt import SYSTEM_PROMPT
-from app.agent.tools_definition import TOOLS
-from app.services.tools_handler import ToolsHandler
+from app.models.mensagem_conversa import MensagemConversa
+from app.agent.system_prompt import mensagens_iniciais
+from app.services.tools_handler import ToolsHandler, TOOLS_SOMENTE_LEITURA
+from app.services.context_window import ContextWindow, resumo_extrativo
+from app.services.cache_service import resposta_cache
+from app.services.llm_service import model_router, modelos_economicos
+from app.services.selecao_tools import seletor_tools
+from app.services.tokens_service import ECONOMICO, ESGOTADO, NORMAL, nivel_orcamento, registro_tokens
+from app.services.admissao_service import FilaCheia, Senha
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+MENSAGEM_ORCAMENTO_ESGOTADO = (
+    "Voce atingiu o limite diario de uso do assistente. Seus registros de refeicao e seu plano "
+    "continuam disponiveis no app; o assistente volta a responder normalmente amanha."
+)
+
 
 class AgentService:
-    """Servico principal do agente NutriOffshore via OpenRouter"""
+    """Servico principal do agente NutriOffshore via OpenRouter.
+
+    Sem `db`, cada bloco de trabalho no banco (carregar historico, executar uma
+    tool, persistir o turno) usa uma sessao curta propria, e nenhuma conexao do
+    pool fica presa enquanto o LLM responde.
+    """
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: Optional[AsyncSession] = None):
         self.db = db
-        self.client = openai.AsyncOpenAI(
-            base_url=settings.OPENROUTER_BASE_URL,
-            api_key=settings.OPENROUTER_API_KEY,
-        )
+        self.router = model_router
         self.tools_handler = ToolsHandler(db)
-        self.model = settings.OPENROUTER_MODEL
         self.max_tool_rounds = 8
-
-    def _trim_messages(self, messages: list, max_tokens: int = 12000) -> list:
-        """Token-aware sliding window: trims conversation history to stay under max_tokens.
-
-        Always keeps the system message (index 0) and the last user message.
-        Estimates tokens as len(text) / 4 per message content.
-        Removes oldest non-system messages until total is under limit.
-        """
-        def estimate_tokens(msg: dict) -> int:
-            content = msg.get("content", "") or ""
-            # Also count tool_calls arguments if present
-            tool_calls = msg.get("tool_calls", [])
-            extra = ""
-            if tool_calls:
-                for tc in tool_calls:
-                    func = tc.get("function", {})
-                    extra += func.get("arguments", "")
-                    extra += func.get("name", "")
-            return int((len(content) + len(extra)) / 4)
-
-        total = sum(estimate_tokens(m) for m in messages)
-        if total <= max_tokens:
-            return messages
-
-        logger.warning(
-            f"Trimming conversation history: {total} estimated tokens > {max_tokens} limit, "
-            f"{len(messages)} messages"
+        self.context_window = ContextWindow(
+            settings.CONTEXT_MAX_TOKENS,
+            sumarizador=resumo_extrativo if settings.CONTEXT_RESUMIR_HISTORICO else None,
         )
 
-        # Always keep system message (first) and last user message
-        system_msg = messages[0] if messages and messages[0].get("role") == "system" else None
-        last_user_idx = None
-        for i in range(len(messages) - 1, -1, -1):
-            if messages[i].get("role") == "user":
-                last_user_idx = i
-                break
-
-        # Build trimmed list: start removing from oldest non-system messages
-        # Keep system + as many recent messages as fit + last user message
-        trimmed = []
-        if system_msg:
-            trimmed.append(system_msg)
-
-        # Work backwards from the end, adding messages until we hit the limit
-        reserved_tokens = estimate_tokens(system_msg) if system_msg else 0
-        remaining_budget = max_tokens - reserved_tokens
-
-        # Collect messages from newest to oldest (excluding system)
-        candidates = messages[1:]  # everything after system
-        kept_from_end = []
-
-        for msg in reversed(candidates):
-            msg_tokens = estimate_tokens(msg)
-            if remaining_budget - msg_tokens >= 0:
-                kept_from_end.append(msg)
-                remaining_budget -= msg_tokens
-            else:
-                break
-
-        # Reverse to restore chronological order
-        kept_from_end.reverse()
-
-        # Ensure last user message is included
-        if last_user_idx is not None:
-            last_user_msg = messages[last_user_idx]
-            if last_user_msg not in kept_from_end:
-                kept_from_end.append(last_user_msg)
+    @asynccontextmanager
+    async def _sessao(self) -> AsyncIterator[AsyncSession]:
+        """Sessao para um bloco curto de trabalho no banco (a recebida no construtor, se houver)"""
+        if self.db is not None:
+            yield self.db
+        else:
+            async with async_session() as db:
+                yield db
 
-        trimmed.extend(kept_from_end)
+    @staticmethod
+    async def _fechar_stream(stream) -> None:
+        """Fecha a resposta HTTP do stream do LLM, inclusive quando o turno e cancelado
+        (cliente SSE desconectou): o provedor para de gerar tokens."""
+        fechar = getattr(stream, "close", None)
+        if fechar is not None:
+            await fechar()
+
+    def _trim_messages(self, messages: list) -> list:
+        """Corta o historico para caber na janela de contexto (ver ContextWindow)."""
+        return self.context_window.ajustar(messages)
+
+    async def _buscar_resposta_cache(self, colaborador_id: str, mensagem: str) -> Optional[str]:
+        """Resposta cacheada para a pergunta (so no inicio de conversa, sem historico)"""
+        try:
+            return await resposta_cache.buscar(mensagem, colaborador_id, self.tools_handler.handle_tool_calls)
+        except Exception as e:
+            logger.warning(f"Falha ao consultar cache de respostas: {e}")
+            return None
 
-        logger.info(
-            f"Trimmed from {len(messages)} to {len(trimmed)} messages "
-            f"(~{sum(estimate_tokens(m) for m in trimmed)} tokens)"
-        )
-        return trimmed
+    async def _nivel_orcamento(self, colaborador_id: str) -> str:
+        """Nivel do orcamento diario de tokens; falha ao consultar o ledger nao bloqueia o chat"""
+        try:
+            return nivel_orcamento(await registro_tokens.consumo_hoje(colaborador_id))
+        except Exception as e:
+            logger.warning(f"Falha ao consultar consumo de tokens: {e}")
+            return NORMAL
+
+    def _registrar_uso(self, colaborador_id: str, modelo: str, rodada: int, usage, enviadas: list, gerado: str) -> int:
+        """Registra no ledger o uso de uma chamada; sem usage do provedor, estima pelo tokenizer"""
+        cached = 0
+        if usage is not None:
+            prompt, completion = usage.prompt_tokens or 0, usage.completion_tokens or 0
+            # Parte do prompt lida do cache de prefixo (OpenAI/OpenRouter: prompt_tokens_details)
+            cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+        else:
+            prompt = sum(self.context_window.tokens(m) for m in enviadas)
+            completion = self.context_window.tokenizer.contar(gerado) if gerado else 0
+        logger.debug(f"Uso LLM rodada {rodada} ({modelo}): prompt={prompt} (cache {cached}) completion={completion}")
+        registro_tokens.registrar(colaborador_id, modelo, rodada, prompt, completion, cached)
+        return prompt + completion
+
+    async def _gravar_resposta_cache(
+        self, colaborador_id: str, mensagem: str, chamadas: list, resposta: str, llm_calls: int, tokens: int
+    ) -> None:
+        """Grava a resposta se o turno so usou tools somente leitura"""
+        if not all(nome in TOOLS_SOMENTE_LEITURA for nome, _, _ in chamadas):
+            return
+        try:
+            await resposta_cache.gravar(mensagem, colaborador_id, chamadas, resposta, llm_calls, tokens)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de respostas: {e}")
 
     async def processar_mensagem(
         self,
         colaborador_id: str,
         mensagem: str,
         conversa_id: Optional[str] = None,
+        senha: Optional[Senha] = None,
     ) -> dict:
-        """Processa mensagem do colaborador e retorna resposta do agente"""
+        """Processa mensagem do colaborador e retorna resposta do agente.
+        Com `senha` (controle de admissao), espera a vaga antes da primeira chamada
+        ao LLM e a devolve ao fim delas; FilaCheia sobe para a rota."""
 
         # Enforce authorization: tool calls can only access this colaborador's data
         self.tools_handler.set_authorized_user(colaborador_id)
 
         conversa = None
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT.format(colaborador_id=colaborador_id)}
-        ]
+        messages = mensagens_iniciais(colaborador_id)
+        prefixo = len(messages)
 
         if conversa_id:
-            conversa = await self._carregar_conversa(conversa_id)
-            if conversa and conversa.messages:
-                for msg in conversa.messages:
-                    messages.append({"role": msg["role"], "content": msg["content"]})
+            async with self._sessao() as db:
+                conversa = await self._carregar_conversa(db, conversa_id)
+                if conversa:
+                    messages.extend(await self._carregar_historico(db, conversa.id))
 
+        inicio_turno = len(messages)
         messages.append({"role": "user", "content": mensagem})
 
+        # Perguntas repetidas sem historico podem ser respondidas sem chamar o LLM;
+        # acima do orcamento soft o cache vale tambem no meio da conversa
+        nivel = await self._nivel_orcamento(colaborador_id)
+        usar_cache = settings.RESPONSE_CACHE_ENABLED and inicio_turno == prefixo
+        cacheada = None
+        if usar_cache or (settings.RESPONSE_CACHE_ENABLED and nivel != NORMAL):
+            cacheada = await self._buscar_resposta_cache(colaborador_id, mensagem)
+        # Orcamento esgotado sem resposta no cache: aviso no lugar do LLM, sem erro
+        if cacheada or nivel == ESGOTADO:
+            resposta = cacheada or MENSAGEM_ORCAMENTO_ESGOTADO
+            messages.append({"role": "assistant", "content": resposta})
+            conversa = await self._persistir_turno(
+                conversa, colaborador_id, self._simplificar_mensagens(messages[inicio_turno:]), 0
+            )
+            return {"resposta": resposta, "conversa_id": str(conversa.id), "tokens": 0}
+        modelos = modelos_economicos() if nivel == ECONOMICO else None
+        # So as tools da intencao da mensagem, as mesmas em todas as rodadas do turno
+        tools = seletor_tools.selecionar(mensagem)
+
         total_tokens = 0
         resposta_final = ""
+        llm_calls = 0
+        chamadas = []
+        # Espera e rodadas do LLM num so try: a vaga volta tambem em erro ou cancelamento
+        try:
+            if senha is not None:
+                await senha.esperar()
 
-        for round_num in range(self.max_tool_rounds):
-            # Trim messages before each LLM call
-            trimmed_messages = self._trim_messages(messages)
+            for round_num in range(self.max_tool_rounds):
+                # Trim messages before each LLM call
+                trimmed_messages = self._trim_messages(messages)
 
-            try:
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    max_tokens=8192,
-                    messages=trimmed_messages,
-                    tools=TOOLS,
-                    timeout=60.0,
-                    extra_headers={
-                        "HTTP-Referer": "https://nutrioffshore.ai",
-                        "X-Title": "NutriOffshore AI Agent",
-                    },
+                try:
+                    response = await self.router.completar(
+                        modelos=modelos,
+                        max_tokens=8192,
+                        messages=trimmed_messages,
+                        tools=tools,
+                        timeout=60.0,
+                        extra_headers={
+                            "HTTP-Referer": "https://nutrioffshore.ai",
+                            "X-Title": "NutriOffshore AI Agent",
+                        },
+                    )
+                except Exception as e:
+                    logger.error(f"Erro na chamada OpenRouter: {e}")
+                    raise
+                llm_calls += 1
+
+                choice = response.choices[0]
+                total_tokens += self._registrar_uso(
+                    colaborador_id, getattr(response, "model", None) or (modelos or self.router.modelos)[0], round_num,
+                    response.usage, trimmed_messages, choice.message.content or "",
                 )
-            except Exception as e:
-                logger.error(f"Erro na chamada OpenRouter: {e}")
-                raise
-
-            if response.usage:
-                total_tokens += (response.usage.prompt_tokens or 0) + (response.usage.completion_tokens or 0)
-
-            choice = response.choices[0]
-            assistant_message = choice.message
-            logger.info(f"Round {round_num}: finish_reason={choice.finish_reason}, content_len={len(assistant_message.content or '')}, tool_calls={bool(assistant_message.tool_calls)}, content_preview={repr((assistant_message.content or '')[:100])}")
-
-            # Add assistant message to history
-            msg_dict = {"role": "assistant", "content": assistant_message.content or ""}
-            if assistant_message.tool_calls:
-                msg_dict["tool_calls"] = [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.function.name,
-                            "arguments": tc.function.arguments,
+
+                assistant_message = choice.message
+                logger.info(f"Round {round_num}: finish_reason={choice.finish_reason}, content_len={len(assistant_message.content or '')}, tool_calls={bool(assistant_message.tool_calls)}, content_preview={repr((assistant_message.content or '')[:100])}")
+
+                # Add assistant message to history
+                msg_dict = {"role": "assistant", "content": assistant_message.content or ""}
+                if assistant_message.tool_calls:
+                    msg_dict["tool_calls"] = [
+                        {
+                            "id": tc.id,
+                            "type": "function",
+                            "function": {
+                                "name": tc.function.name,
+                                "arguments": tc.function.arguments,
+                            }
                         }
-                    }
-                    for tc in assistant_message.tool_calls
-                ]
-            messages.append(msg_dict)
+                        for tc in assistant_message.tool_calls
+                    ]
+                messages.append(msg_dict)
 
-            if assistant_message.content:
-                resposta_final = assistant_message.content
+                if assistant_message.content:
+                    resposta_final = assistant_message.content
 
-            # If no tool calls, we're done
-            if not assistant_message.tool_calls:
-                break
+                # If no tool calls, we're done
+                if not assistant_message.tool_calls:
+                    break
 
-            # Execute tool calls
-            for tool_call in assistant_message.tool_calls:
-                func_name = tool_call.function.name
-                try:
-                    func_args = json.loads(tool_call.function.arguments)
-                except json.JSONDecodeError:
-                    func_args = {}
+                # Execute tool calls (read-only tools run concurrently, results keep call order)
+                calls = []
+                for tool_call in assistant_message.tool_calls:
+                    func_name = tool_call.function.name
+                    try:
+                        func_args = json.loads(tool_call.function.arguments)
+                    except json.JSONDecodeError:
+                        func_args = {}
 
-                logger.info(f"Executando tool: {func_name} com input: {json.dumps(func_args, default=str)[:200]}")
-                result = await self.tools_handler.handle_tool_call(func_name, func_args)
+                    logger.info(f"Executando tool: {func_name} com input: {json.dumps(func_args, default=str)[:200]}")
+                    calls.append((func_name, func_args))
 
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": result if isinstance(result, str) else json.dumps(result, default=str, ensure_ascii=False),
-                })
+                results = await self.tools_handler.handle_tool_calls(calls)
+                chamadas.extend((nome, args, result) for (nome, args), result in zip(calls, results))
+                for tool_call, result in zip(assistant_message.tool_calls, results):
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "content": result if isinstance(result, str) else json.dumps(result, default=str, ensure_ascii=False),
+                    })
 
-        # If we exhausted tool rounds without a text response, force one final call
-        if not resposta_final:
-            logger.info("No text response after tool rounds, forcing final synthesis call")
-            messages.append({"role": "user", "content": "Com base nas informacoes coletadas, responda de forma objetiva e concisa."})
+            # If we exhausted tool rounds without a text response, force one final call
+            if not resposta_final:
+                logger.info("No text response after tool rounds, forcing final synthesis call")
+                messages.append({"role": "user", "content": "Com base nas informacoes coletadas, responda de forma objetiva e concisa."})
 
-            # Trim before final call
-            trimmed_messages = self._trim_messages(messages)
+                # Trim before final call
+                trimmed_messages = self._trim_messages(messages)
 
-            try:
-                final_response = await self.client.chat.completions.create(
-                    model=self.model,
-                    max_tokens=8192,
-                    messages=trimmed_messages,
-                    tools=TOOLS,
-                    tool_choice="none",
-                    timeout=60.0,
-                    extra_headers={
-                        "HTTP-Referer": "https://nutrioffshore.ai",
-                        "X-Title": "NutriOffshore AI Agent",
-                    },
-                )
-                if final_response.usage:
-                    total_tokens += (final_response.usage.prompt_tokens or 0) + (final_response.usage.completion_tokens or 0)
-                final_content = final_response.choices[0].message.content or ""
-                if final_content:
-                    resposta_final = final_content
-                    messages.append({"role": "assistant", "content": final_content})
-            except Exception as e:
-                logger.error(f"Erro na chamada final text-only: {e}")
+                try:
+                    final_response = await self.router.completar(
+                        modelos=modelos,
+                        max_tokens=8192,
+                        messages=trimmed_messages,
+                        tools=tools,
+                        tool_choice="none",
+                        timeout=60.0,
+                        extra_headers={
+                            "HTTP-Referer": "https://nutrioffshore.ai",
+                            "X-Title": "NutriOffshore AI Agent",
+                        },
+                    )
+                    llm_calls += 1
+                    final_content = final_response.choices[0].message.content or ""
+                    total_tokens += self._registrar_uso(
+                        colaborador_id, getattr(final_response, "model", None) or (modelos or self.router.modelos)[0],
+                        round_num + 1, final_response.usage, trimmed_messages, final_content,
+                    )
+                    if final_content:
+                        resposta_final = final_content
+                        messages.append({"role": "assistant", "content": final_content})
+                except Exception as e:
+                    logger.error(f"Erro na chamada final text-only: {e}")
+        finally:
+            if senha is not None:
+                senha.liberar()
 
-        # Save conversation
-        messages_to_save = self._simplificar_mensagens(messages)
+        if usar_cache and resposta_final:
+            await self._gravar_resposta_cache(colaborador_id, mensagem, chamadas, resposta_final, llm_calls, total_tokens)
 
-        if conversa:
-            conversa.messages = messages_to_save
-            conversa.tokens_utilizados = (conversa.tokens_utilizados or 0) + total_tokens
-            conversa.updated_at = datetime.utcnow()
-        else:
-            conversa = ConversaAgente(
-                id=uuid4(),
-                colaborador_id=colaborador_id,
-                messages=messages_to_save,
-                tokens_utilizados=total_tokens,
-            )
-            self.db.add(conversa)
+        self.tools_handler.registrar_memo()
 
-        await self.db.commit()
+        # Save conversation (append only this turn's messages)
+        conversa = await self._persistir_turno(
+            conversa, colaborador_id, self._simplificar_mensagens(messages[inicio_turno:]), total_tokens
+        )
 
         return {
             "resposta": resposta_final,
@@ -262,28 +300,68 @@ class AgentService:
         colaborador_id: str,
         mensagem: str,
         conversa_id: Optional[str] = None,
+        senha: Optional[Senha] = None,
     ) -> AsyncGenerator[dict, None]:
-        """Processa mensagem com streaming de resposta"""
+        """Processa mensagem com streaming de resposta.
+        Com `senha`, emite eventos "fila" com a posicao enquanto espera a vaga do LLM."""
 
         # Enforce authorization: tool calls can only access this colaborador's data
         self.tools_handler.set_authorized_user(colaborador_id)
 
         conversa = None
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT.format(colaborador_id=colaborador_id)}
-        ]
+        messages = mensagens_iniciais(colaborador_id)
+        prefixo = len(messages)
 
         if conversa_id:
-            conversa = await self._carregar_conversa(conversa_id)
-            if conversa and conversa.messages:
-                for msg in conversa.messages:
-                    messages.append({"role": msg["role"], "content": msg["content"]})
+            async with self._sessao() as db:
+                conversa = await self._carregar_conversa(db, conversa_id)
+                if conversa:
+                    messages.extend(await self._carregar_historico(db, conversa.id))
 
+        inicio_turno = len(messages)
         messages.append({"role": "user", "content": mensagem})
 
+        nivel = await self._nivel_orcamento(colaborador_id)
+        usar_cache = settings.RESPONSE_CACHE_ENABLED and inicio_turno == prefixo
+        cacheada = None
+        if usar_cache or (settings.RESPONSE_CACHE_ENABLED and nivel != NORMAL):
+            cacheada = await self._buscar_resposta_cache(colaborador_id, mensagem)
+        if cacheada or nivel == ESGOTADO:
+            resposta = cacheada or MENSAGEM_ORCAMENTO_ESGOTADO
+            messages.append({"role": "assistant", "content": resposta})
+            yield {"type": "text", "content": resposta}
+            try:
+                conversa = await self._persistir_turno(
+                    conversa, colaborador_id, self._simplificar_mensagens(messages[inicio_turno:]), 0
+                )
+                yield {"type": "done", "conversa_id": str(conversa.id)}
+            except Exception as e:
+                logger.error(f"Erro ao salvar conversa streaming: {e}", exc_info=True)
+            return
+        modelos = modelos_economicos() if nivel == ECONOMICO else None
+        # So as tools da intencao da mensagem, as mesmas em todas as rodadas do turno
+        tools = seletor_tools.selecionar(mensagem)
+
         had_text = False
         total_tokens = 0
+        llm_calls = 0
+        chamadas = []
+        resposta_final = ""
+        # Espera na fila e rodadas do LLM no mesmo try: a vaga volta tambem se o cliente desconectar na fila
         try:
+            if senha is not None:
+                try:
+                    async for posicao in senha.aguardar():
+                        espera = senha.controle.espera_estimada(posicao)
+                        yield {"type": "fila", "posicao": posicao, "espera_estimada_s": round(espera)}
+                except FilaCheia as e:
+                    yield {
+                        "type": "error",
+                        "content": f"Muitas conversas em andamento. Tente novamente em {e.retry_after} s.",
+                        "retry_after": e.retry_after,
+                    }
+                    return
+
             for round_num in range(self.max_tool_rounds):
                 collected_text = ""
                 collected_tool_calls = {}
@@ -294,12 +372,12 @@ class AgentService:
                 trimmed_messages = self._trim_messages(messages)
 
                 try:
-                    stream = await self.client.chat.completions.create(
-                        model=self.model,
+                    stream = await self.router.abrir_stream(
+                        modelos=modelos,
                         max_tokens=4096,
                         messages=trimmed_messages,
-                        tools=TOOLS,
-                        stream=True,
+                        tools=tools,
+                        stream_options={"include_usage": True},
                         timeout=60.0,
                         extra_headers={
                             "HTTP-Referer": "https://nutrioffshore.ai",
@@ -311,39 +389,50 @@ class AgentService:
                     error_msg = "Limite diário atingido. Tente novamente amanhã." if "rate limit" in str(e).lower() or "429" in str(e) else f"Erro ao conectar com a IA: {str(e)[:200]}"
                     yield {"type": "error", "content": error_msg}
                     return
+                llm_calls += 1
+
+                usage = None
+                try:
+                    async for chunk in stream:
+                        # Com include_usage o ultimo chunk traz o usage (e choices vazio)
+                        usage = getattr(chunk, "usage", None) or usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+
+                        # Text content
+                        if delta.content:
+                            collected_text += delta.content
+                            yield {"type": "text", "content": delta.content}
 
-                async for chunk in stream:
-                    if not chunk.choices:
-                        continue
-                    delta = chunk.choices[0].delta
-
-                    # Text content
-                    if delta.content:
-                        collected_text += delta.content
-                        yield {"type": "text", "content": delta.content}
-
-                    # Tool calls (accumulated across chunks)
-                    if delta.tool_calls:
-                        for tc_delta in delta.tool_calls:
-                            idx = tc_delta.index
-                            if idx not in collected_tool_calls:
-                                collected_tool_calls[idx] = {
-                                    "id": tc_delta.id or "",
-                                    "name": "",
-                                    "arguments": "",
-                                }
-                            if tc_delta.id:
-                                collected_tool_calls[idx]["id"] = tc_delta.id
-                            if tc_delta.function:
-                                if tc_delta.function.name:
-                                    collected_tool_calls[idx]["name"] = tc_delta.function.name
-                                if tc_delta.function.arguments:
-                                    collected_tool_calls[idx]["arguments"] += tc_delta.function.arguments
+                        # Tool calls (accumulated across chunks)
+                        if delta.tool_calls:
+                            for tc_delta in delta.tool_calls:
+                                idx = tc_delta.index
+                                if idx not in collected_tool_calls:
+                                    collected_tool_calls[idx] = {
+                                        "id": tc_delta.id or "",
+                                        "name": "",
+                                        "arguments": "",
+                                    }
+                                if tc_delta.id:
+                                    collected_tool_calls[idx]["id"] = tc_delta.id
+                                if tc_delta.function:
+                                    if tc_delta.function.name:
+                                        collected_tool_calls[idx]["name"] = tc_delta.function.name
+                                    if tc_delta.function.arguments:
+                                        collected_tool_calls[idx]["arguments"] += tc_delta.function.arguments
+                finally:
+                    await self._fechar_stream(stream)
+                    # Tambem no cancelamento: os tokens ja gerados contam no orcamento
+                    gerado = collected_text + "".join(tc["name"] + tc["arguments"] for tc in collected_tool_calls.values())
+                    total_tokens += self._registrar_uso(colaborador_id, stream.modelo, round_num, usage, trimmed_messages, gerado)
 
                 logger.info(f"Stream round {round_num}: text_len={len(collected_text)}, tool_calls={len(collected_tool_calls)}")
 
                 if collected_text:
                     had_text = True
+                    resposta_final += collected_text
 
                 # Build assistant message
                 msg_dict = {"role": "assistant", "content": collected_text}
@@ -364,14 +453,19 @@ class AgentService:
                 if not collected_tool_calls:
                     break
 
-                # Execute tools
+                # Execute tools (read-only tools run concurrently, results keep call order)
+                calls = []
                 for tc in collected_tool_calls.values():
                     yield {"type": "tool_call", "tool": tc["name"]}
                     try:
                         func_args = json.loads(tc["arguments"])
                     except json.JSONDecodeError:
                         func_args = {}
-                    result = await self.tools_handler.handle_tool_call(tc["name"], func_args)
+                    calls.append((tc["name"], func_args))
+
+                results = await self.tools_handler.handle_tool_calls(calls)
+                chamadas.extend((nome, args, result) for (nome, args), result in zip(calls, results))
+                for tc, result in zip(collected_tool_calls.values(), results):
                     messages.append({
                         "role": "tool",
                         "tool_call_id": tc["id"],
@@ -387,52 +481,60 @@ class AgentService:
                 trimmed_messages = self._trim_messages(messages)
 
                 try:
-                    stream = await self.client.chat.completions.create(
-                        model=self.model,
+                    # Mesmas tools do turno (com tool_choice none) para manter o prefixo cacheado das outras rodadas
+                    stream = await self.router.abrir_stream(
+                        modelos=modelos,
                         max_tokens=4096,
                         messages=trimmed_messages,
-                        stream=True,
+                        tools=tools,
+                        tool_choice="none",
+                        stream_options={"include_usage": True},
                         timeout=60.0,
                         extra_headers={
                             "HTTP-Referer": "https://nutrioffshore.ai",
                             "X-Title": "NutriOffshore AI Agent",
                         },
                     )
-                    async for chunk in stream:
-                        if not chunk.choices:
-                            continue
-                        delta = chunk.choices[0].delta
-                        if delta.content:
-                            had_text = True
-                            yield {"type": "text", "content": delta.content}
+                    llm_calls += 1
+                    usage = None
+                    inicio_sintese = len(resposta_final)
+                    try:
+                        async for chunk in stream:
+                            usage = getattr(chunk, "usage", None) or usage
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta
+                            if delta.content:
+                                had_text = True
+                                resposta_final += delta.content
+                                yield {"type": "text", "content": delta.content}
+                    finally:
+                        await self._fechar_stream(stream)
+                        total_tokens += self._registrar_uso(
+                            colaborador_id, stream.modelo, round_num + 1, usage, trimmed_messages, resposta_final[inicio_sintese:]
+                        )
                 except Exception as e:
                     logger.error(f"Erro na síntese final streaming: {e}")
 
             if not had_text:
                 yield {"type": "text", "content": "Desculpe, não consegui gerar uma resposta. Por favor, tente novamente com uma pergunta mais simples."}
+            elif usar_cache:
+                await self._gravar_resposta_cache(colaborador_id, mensagem, chamadas, resposta_final, llm_calls, total_tokens)
 
         except Exception as e:
             logger.error(f"Erro inesperado no streaming: {e}", exc_info=True)
             yield {"type": "error", "content": f"Erro inesperado: {str(e)[:200]}"}
+        finally:
+            if senha is not None:
+                senha.liberar()
+
+        self.tools_handler.registrar_memo()
 
         # Save streaming conversation to database
         try:
-            messages_to_save = self._simplificar_mensagens(messages)
-
-            if conversa:
-                conversa.messages = messages_to_save
-                conversa.tokens_utilizados = (conversa.tokens_utilizados or 0) + total_tokens
-                conversa.updated_at = datetime.utcnow()
-            else:
-                conversa = ConversaAgente(
-                    id=uuid4(),
-                    colaborador_id=colaborador_id,
-                    messages=messages_to_save,
-                    tokens_utilizados=total_tokens,
-                )
-                self.db.add(conversa)
-
-            await self.db.commit()
+            conversa = await self._persistir_turno(
+                conversa, colaborador_id, self._simplificar_mensagens(messages[inicio_turno:]), total_tokens
+            )
             yield {"type": "done", "conversa_id": str(conversa.id)}
         except Exception as e:
             logger.error(f"Erro ao salvar conversa streaming: {e}", exc_info=True)
@@ -441,17 +543,31 @@ class AgentService:
         """Lista conversas do colaborador"""
         stmt = (
             select(ConversaAgente)
+            .options(defer(ConversaAgente.messages))
             .where(ConversaAgente.colaborador_id == colaborador_id)
             .order_by(desc(ConversaAgente.updated_at))
             .limit(limit)
         )
-        result = await self.db.execute(stmt)
-        conversas = result.scalars().all()
+        async with self._sessao() as db:
+            result = await db.execute(stmt)
+            conversas = result.scalars().all()
+
+            # Preview = primeira mensagem (do usuario) de cada conversa
+            previews = {}
+            if conversas:
+                stmt = select(MensagemConversa.conversa_id, MensagemConversa.role, MensagemConversa.content).where(
+                    MensagemConversa.conversa_id.in_([c.id for c in conversas]),
+                    MensagemConversa.ordem == 0,
+                )
+                previews = {
+                    conversa_id: [{"role": role, "content": content}]
+                    for conversa_id, role, content in (await db.execute(stmt)).all()
+                }
 
         return [
             {
                 "id": str(c.id),
-                "preview": self._get_preview(c.messages),
+                "preview": self._get_preview(previews.get(c.id, [])),
                 "tokens": c.tokens_utilizados,
                 "created_at": c.created_at.isoformat(),
                 "updated_at": c.updated_at.isoformat() if c.updated_at else None,
@@ -459,29 +575,102 @@ class AgentService:
             for c in conversas
         ]
 
-    async def buscar_conversa(self, conversa_id: str) -> Optional[dict]:
-        """Busca conversa por ID"""
-        stmt = select(ConversaAgente).where(ConversaAgente.id == conversa_id)
-        result = await self.db.execute(stmt)
-        conversa = result.scalar_one_or_none()
+    async def buscar_conversa(
+        self, conversa_id: str, limit: Optional[int] = None, antes_de: Optional[int] = None
+    ) -> Optional[dict]:
+        """Busca conversa por ID, paginada da mensagem mais recente para a mais antiga.
 
-        if not conversa:
-            return None
+        Retorna ate `limit` mensagens (todas, sem limit) com ordem < antes_de, em ordem
+        cronologica; `proximo_cursor` e o valor de antes_de para a pagina anterior, ou None.
+        """
+        async with self._sessao() as db:
+            conversa = await self._carregar_conversa(db, conversa_id)
+            if not conversa:
+                return None
+
+            stmt = select(MensagemConversa).where(MensagemConversa.conversa_id == conversa.id)
+            if antes_de is not None:
+                stmt = stmt.where(MensagemConversa.ordem < antes_de)
+            stmt = stmt.order_by(desc(MensagemConversa.ordem))
+            if limit is not None:
+                stmt = stmt.limit(limit)
+            pagina = list(reversed((await db.execute(stmt)).scalars().all()))
 
         return {
             "id": str(conversa.id),
             "colaborador_id": str(conversa.colaborador_id),
-            "messages": conversa.messages,
+            "messages": [{"role": m.role, "content": m.content} for m in pagina],
+            "total_mensagens": conversa.total_mensagens,
+            "proximo_cursor": pagina[0].ordem if pagina and pagina[0].ordem > 0 else None,
             "tokens": conversa.tokens_utilizados,
             "created_at": conversa.created_at.isoformat(),
         }
 
-    async def _carregar_conversa(self, conversa_id: str) -> Optional[ConversaAgente]:
-        """Carrega conversa do banco"""
-        stmt = select(ConversaAgente).where(ConversaAgente.id == conversa_id)
-        result = await self.db.execute(stmt)
+    @staticmethod
+    async def _carregar_conversa(db: AsyncSession, conversa_id: str) -> Optional[ConversaAgente]:
+        """Carrega conversa do banco (sem o blob legado de mensagens)"""
+        stmt = select(ConversaAgente).options(defer(ConversaAgente.messages)).where(ConversaAgente.id == conversa_id)
+        result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def _carregar_historico(db: AsyncSession, conversa_id: UUID) -> list:
+        """Carrega as mensagens da conversa em ordem cronologica"""
+        stmt = (
+            select(MensagemConversa.role, MensagemConversa.content)
+            .where(MensagemConversa.conversa_id == conversa_id)
+            .order_by(MensagemConversa.ordem)
+        )
+        result = await db.execute(stmt)
+        return [{"role": role, "content": content} for role, content in result.all()]
+
+    async def _persistir_turno(
+        self,
+        conversa: Optional[ConversaAgente],
+        colaborador_id: str,
+        novas_mensagens: list,
+        total_tokens: int,
+    ) -> ConversaAgente:
+        """Grava apenas as mensagens do turno atual (append-only).
+
+        O custo de escrita por turno e constante: o contador total_mensagens e
+        incrementado atomicamente para reservar as posicoes das novas linhas.
+        """
+        async with self._sessao() as db:
+            if conversa is None:
+                conversa = ConversaAgente(
+                    id=uuid4(),
+                    colaborador_id=colaborador_id,
+                    messages=[],
+                    total_mensagens=len(novas_mensagens),
+                    tokens_utilizados=total_tokens,
+                )
+                db.add(conversa)
+                base = 0
+            else:
+                stmt = (
+                    update(ConversaAgente)
+                    .where(ConversaAgente.id == conversa.id)
+                    .values(
+                        total_mensagens=ConversaAgente.total_mensagens + len(novas_mensagens),
+                        tokens_utilizados=func.coalesce(ConversaAgente.tokens_utilizados, 0) + total_tokens,
+                        updated_at=datetime.utcnow(),
+                    )
+                    .returning(ConversaAgente.total_mensagens)
+                    .execution_options(synchronize_session=False)
+                )
+                base = (await db.execute(stmt)).scalar_one() - len(novas_mensagens)
+
+            for offset, msg in enumerate(novas_mensagens):
+                db.add(MensagemConversa(
+                    conversa_id=conversa.id,
+                    ordem=base + offset,
+                    role=msg["role"],
+                    content=msg["content"],
+                ))
+            await db.commit()
+        return conversa
+
     @staticmethod
     def _simplificar_mensagens(messages: list) -> list:
         """Simplifica mensagens para armazenamento (remove system prompt e tool details)"""
@@ -0,0 +1,280 @@
+"""
+NutriOffshore - Servico de Cache
+Cache de snapshots com TTL: backend LRU em memoria por padrao,
+substituivel por um backend compartilhado (ex.: Redis) entre instancias.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Awaitable, Callable, Optional
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class CacheBackend(ABC):
+    """Interface de armazenamento usada por SnapshotCache"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU em processo com expiracao por entrada"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expira_em, value = item
+        if expira_em <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SnapshotCache:
+    """Cache nomeado de snapshots com contadores de acerto/erro para monitoramento.
+
+    Os valores sao guardados serializados em JSON: cada get devolve um objeto novo,
+    entao quem altera o resultado nao corrompe a entrada, e o mesmo formato serve
+    para um backend compartilhado entre instancias.
+    """
+
+    def __init__(self, nome: str, ttl: float, backend: Optional[CacheBackend] = None):
+        self.nome = nome
+        self.ttl = ttl
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    def _key(self, key: Any) -> str:
+        return f"{self.nome}:{key}"
+
+    def set_backend(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+    async def get(self, key: Any) -> Optional[Any]:
+        value = await self.backend.get(self._key(key))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    async def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        await self.backend.set(self._key(key), json.dumps(value, default=str, ensure_ascii=False), self.ttl if ttl is None else ttl)
+
+    async def invalidate(self, key: Any) -> None:
+        self.invalidacoes += 1
+        await self.backend.delete(self._key(key))
+
+    def metricas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "invalidacoes": self.invalidacoes,
+            "entradas": len(self.backend) if hasattr(self.backend, "__len__") else None,
+            "ttl_s": self.ttl,
+        }
+
+
+# Palavras que nao mudam o sentido da pergunta (saudacoes, cortesia, artigos)
+_PALAVRAS_VAZIAS = frozenset({
+    "o", "a", "os", "as", "um", "uma", "de", "do", "da", "dos", "das", "e", "que",
+    "me", "eu", "ai", "oi", "ola", "bom", "boa", "por", "favor", "pf", "pfv",
+    "obrigado", "obrigada", "vc", "voce", "entao", "la", "ne", "sera",
+})
+
+
+def normalizar_pergunta(texto: str) -> str:
+    """Forma canonica da pergunta: minusculas, sem acentos, pontuacao nem palavras vazias"""
+    sem_acento = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode()
+    return " ".join(p for p in re.findall(r"[a-z0-9]+", sem_acento) if p not in _PALAVRAS_VAZIAS)
+
+
+def _hash_resultados(resultados: list[str]) -> str:
+    return hashlib.sha256(json.dumps(resultados, ensure_ascii=False).encode()).hexdigest()
+
+
+class ResponseCache:
+    """Cache de respostas do agente para perguntas repetidas.
+
+    A chave e a pergunta normalizada; a entrada guarda as tools somente leitura que
+    alimentaram a resposta e o hash dos seus resultados. No acerto as tools sao
+    reexecutadas (consultas ao banco, sem LLM) e a resposta so e reaproveitada se os
+    resultados forem identicos: continua personalizada e nunca usa dados antigos.
+    Respostas que nao dependem de dados do colaborador sao compartilhadas entre todos.
+    As entradas valem ate o fim do dia, quando muda o cardapio.
+    """
+
+    ID_COLABORADOR = "$colaborador_id"
+
+    def __init__(self, ttl: float, backend: Optional[CacheBackend] = None):
+        self.cache = SnapshotCache("resposta", ttl, backend)
+        self._geracao: dict[str, int] = {}
+        self.acertos = 0
+        self.erros = 0
+        self.divergentes = 0
+        self.gravacoes = 0
+        self.llm_calls_evitadas = 0
+        self.tokens_evitados = 0
+
+    def _chave(self, pergunta: str, escopo: str) -> str:
+        digest = hashlib.sha256(pergunta.encode()).hexdigest()[:32]
+        return f"{date.today().isoformat()}:{escopo}:{self._geracao.get(escopo, 0)}:{digest}"
+
+    def _ttl(self) -> float:
+        agora = datetime.now()
+        meia_noite = datetime.combine(agora.date() + timedelta(days=1), dt_time.min)
+        return max(1.0, min(self.cache.ttl, (meia_noite - agora).total_seconds()))
+
+    @classmethod
+    def _substituir(cls, valor: Any, de: str, para: str) -> Any:
+        if isinstance(valor, dict):
+            return {k: cls._substituir(v, de, para) for k, v in valor.items()}
+        if isinstance(valor, list):
+            return [cls._substituir(v, de, para) for v in valor]
+        return para if valor == de else valor
+
+    async def buscar(
+        self,
+        pergunta: str,
+        colaborador_id: str,
+        executar: Callable[[list[tuple[str, dict]]], Awaitable[list[str]]],
+    ) -> Optional[str]:
+        """Retorna a resposta cacheada se as tools reexecutadas derem o mesmo resultado"""
+        normalizada = normalizar_pergunta(pergunta)
+        if not normalizada:
+            return None
+        for escopo in (colaborador_id, "global"):
+            chave = self._chave(normalizada, escopo)
+            entrada = await self.cache.get(chave)
+            if entrada is None:
+                continue
+            calls = [(nome, self._substituir(args, self.ID_COLABORADOR, colaborador_id)) for nome, args in entrada["calls"]]
+            resultados = await executar(calls) if calls else []
+            if _hash_resultados(resultados) != entrada["hash"]:
+                self.divergentes += 1
+                await self.cache.invalidate(chave)
+                continue
+            self.acertos += 1
+            self.llm_calls_evitadas += entrada["llm_calls"]
+            self.tokens_evitados += entrada["tokens"]
+            return entrada["resposta"]
+        self.erros += 1
+        return None
+
+    async def gravar(
+        self,
+        pergunta: str,
+        colaborador_id: str,
+        chamadas: list[tuple[str, dict, str]],
+        resposta: str,
+        llm_calls: int,
+        tokens: int,
+    ) -> None:
+        """Grava a resposta e as tools (nome, args, resultado) que a produziram"""
+        normalizada = normalizar_pergunta(pergunta)
+        if not normalizada or not resposta or any(r.startswith('{"error"') for _, _, r in chamadas):
+            return
+        calls = [(nome, self._substituir(args, colaborador_id, self.ID_COLABORADOR)) for nome, args, _ in chamadas]
+        pessoal = calls != [(nome, args) for nome, args, _ in chamadas]
+        escopo = colaborador_id if pessoal else "global"
+        entrada = {
+            "calls": calls,
+            "hash": _hash_resultados([r for _, _, r in chamadas]),
+            "resposta": resposta,
+            "llm_calls": llm_calls,
+            "tokens": tokens,
+        }
+        await self.cache.set(self._chave(normalizada, escopo), entrada, ttl=self._ttl())
+        self.gravacoes += 1
+
+    def invalidar_colaborador(self, colaborador_id: str) -> None:
+        """Descarta as respostas pessoais do colaborador (as chaves antigas expiram no LRU)"""
+        self._geracao[colaborador_id] = self._geracao.get(colaborador_id, 0) + 1
+        self.cache.invalidacoes += 1
+
+    async def limpar(self) -> None:
+        await self.cache.backend.clear()
+        self.cache.invalidacoes += 1
+
+    def metricas(self) -> dict:
+        total = self.acertos + self.erros
+        return {
+            "acertos": self.acertos,
+            "erros": self.erros,
+            "hit_rate": round(self.acertos / total, 3) if total else 0.0,
+            "divergentes": self.divergentes,
+            "gravacoes": self.gravacoes,
+            "llm_calls_evitadas": self.llm_calls_evitadas,
+            "tokens_evitados": self.tokens_evitados,
+            "invalidacoes": self.cache.invalidacoes,
+            "entradas": len(self.cache.backend) if hasattr(self.cache.backend, "__len__") else None,
+            "ttl_s": self.cache.ttl,
+        }
+
+
+# Snapshot do perfil usado pela tool get_colaborador_profile, chave = colaborador_id
+perfil_cache = SnapshotCache(
+    "perfil",
+    ttl=settings.PROFILE_CACHE_TTL_SECONDS,
+    backend=MemoryCacheBackend(settings.PROFILE_CACHE_MAX_ENTRIES),
+)
+
+# Respostas do agente para perguntas repetidas (ver ResponseCache)
+resposta_cache = ResponseCache(
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    backend=MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES),
+)
+
+
+async def invalidar_colaborador(colaborador_id: Any) -> None:
+    """Invalida os caches derivados dos dados do colaborador (perfil e respostas do agente)"""
+    await perfil_cache.invalidate(str(colaborador_id))
+    resposta_cache.invalidar_colaborador(str(colaborador_id))
@@ -0,0 +1,206 @@
+"""
+NutriOffshore - Ingestao e Indice Nutricional de Cardapios
+Na criacao do cardapio, normaliza cada item (kcal e macros por porcao, estimando
+o que faltar pela categoria) e grava o indice em cardapio_itens e os totais da
+refeicao em cardapios, para tools do agente e frontend lerem numeros prontos.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Iterable, Optional
+from uuid import UUID
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.cardapio import Cardapio
+from app.models.cardapio_item import CardapioItem
+
+logger = logging.getLogger(__name__)
+
+# Distribuicao tipica das kcal entre proteina/carboidrato/gordura por categoria
+DISTRIBUICAO_CATEGORIA = {
+    "proteina": (0.45, 0.05, 0.50),
+    "carboidrato": (0.10, 0.80, 0.10),
+    "cereal": (0.12, 0.75, 0.13),
+    "leguminosa": (0.28, 0.65, 0.07),
+    "vegetal": (0.20, 0.65, 0.15),
+    "salada": (0.20, 0.65, 0.15),
+    "fruta": (0.05, 0.92, 0.03),
+    "laticinio": (0.30, 0.35, 0.35),
+    "prato_completo": (0.25, 0.50, 0.25),
+    "sobremesa": (0.05, 0.65, 0.30),
+    "bebida": (0.02, 0.95, 0.03),
+}
+DISTRIBUICAO_PADRAO = (0.20, 0.50, 0.30)
+KCAL_POR_GRAMA = (4, 4, 9)
+
+# Kcal de uma porcao tipica, quando o item nao traz nenhum valor nutricional
+KCAL_PORCAO_CATEGORIA = {
+    "proteina": 200, "carboidrato": 150, "cereal": 150, "leguminosa": 120, "vegetal": 40,
+    "salada": 40, "fruta": 80, "laticinio": 120, "prato_completo": 450, "sobremesa": 200, "bebida": 80,
+}
+KCAL_PORCAO_PADRAO = 150
+
+
+@dataclass
+class NutricaoItem:
+    item: str
+    categoria: Optional[str]
+    kcal: float
+    proteina_g: float
+    carb_g: float
+    gordura_g: float
+    indice_glicemico: Optional[str] = None
+    estimado: bool = False
+
+    def to_dict(self) -> dict:
+        d = {
+            "item": self.item,
+            "categoria": self.categoria,
+            "calorias_porcao": self.kcal,
+            "proteina_g": self.proteina_g,
+            "carb_g": self.carb_g,
+            "gordura_g": self.gordura_g,
+        }
+        if self.indice_glicemico:
+            d["indice_glicemico"] = self.indice_glicemico
+        if self.estimado:
+            d["estimado"] = True
+        return d
+
+
+def _numero(valor) -> Optional[float]:
+    try:
+        return None if valor is None else float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalizar_item(bruto: dict) -> NutricaoItem:
+    """Kcal e macros por porcao de um item de Cardapio.itens.
+
+    Kcal ausente vem dos macros (4/4/9 kcal por grama); macros ausentes dividem as kcal
+    que sobram dos informados pela distribuicao da categoria (renormalizada entre os
+    ausentes); sem nenhum dado, usa a porcao tipica da categoria.
+    """
+    categoria = (bruto.get("categoria") or "").strip().lower() or None
+    kcal = _numero(bruto.get("calorias_porcao"))
+    macros = [_numero(bruto.get(k)) for k in ("proteina_g", "carb_g", "gordura_g")]
+    estimado = False
+
+    kcal_dos_macros = kcal is None and any(m is not None for m in macros)
+    if kcal is None:
+        if kcal_dos_macros:
+            p, c, g = (m or 0.0 for m in macros)
+            kcal = 4 * p + 4 * c + 9 * g
+        else:
+            kcal = float(KCAL_PORCAO_CATEGORIA.get(categoria, KCAL_PORCAO_PADRAO))
+        estimado = True
+
+    if any(m is None for m in macros):
+        dist = DISTRIBUICAO_CATEGORIA.get(categoria, DISTRIBUICAO_PADRAO)
+        if kcal_dos_macros:
+            padrao = [kcal * dist[i] / KCAL_POR_GRAMA[i] for i in range(3)]
+            macros = [m if m is not None else padrao[i] for i, m in enumerate(macros)]
+            kcal = sum(KCAL_POR_GRAMA[i] * macros[i] for i in range(3))
+        else:
+            # Kcal conhecidas: os macros ausentes dividem so o que sobra dos informados
+            faltando = [i for i, m in enumerate(macros) if m is None]
+            resto = max(kcal - sum(KCAL_POR_GRAMA[i] * m for i, m in enumerate(macros) if m is not None), 0.0)
+            peso = sum(dist[i] for i in faltando)
+            for i in faltando:
+                macros[i] = resto * dist[i] / peso / KCAL_POR_GRAMA[i] if peso else 0.0
+        estimado = True
+
+    return NutricaoItem(
+        item=str(bruto.get("item") or "").strip(),
+        categoria=categoria,
+        kcal=round(kcal, 1),
+        proteina_g=round(macros[0], 1),
+        carb_g=round(macros[1], 1),
+        gordura_g=round(macros[2], 1),
+        indice_glicemico=bruto.get("indice_glicemico"),
+        estimado=estimado,
+    )
+
+
+def totais(itens: Iterable[NutricaoItem]) -> dict:
+    itens = list(itens)
+    return {
+        "itens": len(itens),
+        "kcal": round(sum(i.kcal for i in itens), 1),
+        "proteina_g": round(sum(i.proteina_g for i in itens), 1),
+        "carb_g": round(sum(i.carb_g for i in itens), 1),
+        "gordura_g": round(sum(i.gordura_g for i in itens), 1),
+    }
+
+
+def indexar(cardapio: Cardapio) -> None:
+    """(Re)calcula o indice do cardapio: linhas de cardapio_itens e totais da refeicao"""
+    itens = [normalizar_item(bruto) for bruto in cardapio.itens or []]
+    soma = totais(itens)
+    cardapio.kcal_total = soma["kcal"]
+    cardapio.proteina_total_g = soma["proteina_g"]
+    cardapio.carb_total_g = soma["carb_g"]
+    cardapio.gordura_total_g = soma["gordura_g"]
+    cardapio.indexado_em = datetime.utcnow()
+    cardapio.itens_indexados = [
+        CardapioItem(
+            plataforma_id=cardapio.plataforma_id,
+            data=cardapio.data,
+            refeicao=cardapio.refeicao,
+            posicao=posicao,
+            item=n.item,
+            categoria=n.categoria,
+            kcal=n.kcal,
+            proteina_g=n.proteina_g,
+            carb_g=n.carb_g,
+            gordura_g=n.gordura_g,
+            indice_glicemico=n.indice_glicemico,
+            estimado=n.estimado,
+        )
+        for posicao, n in enumerate(itens)
+    ]
+
+
+def _item_indexado(linha: CardapioItem) -> NutricaoItem:
+    return NutricaoItem(
+        item=linha.item, categoria=linha.categoria, kcal=linha.kcal, proteina_g=linha.proteina_g,
+        carb_g=linha.carb_g, gordura_g=linha.gordura_g, indice_glicemico=linha.indice_glicemico,
+        estimado=linha.estimado,
+    )
+
+
+def nutricao_refeicao(cardapio: Cardapio) -> tuple[list[NutricaoItem], dict]:
+    """Itens e totais de um cardapio carregado com CARREGAMENTO_INDICE.
+
+    Cardapios anteriores ao indice (sem indexado_em) sao normalizados em memoria.
+    """
+    if cardapio.indexado_em is None:
+        itens = [normalizar_item(bruto) for bruto in cardapio.itens or []]
+        return itens, totais(itens)
+    itens = [_item_indexado(linha) for linha in cardapio.itens_indexados]
+    return itens, {
+        "itens": len(itens),
+        "kcal": cardapio.kcal_total,
+        "proteina_g": cardapio.proteina_total_g,
+        "carb_g": cardapio.carb_total_g,
+        "gordura_g": cardapio.gordura_total_g,
+    }
+
+
+CARREGAMENTO_INDICE = (selectinload(Cardapio.itens_indexados),)
+
+
+async def buscar_cardapios(
+    db: AsyncSession, inicio: date, fim: Optional[date] = None, plataforma_id: Optional[UUID] = None
+) -> list[Cardapio]:
+    """Cardapios do periodo [inicio, fim] com o indice nutricional carregado"""
+    stmt = select(Cardapio).options(*CARREGAMENTO_INDICE)
+    stmt = stmt.where(Cardapio.data == inicio) if fim is None else stmt.where(Cardapio.data >= inicio, Cardapio.data <= fim)
+    if plataforma_id:
+        stmt = stmt.where(Cardapio.plataforma_id == plataforma_id)
+    result = await db.execute(stmt.order_by(Cardapio.data))
+    return list(result.scalars().all())
@@ -0,0 +1,61 @@
+"""
+NutriOffshore - Agregado Diario de Consumo
+Cada RefeicaoLog registrado soma seus totais em consumo_diario (uma linha por
+colaborador por dia) na mesma transacao, com upsert atomico. Resumos e periodos
+leem o agregado: custo proporcional ao numero de dias, nao de refeicoes.
+"""
+from datetime import date, datetime
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.consumo_diario import ConsumoDiario
+from app.models.refeicao_log import RefeicaoLog
+
+
+async def acumular_refeicao(db: AsyncSession, log: RefeicaoLog) -> None:
+    """Soma a refeicao no agregado do dia; o commit fica com quem grava o log"""
+    aderencia = log.aderencia_percentual
+    valores = {
+        "calorias": log.calorias_estimadas or 0,
+        "proteina_g": log.proteina_g or 0,
+        "carboidratos_g": log.carboidratos_g or 0,
+        "gorduras_g": log.gorduras_g or 0,
+        "refeicoes": 1,
+        "aderencia_soma": aderencia or 0,
+        "aderencia_registros": int(aderencia is not None),
+    }
+    stmt = insert(ConsumoDiario).values(
+        colaborador_id=log.colaborador_id, data=log.data, updated_at=datetime.utcnow(), **valores
+    )
+    tabela = ConsumoDiario.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabela.colaborador_id, tabela.data],
+        set_={**{k: tabela[k] + stmt.excluded[k] for k in valores}, "updated_at": stmt.excluded.updated_at},
+    )
+    await db.execute(stmt)
+
+
+async def consumo_periodo(db: AsyncSession, colaborador_id: UUID, inicio: date, fim: date) -> list[ConsumoDiario]:
+    """Dias com refeicao registrada em [inicio, fim], em ordem de data"""
+    stmt = (
+        select(ConsumoDiario)
+        .where(ConsumoDiario.colaborador_id == colaborador_id, ConsumoDiario.data >= inicio, ConsumoDiario.data <= fim)
+        .order_by(ConsumoDiario.data)
+    )
+    return list((await db.execute(stmt)).scalars().all())
+
+
+def resumo_dia(c: ConsumoDiario) -> dict:
+    """Formato de ResumoDiario"""
+    return {
+        "data": c.data,
+        "total_calorias": c.calorias,
+        "total_proteina_g": c.proteina_g,
+        "total_carboidratos_g": c.carboidratos_g,
+        "total_gorduras_g": c.gorduras_g,
+        "refeicoes_registradas": c.refeicoes,
+        "aderencia_media": c.aderencia_media,
+    }
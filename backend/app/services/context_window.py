@@ -0,0 +1,190 @@
+"""
+NutriOffshore - Gerenciador da Janela de Contexto
+Contagem de tokens com tokenizer plugavel (offline por padrao), cache por
+mensagem e corte do historico em uma unica passada O(n).
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Callable, Optional, Protocol
+import logging
+import re
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Custo fixo por mensagem (role, separadores do chat template)
+TOKENS_POR_MENSAGEM = 4
+
+
+class Tokenizer(Protocol):
+    nome: str
+
+    def contar(self, texto: str) -> int:
+        ...
+
+
+class RegexTokenizer:
+    """Aproximacao offline de um BPE: palavras curtas = 1 token, palavras longas
+    ~1 token a cada 4 caracteres, cada pontuacao/simbolo = 1 token."""
+
+    nome = "regex"
+    # Palavras sao fatiadas em pedacos de ate 4 caracteres pelo proprio regex
+    _PADRAO = re.compile(r"\w{1,4}|[^\w\s]", re.UNICODE)
+
+    def contar(self, texto: str) -> int:
+        return len(self._PADRAO.findall(texto))
+
+
+class TiktokenTokenizer:
+    """Tokenizer BPE real via tiktoken (dependencia opcional; o arquivo de
+    encoding precisa estar no cache local para uso offline)."""
+
+    nome = "tiktoken"
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        import tiktoken
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def contar(self, texto: str) -> int:
+        return len(self._encoding.encode(texto, disallowed_special=()))
+
+
+@lru_cache()
+def criar_tokenizer(nome: str = "auto") -> Tokenizer:
+    """Cria o tokenizer configurado; 'auto' usa tiktoken se disponivel, senao regex."""
+    if nome in ("auto", "tiktoken"):
+        try:
+            return TiktokenTokenizer()
+        except Exception as e:
+            if nome == "tiktoken":
+                raise
+            logger.info(f"tiktoken indisponivel ({type(e).__name__}), usando tokenizer regex")
+    return RegexTokenizer()
+
+
+# Contagens entre turnos, chaveadas pelo digest do texto (nao pelo texto: resultados
+# de tool chegam a dezenas de KB); ~100 bytes por entrada
+MAX_CONTAGENS = 50_000
+_contagens: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+
+
+def _contar_cacheado(tokenizer: Tokenizer, texto: str) -> int:
+    """Contagem compartilhada entre turnos: o historico recarregado do banco
+    repete os mesmos textos, que so precisam ser tokenizados uma vez."""
+    chave = (tokenizer.nome, blake2b(texto.encode(), digest_size=16).digest())
+    total = _contagens.get(chave)
+    if total is not None:
+        _contagens.move_to_end(chave)
+        return total
+    total = _contagens[chave] = tokenizer.contar(texto)
+    if len(_contagens) > MAX_CONTAGENS:
+        _contagens.popitem(last=False)
+    return total
+
+
+def resumo_extrativo(descartadas: list) -> str:
+    """Sumarizador padrao (sem LLM): primeira linha de cada pergunta descartada"""
+    perguntas = []
+    for msg in descartadas:
+        if msg.get("role") == "user" and msg.get("content"):
+            perguntas.append("- " + msg["content"].strip().splitlines()[0][:160])
+    if not perguntas:
+        return ""
+    return "Resumo do historico anterior (perguntas do colaborador):\n" + "\n".join(perguntas[-20:])
+
+
+class ContextWindow:
+    """Mantem o historico enviado ao LLM abaixo de max_tokens.
+
+    As contagens sao memorizadas por mensagem (identidade do dict) dentro do turno
+    e por texto entre turnos, entao cada mensagem e tokenizada uma unica vez. Entre
+    rounds, a mesma lista (que so cresce) e contabilizada de forma incremental.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        tokenizer: Optional[Tokenizer] = None,
+        sumarizador: Optional[Callable[[list], str]] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer or criar_tokenizer(settings.CONTEXT_TOKENIZER)
+        self.sumarizador = sumarizador
+        self._cache: dict[int, tuple[dict, int]] = {}
+        self._estado: Optional[tuple[list, int, list, int]] = None
+
+    def tokens(self, msg: dict) -> int:
+        cached = self._cache.get(id(msg))
+        if cached is not None and cached[0] is msg:
+            return cached[1]
+        texto = msg.get("content") or ""
+        for tc in msg.get("tool_calls") or []:
+            func = tc.get("function", {})
+            texto += " " + func.get("name", "") + " " + func.get("arguments", "")
+        total = TOKENS_POR_MENSAGEM + _contar_cacheado(self.tokenizer, texto)
+        self._cache[id(msg)] = (msg, total)
+        return total
+
+    def ajustar(self, messages: list) -> list:
+        """Retorna o historico cortado para caber em max_tokens.
+
+        Mantem sempre as mensagens de sistema do inicio (instrucoes e contexto do
+        colaborador: o prefixo que o provedor cacheia) e a ultima mensagem do
+        usuario; descarta as mais antigas primeiro e nunca deixa um resultado de
+        tool sem o assistant que o pediu.
+        """
+        # Entre rounds do mesmo turno a lista so recebe appends: soma apenas as novas
+        anterior = self._estado
+        if anterior is not None and anterior[0] is messages and len(messages) >= anterior[1]:
+            contagens = anterior[2]
+            novas = [self.tokens(m) for m in messages[anterior[1]:]]
+            contagens.extend(novas)
+            total = anterior[3] + sum(novas)
+        else:
+            contagens = [self.tokens(m) for m in messages]
+            total = sum(contagens)
+        self._estado = (messages, len(messages), contagens, total)
+        if total <= self.max_tokens:
+            return messages
+
+        inicio = 0
+        while inicio < len(messages) and messages[inicio].get("role") == "system":
+            inicio += 1
+        last_user_idx = next(
+            (i for i in range(len(messages) - 1, inicio - 1, -1) if messages[i].get("role") == "user"),
+            None,
+        )
+
+        orcamento = self.max_tokens - sum(contagens[:inicio])
+        if last_user_idx is not None:
+            orcamento -= contagens[last_user_idx]
+
+        # Uma passada do fim para o inicio: corte = primeiro indice mantido
+        corte = len(messages)
+        for i in range(len(messages) - 1, inicio - 1, -1):
+            custo = 0 if i == last_user_idx else contagens[i]
+            if custo > orcamento:
+                break
+            orcamento -= custo
+            corte = i
+        while corte < len(messages) and messages[corte].get("role") == "tool":
+            corte += 1
+
+        trimmed = messages[:inicio]
+        if self.sumarizador and corte > inicio:
+            descartadas = [m for i, m in enumerate(messages[inicio:corte], start=inicio) if i != last_user_idx]
+            resumo = self.sumarizador(descartadas)
+            if resumo:
+                trimmed.append({"role": "system", "content": resumo})
+        if last_user_idx is not None and last_user_idx < corte:
+            trimmed.append(messages[last_user_idx])
+        trimmed.extend(messages[corte:])
+
+        logger.info(
+            f"Trimmed from {len(messages)} to {len(trimmed)} messages "
+            f"({total} -> ~{sum(self.tokens(m) for m in trimmed)} tokens, tokenizer={self.tokenizer.nome})"
+        )
+        return trimmed
@@ -0,0 +1,388 @@
+"""
+NutriOffshore - Cliente LLM compartilhado
+Um unico AsyncOpenAI por processo, com pool de conexoes keep-alive para o
+OpenRouter (HTTP/2 quando o pacote h2 estiver instalado), e o roteador de
+modelos com failover, hedge e circuit breaker.
+"""
+from collections import deque
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+import asyncio
+import importlib.util
+import logging
+import time
+
+import httpx
+
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    import openai
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _http2_disponivel() -> bool:
+    return settings.LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+class LLMClientManager:
+    """Ciclo de vida do cliente LLM da aplicacao: criado no primeiro uso, fechar() no shutdown.
+    O SDK openai (~0.5 s de import) fica fora do cold start da API."""
+
+    def __init__(self):
+        self._client: Optional["openai.AsyncOpenAI"] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+    def iniciar(self) -> "openai.AsyncOpenAI":
+        if self._client is not None:
+            return self._client
+        import openai
+
+        http2 = _http2_disponivel()
+        self._http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0),
+        )
+        self._client = openai.AsyncOpenAI(
+            base_url=settings.OPENROUTER_BASE_URL,
+            api_key=settings.OPENROUTER_API_KEY,
+            http_client=self._http_client,
+        )
+        logger.info(
+            f"Cliente LLM iniciado (http2={http2}, max_connections={settings.LLM_MAX_CONNECTIONS}, "
+            f"keepalive={settings.LLM_MAX_KEEPALIVE})"
+        )
+        return self._client
+
+    @property
+    def client(self) -> "openai.AsyncOpenAI":
+        """Cliente compartilhado, criado sob demanda"""
+        return self._client if self._client is not None else self.iniciar()
+
+    def substituir(self, client) -> None:
+        """Troca o cliente (ex.: LLM falso em scripts de carga)"""
+        self._client = client
+
+    async def fechar(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._client = None
+        self._http_client = None
+
+
+llm_clients = LLMClientManager()
+
+
+def erro_transitorio(erro: BaseException) -> bool:
+    """Erro do provedor/modelo (rate limit, timeout, conexao, 5xx): vale failover e conta no
+    circuit breaker. Os demais (400, 422, 401, 403...) sao da requisicao e sobem direto."""
+    import openai
+
+    if isinstance(erro, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(erro, openai.APIStatusError) and erro.status_code >= 500
+
+
+class ModelosIndisponiveis(Exception):
+    """Todos os modelos com o circuito aberto e a chamada de teste ja em andamento"""
+
+
+class EstatisticasModelo:
+    """Latencia (janela movel), erros e estado do circuit breaker de um modelo"""
+
+    def __init__(self, modelo: str, janela: int = 200):
+        self.modelo = modelo
+        self.latencias_ms: deque[float] = deque(maxlen=janela)
+        self.requests = 0
+        self.sucessos = 0
+        self.falhas = 0
+        self.falhas_seguidas = 0
+        self.hedges_vencidos = 0
+        self.aberto_ate: Optional[float] = None
+        # Meio aberto: uma requisicao por vez faz a chamada de teste; as demais pulam o modelo
+        self.sondando = False
+        self.ultimo_erro: Optional[str] = None
+
+    def percentil(self, p: float) -> Optional[float]:
+        if not self.latencias_ms:
+            return None
+        ordenadas = sorted(self.latencias_ms)
+        return ordenadas[min(int(len(ordenadas) * p), len(ordenadas) - 1)]
+
+    def circuito(self, agora: float) -> str:
+        if self.aberto_ate is None:
+            return "fechado"
+        return "aberto" if agora < self.aberto_ate else "meio_aberto"
+
+    def registrar_sucesso(self, latencia_ms: float) -> None:
+        self.sucessos += 1
+        self.falhas_seguidas = 0
+        self.aberto_ate = None
+        self.latencias_ms.append(latencia_ms)
+
+    def registrar_falha(self, erro: BaseException, agora: float) -> None:
+        self.falhas += 1
+        self.falhas_seguidas += 1
+        self.ultimo_erro = f"{type(erro).__name__}: {str(erro)[:120]}"
+        # Meio aberto: uma falha na tentativa de teste reabre o circuito
+        if self.falhas_seguidas >= settings.LLM_CIRCUIT_FALHAS or self.aberto_ate is not None:
+            self.aberto_ate = agora + settings.LLM_CIRCUIT_RESET_SECONDS
+
+    def metricas(self, agora: float) -> dict:
+        p50, p95 = self.percentil(0.5), self.percentil(0.95)
+        return {
+            "requests": self.requests,
+            "sucessos": self.sucessos,
+            "falhas": self.falhas,
+            "hedges_vencidos": self.hedges_vencidos,
+            "latencia_p50_ms": round(p50) if p50 is not None else None,
+            "latencia_p95_ms": round(p95) if p95 is not None else None,
+            "circuito": self.circuito(agora),
+            "sondando": self.sondando,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+
+def com_cache_control(modelo: str, kwargs: dict) -> dict:
+    """Marca o fim do prefixo fixo (primeira mensagem de sistema) com cache_control nos
+    modelos que so cacheiam com breakpoint explicito (LLM_CACHE_CONTROL_PREFIXOS). Nos
+    demais o cache do provedor e automatico por prefixo e a requisicao segue igual."""
+    prefixos = [p.strip() for p in settings.LLM_CACHE_CONTROL_PREFIXOS.split(",") if p.strip()]
+    messages = kwargs.get("messages")
+    if not messages or not any(modelo.startswith(p) for p in prefixos):
+        return kwargs
+    primeira = messages[0]
+    if primeira.get("role") != "system" or not isinstance(primeira.get("content"), str):
+        return kwargs
+    marcada = {"role": "system", "content": [{"type": "text", "text": primeira["content"], "cache_control": {"type": "ephemeral"}}]}
+    return {**kwargs, "messages": [marcada, *messages[1:]]}
+
+
+class StreamRoteado:
+    """Stream do modelo vencedor com o primeiro chunk ja lido (usado para decidir o hedge)"""
+
+    def __init__(self, modelo: str, stream, iterador, primeiro):
+        self.modelo = modelo
+        self._stream = stream
+        self._iterador = iterador
+        self._primeiro = primeiro
+
+    async def __aiter__(self):
+        if self._primeiro is not None:
+            primeiro, self._primeiro = self._primeiro, None
+            yield primeiro
+        async for chunk in self._iterador:
+            yield chunk
+
+    async def close(self) -> None:
+        fechar = getattr(self._stream, "close", None)
+        if fechar is not None:
+            await fechar()
+
+
+class ModelRouter:
+    """Roteia chamadas do agente por uma lista ordenada de modelos.
+
+    - failover: erro transitorio (rate limit, 5xx, timeout, conexao) passa para o
+      proximo modelo; erro da propria requisicao (ex.: 400) sobe sem failover;
+    - hedge: se o modelo nao responde ate o p95 da sua latencia (minimo
+      LLM_HEDGE_MIN_MS), dispara o proximo em paralelo e fica com o primeiro
+      que responder; no streaming a latencia e o tempo ate o primeiro chunk;
+    - circuit breaker: LLM_CIRCUIT_FALHAS falhas seguidas tiram o modelo da
+      rotacao por LLM_CIRCUIT_RESET_SECONDS, depois uma unica chamada de teste
+      decide (as requisicoes concorrentes pulam o modelo enquanto ela nao volta).
+    """
+
+    # Amostras minimas para usar o p95 medido como prazo do hedge
+    AMOSTRAS_MINIMAS = 20
+
+    def __init__(self, modelos: list[str], client_manager: Optional["LLMClientManager"] = None):
+        self.modelos = modelos
+        self.client_manager = client_manager or llm_clients
+        self.estatisticas = {m: EstatisticasModelo(m) for m in modelos}
+        self.hedges = 0
+        self.failovers = 0
+
+    def _prazo_hedge(self, modelo: str) -> float:
+        stats = self.estatisticas[modelo]
+        p95 = stats.percentil(0.95) if len(stats.latencias_ms) >= self.AMOSTRAS_MINIMAS else None
+        prazo_ms = settings.LLM_HEDGE_INICIAL_MS if p95 is None else p95
+        return max(prazo_ms, settings.LLM_HEDGE_MIN_MS) / 1000
+
+    def _cliente(self):
+        """Com fallback configurado o retry do SDK so atrasaria o failover: desliga"""
+        client = self.client_manager.client
+        if len(self.modelos) > 1 and hasattr(client, "with_options"):
+            return client.with_options(max_retries=0)
+        return client
+
+    def _candidatos(self, modelos: Optional[list[str]] = None) -> tuple[list[str], list[str]]:
+        """Modelos a tentar, em ordem, e os meio abertos cuja chamada de teste esta requisicao assumiu"""
+        modelos = modelos or self.modelos
+        for m in modelos:
+            if m not in self.estatisticas:
+                self.estatisticas[m] = EstatisticasModelo(m)
+        agora = time.monotonic()
+        disponiveis, sondas = [], []
+        for m in modelos:
+            stats = self.estatisticas[m]
+            estado = stats.circuito(agora)
+            if estado == "meio_aberto" and not stats.sondando:
+                stats.sondando = True
+                sondas.append(m)
+            if estado == "fechado" or m in sondas:
+                disponiveis.append(m)
+        if disponiveis:
+            return disponiveis, sondas
+        # Todos abertos: testa o que reabre primeiro em vez de recusar a mensagem,
+        # mas so se ninguem ja estiver testando
+        livres = [m for m in modelos if not self.estatisticas[m].sondando]
+        if not livres:
+            raise ModelosIndisponiveis(f"circuito aberto em todos os modelos: {', '.join(modelos)}")
+        modelo = min(livres, key=lambda m: self.estatisticas[m].aberto_ate)
+        self.estatisticas[modelo].sondando = True
+        return [modelo], [modelo]
+
+    async def _executar(
+        self,
+        tentativa: Callable[[str], Awaitable[Any]],
+        descartar: Callable[[Any], Awaitable[None]],
+        modelos: Optional[list[str]] = None,
+    ) -> Any:
+        candidatos, sondas = self._candidatos(modelos)
+        pendentes: dict[asyncio.Task, tuple[str, float]] = {}
+        proximo = 0
+        ultimo_erro: Optional[BaseException] = None
+        ultimo: tuple[str, float] = ("", 0.0)
+
+        def disparar() -> None:
+            nonlocal proximo, ultimo
+            modelo = candidatos[proximo]
+            proximo += 1
+            self.estatisticas[modelo].requests += 1
+            ultimo = (modelo, time.monotonic())
+            pendentes[asyncio.ensure_future(tentativa(modelo))] = ultimo
+
+        disparar()
+        try:
+            while pendentes:
+                prazo = None
+                if settings.LLM_HEDGE_ENABLED and proximo < len(candidatos):
+                    prazo = max(ultimo[1] + self._prazo_hedge(ultimo[0]) - time.monotonic(), 0)
+                feitas, _ = await asyncio.wait(pendentes, timeout=prazo, return_when=asyncio.FIRST_COMPLETED)
+                if not feitas:
+                    self.hedges += 1
+                    logger.info(
+                        f"LLM hedge: {ultimo[0]} sem resposta em {self._prazo_hedge(ultimo[0]):.1f}s, "
+                        f"disparando {candidatos[proximo]}"
+                    )
+                    disparar()
+                    continue
+
+                vencedor = None
+                for tarefa in feitas:
+                    modelo, inicio = pendentes.pop(tarefa)
+                    agora = time.monotonic()
+                    if modelo in sondas:
+                        sondas.remove(modelo)
+                        self.estatisticas[modelo].sondando = False
+                    erro = tarefa.exception()
+                    if erro is not None and not erro_transitorio(erro):
+                        # Falharia em qualquer modelo e nao indica problema no provedor
+                        logger.warning(f"LLM {modelo} recusou a requisicao: {type(erro).__name__}: {str(erro)[:200]}")
+                        raise erro
+                    if erro is not None:
+                        ultimo_erro = erro
+                        self.estatisticas[modelo].registrar_falha(erro, agora)
+                        logger.warning(f"LLM {modelo} falhou: {type(erro).__name__}: {str(erro)[:200]}")
+                    elif vencedor is None:
+                        vencedor = (modelo, tarefa.result())
+                        self.estatisticas[modelo].registrar_sucesso((agora - inicio) * 1000)
+                    else:
+                        await descartar(tarefa.result())
+                if vencedor is not None:
+                    modelo, resultado = vencedor
+                    if modelo != candidatos[0]:
+                        self.estatisticas[modelo].hedges_vencidos += int(bool(pendentes))
+                    return resultado
+                if not pendentes and proximo < len(candidatos):
+                    self.failovers += 1
+                    disparar()
+            raise ultimo_erro
+        finally:
+            # Perdedores do hedge: cancela e fecha streams que ja tenham aberto
+            for tarefa in pendentes:
+                tarefa.cancel()
+            for tarefa in pendentes:
+                try:
+                    resultado = await tarefa
+                except BaseException:
+                    continue
+                await descartar(resultado)
+            # Sondas nao disparadas ou canceladas: libera para a proxima requisicao testar
+            for modelo in sondas:
+                self.estatisticas[modelo].sondando = False
+
+    async def completar(self, modelos: Optional[list[str]] = None, **kwargs) -> Any:
+        """chat.completions.create sem streaming, roteado entre os modelos (ou a lista `modelos`)"""
+        async def tentativa(modelo: str):
+            return await self._cliente().chat.completions.create(model=modelo, **com_cache_control(modelo, kwargs))
+
+        async def descartar(_resposta) -> None:
+            return None
+
+        return await self._executar(tentativa, descartar, modelos)
+
+    async def abrir_stream(self, modelos: Optional[list[str]] = None, **kwargs) -> StreamRoteado:
+        """chat.completions.create(stream=True); o hedge considera o tempo ate o primeiro chunk"""
+        async def tentativa(modelo: str) -> StreamRoteado:
+            stream = await self._cliente().chat.completions.create(model=modelo, stream=True, **com_cache_control(modelo, kwargs))
+            iterador = stream.__aiter__()
+            try:
+                primeiro = await iterador.__anext__()
+            except StopAsyncIteration:
+                primeiro = None
+            except BaseException:
+                await StreamRoteado(modelo, stream, iterador, None).close()
+                raise
+            return StreamRoteado(modelo, stream, iterador, primeiro)
+
+        async def descartar(stream: StreamRoteado) -> None:
+            await stream.close()
+
+        return await self._executar(tentativa, descartar, modelos)
+
+    def metricas(self) -> dict:
+        agora = time.monotonic()
+        return {
+            "modelos": {m: e.metricas(agora) for m, e in self.estatisticas.items()},
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+        }
+
+
+def modelos_configurados() -> list[str]:
+    """OPENROUTER_MODEL seguido de OPENROUTER_FALLBACK_MODELS (separados por virgula)"""
+    modelos = [settings.OPENROUTER_MODEL]
+    for modelo in settings.OPENROUTER_FALLBACK_MODELS.split(","):
+        modelo = modelo.strip()
+        if modelo and modelo not in modelos:
+            modelos.append(modelo)
+    return modelos
+
+
+def modelos_economicos() -> Optional[list[str]]:
+    """OPENROUTER_MODELO_ECONOMICO na frente dos configurados (None se nao houver)"""
+    economico = settings.OPENROUTER_MODELO_ECONOMICO.strip()
+    if not economico:
+        return None
+    return [economico] + [m for m in modelos_configurados() if m != economico]
+
+
+model_router = ModelRouter(modelos_configurados())
@@ -2,11 +2,13 @@
 NutriOffshore - Servico de Calculos Nutricionais
 Implementa todas as formulas de TMB, GET e distribuicao de macronutrientes
 """
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, fields
+from typing import Optional, Sequence
 from enum import Enum
 import math
 
+import numpy as np
+
 
 class Sexo(str, Enum):
     MASCULINO = "M"
@@ -98,6 +100,102 @@ class ResultadoCalculo:
     classificacao_imc: str
 
 
+_LIMITES_IMC = np.array([18.5, 25, 30, 35, 40])
+_CLASSIFICACOES_IMC = np.array([
+    "Abaixo do peso", "Peso normal", "Sobrepeso",
+    "Obesidade Grau I", "Obesidade Grau II", "Obesidade Grau III",
+])
+_FORMULA_KATCH = "Katch-McArdle (massa magra disponivel)"
+_FORMULA_MIFFLIN = "Mifflin-St Jeor (padrao-ouro sem composicao corporal)"
+
+
+@dataclass
+class ResultadoLote:
+    """Resultados colunares de NutriCalculator.calcular_lote (um array por campo de ResultadoCalculo).
+    tmb_katch_mcardle usa NaN onde o escalar devolveria None."""
+    tmb_harris_benedict: np.ndarray
+    tmb_mifflin: np.ndarray
+    tmb_katch_mcardle: np.ndarray
+    tmb_utilizada: np.ndarray
+    formula_escolhida: np.ndarray
+    fator_atividade: np.ndarray
+    ajuste_turno_noturno: np.ndarray
+    efeito_termico_alimentos: np.ndarray
+    ajuste_neat: np.ndarray
+    get_total: np.ndarray
+    meta_calorica: np.ndarray
+    deficit_superavit: np.ndarray
+    proteina_g: np.ndarray
+    carboidratos_g: np.ndarray
+    gorduras_g: np.ndarray
+    proteina_kcal: np.ndarray
+    carboidratos_kcal: np.ndarray
+    gorduras_kcal: np.ndarray
+    proteina_pct: np.ndarray
+    carboidratos_pct: np.ndarray
+    gorduras_pct: np.ndarray
+    agua_ml: np.ndarray
+    fibra_g: np.ndarray
+    imc: np.ndarray
+    classificacao_imc: np.ndarray
+
+    _CAMPOS_INTEIROS = frozenset({
+        "ajuste_neat", "deficit_superavit", "proteina_g", "carboidratos_g", "gorduras_g",
+        "proteina_kcal", "carboidratos_kcal", "gorduras_kcal", "agua_ml", "fibra_g",
+    })
+    _CAMPOS_TEXTO = frozenset({"formula_escolhida", "classificacao_imc"})
+
+    def __len__(self) -> int:
+        return len(self.imc)
+
+    def __getitem__(self, i: int) -> ResultadoCalculo:
+        valores = {}
+        for campo in fields(ResultadoCalculo):
+            valor = getattr(self, campo.name)[i]
+            if campo.name in self._CAMPOS_TEXTO:
+                valores[campo.name] = str(valor)
+            elif campo.name in self._CAMPOS_INTEIROS:
+                valores[campo.name] = int(valor)
+            elif campo.name == "tmb_katch_mcardle" and math.isnan(valor):
+                valores[campo.name] = None
+            else:
+                valores[campo.name] = float(valor)
+        return ResultadoCalculo(**valores)
+
+    def to_resultados(self) -> list[ResultadoCalculo]:
+        return [self[i] for i in range(len(self))]
+
+
+def _round_lote(valores: np.ndarray, casas: int = 0) -> np.ndarray:
+    """Equivalente vetorizado de round() do Python (half-even sobre o valor binario exato).
+    Com casas > 0, np.round escala por 10**casas e pode errar em quase-empates;
+    esses poucos elementos sao refeitos com round() escalar."""
+    if casas == 0:
+        return np.rint(valores)
+    escala = 10.0 ** casas
+    escalado = valores * escala
+    resultado = np.rint(escalado) / escala
+    quase_empate = np.abs(escalado - np.floor(escalado) - 0.5) < 1e-6
+    for i in np.flatnonzero(quase_empate):
+        resultado[i] = round(float(valores[i]), casas)
+    return resultado
+
+
+def _mapear_lote(coluna: np.ndarray, tabela: dict, padrao: float) -> np.ndarray:
+    """Traduz uma coluna categorica via tabela (uma comparacao vetorizada por chave)"""
+    traduzido = np.full(len(coluna), padrao, dtype=np.float64)
+    for chave, valor in tabela.items():
+        traduzido[coluna == chave] = valor
+    return traduzido
+
+
+def _neat_lote(cargo: Sequence[Optional[str]]) -> np.ndarray:
+    """Ajuste NEAT por cargo; normaliza caixa apenas dos valores distintos"""
+    unicos, inverso = np.unique(np.asarray(cargo, dtype=str), return_inverse=True)
+    ajustes = np.array([AJUSTE_NEAT_FUNCAO.get(u.lower(), 0) for u in unicos], dtype=np.float64)
+    return ajustes[inverso.reshape(-1)]
+
+
 class NutriCalculator:
     """Calculadora nutricional completa para contexto offshore"""
 
@@ -250,6 +348,138 @@ class NutriCalculator:
             imc=imc, classificacao_imc=classificacao_imc,
         )
 
+    @classmethod
+    def calcular_lote(
+        cls,
+        peso_kg: Sequence[float],
+        altura_cm: Sequence[float],
+        idade: Sequence[int],
+        sexo: Sequence[str],
+        nivel_atividade: Sequence[str],
+        turno: Optional[Sequence[str]] = None,
+        objetivo: Optional[Sequence[str]] = None,
+        percentual_gordura: Optional[Sequence[Optional[float]]] = None,
+        cargo: Optional[Sequence[Optional[str]]] = None,
+        condicoes: Optional[Sequence[Sequence[str]]] = None,
+    ) -> ResultadoLote:
+        """Versao vetorizada de calcular_completo para uma tripulacao inteira.
+
+        Recebe colunas (uma posicao por colaborador) e reproduz exatamente a
+        aritmetica e o arredondamento do caminho escalar; result[i] == calcular_completo(perfil_i).
+        """
+        peso = np.asarray(peso_kg, dtype=np.float64)
+        altura = np.asarray(altura_cm, dtype=np.float64)
+        idade_arr = np.asarray(idade, dtype=np.float64)
+        n = len(peso)
+        sexo_arr = np.asarray(sexo, dtype=str)
+        nivel = np.asarray(nivel_atividade, dtype=str)
+        turno_arr = np.asarray(turno if turno is not None else ["diurno"] * n, dtype=str)
+        objetivo_arr = np.asarray(objetivo if objetivo is not None else ["saude_geral"] * n, dtype=str)
+        gordura_pct = np.asarray(percentual_gordura if percentual_gordura is not None else [None] * n, dtype=np.float64)
+        cargo_col = cargo if cargo is not None else [None] * n
+        condicoes = condicoes if condicoes is not None else [()] * n
+        for nome, coluna in (("altura_cm", altura), ("idade", idade_arr), ("sexo", sexo_arr), ("nivel_atividade", nivel),
+                             ("turno", turno_arr), ("objetivo", objetivo_arr), ("percentual_gordura", gordura_pct),
+                             ("cargo", cargo_col), ("condicoes", condicoes)):
+            if len(coluna) != n:
+                raise ValueError(f"Coluna '{nome}' tem {len(coluna)} posicoes, esperado {n}")
+        if np.any(altura <= 0):
+            raise ValueError("Altura deve ser maior que zero para calcular o IMC")
+        if np.any(peso <= 0):
+            raise ValueError("Peso deve ser maior que zero para calcular o IMC")
+
+        masculino = sexo_arr == "M"
+        noturno = turno_arr == "noturno"
+        diabetes = np.fromiter(("diabetes_tipo2" in c for c in condicoes), dtype=bool, count=n)
+        dislipidemia = np.fromiter(("dislipidemia" in c for c in condicoes), dtype=bool, count=n)
+
+        # IMC
+        altura_m = altura / 100
+        imc_bruto = peso / (altura_m ** 2)
+        classificacao_imc = _CLASSIFICACOES_IMC[np.searchsorted(_LIMITES_IMC, imc_bruto, side="right")]
+
+        # TMB
+        tmb_hb = _round_lote(np.where(
+            masculino,
+            88.362 + (13.397 * peso) + (4.799 * altura) - (5.677 * idade_arr),
+            447.593 + (9.247 * peso) + (3.098 * altura) - (4.330 * idade_arr),
+        ))
+        tmb_mifflin = _round_lote(np.where(
+            masculino,
+            (10 * peso) + (6.25 * altura) - (5 * idade_arr) + 5,
+            (10 * peso) + (6.25 * altura) - (5 * idade_arr) - 161,
+        ))
+        tem_gordura = (gordura_pct != 0) & ~np.isnan(gordura_pct)
+        tmb_katch = np.where(tem_gordura, _round_lote(370 + (21.6 * (peso * (1 - gordura_pct / 100)))), np.nan)
+        usa_katch = gordura_pct > 0
+        tmb_utilizada = np.where(usa_katch, tmb_katch, tmb_mifflin)
+        formula = np.where(usa_katch, _FORMULA_KATCH, _FORMULA_MIFFLIN)
+
+        # GET
+        fator = _mapear_lote(nivel, FATORES_ATIVIDADE, 1.55)
+        get_base = tmb_utilizada * fator
+        ajuste_noturno = np.where(noturno, -(get_base * 0.07), 0.0)
+        tef = get_base * 0.10
+        neat = _neat_lote(cargo_col)
+        get_total = _round_lote(get_base + ajuste_noturno + tef + neat)
+
+        # Meta calorica
+        ajustes_objetivo = {"perda_peso": -400, "ganho_massa": 250, "manutencao": 0, "performance": 100, "saude_geral": 0}
+        deficit_superavit = _mapear_lote(objetivo_arr, ajustes_objetivo, 0)
+        meta = _round_lote(np.maximum(get_total + deficit_superavit, 1200))
+
+        # Macros
+        proteina_por_kg = np.where(
+            np.isin(objetivo_arr, ("ganho_massa", "performance")), 2.0,
+            np.where(objetivo_arr == "perda_peso", 2.2, 1.6),
+        )
+        proteina_g = _round_lote(peso * proteina_por_kg)
+        proteina_kcal = proteina_g * 4
+        gordura_g = _round_lote(peso * np.where(dislipidemia, 0.8, 1.0))
+        carb_kcal = meta - proteina_kcal - gordura_g * 9
+        carb_g = _round_lote(np.maximum(carb_kcal / 4, 50))
+        reducao_carb = np.where(diabetes, _round_lote(carb_g * 0.20), 0.0)
+        carb_g = carb_g - reducao_carb
+        gordura_g = gordura_g + np.where(diabetes, _round_lote(reducao_carb * 4 / 9), 0.0)
+        carb_kcal = carb_g * 4
+        gordura_kcal = gordura_g * 9
+        total_kcal = proteina_kcal + carb_kcal + gordura_kcal
+
+        # Hidratacao e fibra
+        ajustes_agua = {"sedentario": 0, "leve": 300, "moderado": 500, "intenso": 800}
+        agua = peso * 35 + _mapear_lote(nivel, ajustes_agua, 300) + 200
+        agua = agua + np.where(noturno, 100.0, 0.0)
+        agua = _round_lote(agua / 50) * 50
+        fibra = np.maximum(25, _round_lote(meta / 1000 * 14))
+        fibra = np.where(diabetes, np.maximum(fibra, 30), fibra)
+        fibra = np.minimum(fibra, 40)
+
+        return ResultadoLote(
+            tmb_harris_benedict=tmb_hb, tmb_mifflin=tmb_mifflin, tmb_katch_mcardle=tmb_katch,
+            tmb_utilizada=tmb_utilizada, formula_escolhida=formula,
+            fator_atividade=fator, ajuste_turno_noturno=_round_lote(ajuste_noturno),
+            efeito_termico_alimentos=_round_lote(tef), ajuste_neat=neat,
+            get_total=get_total, meta_calorica=meta, deficit_superavit=deficit_superavit,
+            proteina_g=proteina_g, carboidratos_g=carb_g, gorduras_g=gordura_g,
+            proteina_kcal=proteina_kcal, carboidratos_kcal=carb_kcal, gorduras_kcal=gordura_kcal,
+            proteina_pct=_round_lote(proteina_kcal / total_kcal * 100, 1),
+            carboidratos_pct=_round_lote(carb_kcal / total_kcal * 100, 1),
+            gorduras_pct=_round_lote(gordura_kcal / total_kcal * 100, 1),
+            agua_ml=agua, fibra_g=fibra,
+            imc=_round_lote(imc_bruto, 1), classificacao_imc=classificacao_imc,
+        )
+
+    @classmethod
+    def calcular_lote_perfis(cls, perfis: Sequence[PerfilNutricional], condicoes: Optional[Sequence[Sequence[str]]] = None) -> ResultadoLote:
+        """Atalho de calcular_lote a partir de uma lista de PerfilNutricional"""
+        return cls.calcular_lote(
+            peso_kg=[p.peso_kg for p in perfis], altura_cm=[p.altura_cm for p in perfis],
+            idade=[p.idade for p in perfis], sexo=[p.sexo for p in perfis],
+            nivel_atividade=[p.nivel_atividade for p in perfis], turno=[p.turno for p in perfis],
+            objetivo=[p.objetivo for p in perfis], percentual_gordura=[p.percentual_gordura for p in perfis],
+            cargo=[p.cargo for p in perfis], condicoes=condicoes,
+        )
+
     @classmethod
     def formatar_relatorio(cls, resultado: "ResultadoCalculo", nome: str = "Colaborador") -> str:
         """Formata resultado em texto legivel para o chat"""
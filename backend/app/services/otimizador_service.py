@@ -0,0 +1,324 @@
+"""
+NutriOffshore - Otimizador Cardapio x Plano
+Escolhe, para cada refeicao servida no dia, as porcoes do cardapio que mais se
+aproximam da meta do plano nutricional (kcal e macros proporcionais a refeicao),
+respeitando alergias/intolerancias/restricoes e condicoes de saude. Busca local
+deterministica (adiciona, remove ou troca uma porcao por vez) sobre poucos itens:
+resposta em milissegundos, sem chamar o LLM.
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterable, Optional, Sequence
+from uuid import UUID
+import unicodedata
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.carregamento import CARREGAMENTO_AGENTE
+from app.models.colaborador import Colaborador
+from app.models.plano_nutricional import PlanoNutricional
+from app.services.cardapio_service import NutricaoItem, buscar_cardapios, nutricao_refeicao
+
+# Fracao da meta calorica diaria por refeicao (quando o plano nao detalha as refeicoes)
+DISTRIBUICAO_REFEICOES = {
+    "cafe_manha": 0.20,
+    "lanche_manha": 0.10,
+    "almoco": 0.30,
+    "lanche_tarde": 0.10,
+    "jantar": 0.25,
+    "ceia": 0.05,
+}
+DISTRIBUICAO_PADRAO = 0.20
+
+# Peso de cada desvio relativo (kcal, proteina, carboidrato, gordura) no custo
+PESOS = (4.0, 2.0, 1.0, 1.0)
+# Bonus por porcao de item preferido e custo fixo por porcao (evita pratos inflados)
+BONUS_PREFERIDO = 0.02
+CUSTO_PORCAO = 0.002
+
+MAX_PORCOES_ITEM = 2
+MAX_PORCOES_CATEGORIA = 3
+MAX_PORCOES_REFEICAO = 8
+MAX_ITERACOES = 40
+
+# Termos de preferencias alimentares que cobrem mais de um item do cardapio
+EXPANSAO_TERMOS = {
+    "lactose": ("leite", "queijo", "iogurte", "requeijao", "creme de leite", "manteiga", "nata"),
+    "leite": ("leite",),
+    "queijos fortes": ("queijo",),
+    "frituras": ("frit", "empanad", "milanesa", "pastel"),
+    # "doce" sozinho pegaria "Batata doce"
+    "doces": ("doces", "doce de", "pudim", "bolo", "brigadeiro", "mousse", "sorvete", "chocolate"),
+    "refrigerantes": ("refrigerante",),
+    "gluten": ("trigo", "pao", "macarrao", "biscoito", "bolo", "torrada"),
+    "amendoim": ("amendoim", "pacoca"),
+    "frutos do mar": ("camarao", "lula", "polvo", "marisco", "mexilhao", "lagosta"),
+    "carne vermelha": ("bife", "carne", "picanha", "costela", "cupim"),
+    "embutidos": ("salsicha", "linguica", "bacon", "presunto", "salame", "mortadela"),
+}
+# Categorias excluidas junto com o termo (ex.: intolerancia a lactose -> laticinios)
+CATEGORIAS_TERMOS = {"lactose": "laticinio"}
+
+# Regras por condicao de saude (trecho normalizado da condicao -> restricoes)
+REGRAS_CONDICOES = {
+    "colesterol": {"termos": ("frituras", "embutidos")},
+    "dislipidemia": {"termos": ("frituras", "embutidos")},
+    "diabet": {"termos": ("doces", "refrigerantes"), "ig_alto": True},
+    "hipertens": {"termos": ("embutidos",)},
+    "lactose": {"termos": ("lactose",)},
+    "celiac": {"termos": ("gluten",)},
+}
+
+TIPOS_EXCLUSAO = ("alergia", "intolerancia", "restricao", "aversao")
+
+
+def _normalizar(texto: Optional[str]) -> str:
+    sem_acento = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode()
+    return " ".join(sem_acento.lower().split())
+
+
+def _variantes(termo: str) -> tuple[str, ...]:
+    if termo in EXPANSAO_TERMOS:
+        return EXPANSAO_TERMOS[termo]
+    # "Saladas" tambem cobre "Salada verde"
+    return (termo[:-1],) if termo.endswith("s") and len(termo) > 3 else (termo,)
+
+
+@dataclass
+class Restricoes:
+    """Regras de exclusao e preferencia de um colaborador, ja normalizadas"""
+    termos: list[tuple[str, str]] = field(default_factory=list)
+    categorias: dict[str, str] = field(default_factory=dict)
+    ig_alto: Optional[str] = None
+    preferidos: list[str] = field(default_factory=list)
+
+    def _excluir_termo(self, termo: str, motivo: str) -> None:
+        for variante in _variantes(termo):
+            self.termos.append((variante, motivo))
+        if termo in CATEGORIAS_TERMOS:
+            self.categorias.setdefault(CATEGORIAS_TERMOS[termo], motivo)
+
+    def motivo_exclusao(self, item: NutricaoItem) -> Optional[str]:
+        nome = _normalizar(item.item)
+        for termo, motivo in self.termos:
+            if termo in nome:
+                return motivo
+        if item.categoria in self.categorias:
+            return self.categorias[item.categoria]
+        if self.ig_alto and _normalizar(item.indice_glicemico) == "alto":
+            return self.ig_alto
+        return None
+
+    def preferido(self, item: NutricaoItem) -> bool:
+        nome = _normalizar(item.item)
+        return any(termo in nome for termo in self.preferidos)
+
+
+def restricoes_colaborador(preferencias: Iterable, condicoes: Iterable) -> Restricoes:
+    """Restricoes a partir de PreferenciaAlimentar (tipo/item) e CondicaoSaude ativas"""
+    r = Restricoes()
+    for p in preferencias:
+        tipo, termo = _normalizar(p.tipo), _normalizar(p.item)
+        if not termo:
+            continue
+        if tipo in TIPOS_EXCLUSAO:
+            r._excluir_termo(termo, f"{tipo}: {p.item}")
+        elif tipo == "preferencia":
+            r.preferidos.extend(_variantes(termo))
+    for c in condicoes:
+        if c.ativo is False:
+            continue
+        condicao = _normalizar(c.condicao)
+        for chave, regra in REGRAS_CONDICOES.items():
+            if chave not in condicao:
+                continue
+            for termo in regra.get("termos", ()):
+                r._excluir_termo(termo, f"condicao: {c.condicao}")
+            if regra.get("ig_alto"):
+                r.ig_alto = f"condicao: {c.condicao} (indice glicemico alto)"
+    return r
+
+
+@dataclass
+class MetaRefeicao:
+    kcal: float
+    proteina_g: float
+    carb_g: float
+    gordura_g: float
+
+    def to_dict(self) -> dict:
+        return {"kcal": round(self.kcal), "proteina_g": round(self.proteina_g), "carb_g": round(self.carb_g), "gordura_g": round(self.gordura_g)}
+
+
+def metas_refeicoes(plano: PlanoNutricional, refeicoes: Sequence[str]) -> dict[str, MetaRefeicao]:
+    """Meta de cada refeicao: kcal do plano detalhado (ou fracao padrao) e macros proporcionais"""
+    detalhadas = plano.refeicoes_detalhadas if isinstance(plano.refeicoes_detalhadas, dict) else {}
+    meta_dia = float(plano.meta_calorica)
+    metas = {}
+    for refeicao in refeicoes:
+        detalhe = detalhadas.get(refeicao)
+        kcal = detalhe.get("calorias") if isinstance(detalhe, dict) else None
+        if not kcal:
+            kcal = meta_dia * DISTRIBUICAO_REFEICOES.get(refeicao, DISTRIBUICAO_PADRAO)
+        fracao = float(kcal) / meta_dia
+        metas[refeicao] = MetaRefeicao(
+            kcal=float(kcal),
+            proteina_g=plano.proteina_g * fracao,
+            carb_g=plano.carboidratos_g * fracao,
+            gordura_g=plano.gorduras_g * fracao,
+        )
+    return metas
+
+
+def _custo(totais: list[float], alvo: tuple[float, ...], porcoes: int, bonus: float) -> float:
+    custo = CUSTO_PORCAO * porcoes - bonus
+    for peso, valor, meta in zip(PESOS, totais, alvo):
+        desvio = (valor - meta) / meta
+        custo += peso * desvio * desvio
+    return custo
+
+
+def otimizar_refeicao(itens: Sequence[NutricaoItem], meta: MetaRefeicao, preferidos: Sequence[bool]) -> list[int]:
+    """Porcoes de cada item (mesma ordem de `itens`) que minimizam o desvio da meta.
+
+    Busca local a partir do prato vazio: a cada passo aplica o melhor movimento
+    (mais uma porcao, menos uma porcao ou troca de uma porcao entre itens) que
+    respeita os limites por item/categoria/refeicao, ate nenhum melhorar o custo.
+    """
+    n = len(itens)
+    alvo = tuple(max(v, 1.0) for v in (meta.kcal, meta.proteina_g, meta.carb_g, meta.gordura_g))
+    vetores = [(i.kcal, i.proteina_g, i.carb_g, i.gordura_g) for i in itens]
+    bonus = [BONUS_PREFERIDO if p else 0.0 for p in preferidos]
+    categorias = [i.categoria for i in itens]
+    porcoes = [0] * n
+    por_categoria: dict[Optional[str], int] = {}
+    totais = [0.0, 0.0, 0.0, 0.0]
+    total_porcoes = 0
+    bonus_atual = 0.0
+    custo_atual = _custo(totais, alvo, 0, 0.0)
+
+    def pode_adicionar(j: int, liberada: Optional[int] = None) -> bool:
+        if porcoes[j] >= MAX_PORCOES_ITEM:
+            return False
+        na_categoria = por_categoria.get(categorias[j], 0)
+        if liberada is not None and categorias[liberada] == categorias[j]:
+            na_categoria -= 1
+        return na_categoria < MAX_PORCOES_CATEGORIA
+
+    for _ in range(MAX_ITERACOES):
+        melhor: Optional[tuple[float, int, int]] = None
+        for j in range(n):
+            if total_porcoes < MAX_PORCOES_REFEICAO and pode_adicionar(j):
+                v = vetores[j]
+                novo = [totais[k] + v[k] for k in range(4)]
+                c = _custo(novo, alvo, total_porcoes + 1, bonus_atual + bonus[j])
+                if c < custo_atual - 1e-9 and (melhor is None or c < melhor[0]):
+                    melhor = (c, -1, j)
+            if porcoes[j] == 0:
+                continue
+            v = vetores[j]
+            novo = [totais[k] - v[k] for k in range(4)]
+            c = _custo(novo, alvo, total_porcoes - 1, bonus_atual - bonus[j])
+            if c < custo_atual - 1e-9 and (melhor is None or c < melhor[0]):
+                melhor = (c, j, -1)
+            for m in range(n):
+                if m == j or not pode_adicionar(m, liberada=j):
+                    continue
+                w = vetores[m]
+                troca = [novo[k] + w[k] for k in range(4)]
+                c = _custo(troca, alvo, total_porcoes, bonus_atual - bonus[j] + bonus[m])
+                if c < custo_atual - 1e-9 and (melhor is None or c < melhor[0]):
+                    melhor = (c, j, m)
+        if melhor is None:
+            break
+        custo_atual, sai, entra = melhor
+        for idx, sinal in ((sai, -1), (entra, 1)):
+            if idx < 0:
+                continue
+            porcoes[idx] += sinal
+            por_categoria[categorias[idx]] = por_categoria.get(categorias[idx], 0) + sinal
+            total_porcoes += sinal
+            bonus_atual += sinal * bonus[idx]
+            for k in range(4):
+                totais[k] += sinal * vetores[idx][k]
+    return porcoes
+
+
+def _totais(selecao: list[tuple[NutricaoItem, int]]) -> dict:
+    return {
+        "kcal": round(sum(i.kcal * q for i, q in selecao), 1),
+        "proteina_g": round(sum(i.proteina_g * q for i, q in selecao), 1),
+        "carb_g": round(sum(i.carb_g * q for i, q in selecao), 1),
+        "gordura_g": round(sum(i.gordura_g * q for i, q in selecao), 1),
+    }
+
+
+def sugerir_refeicoes(plano: PlanoNutricional, cardapio_dia: dict[str, list[NutricaoItem]], restricoes: Restricoes) -> dict:
+    """Selecao por refeicao do cardapio do dia ({refeicao: itens normalizados}) para o plano"""
+    metas = metas_refeicoes(plano, list(cardapio_dia))
+    refeicoes = {}
+    excluidos = []
+    selecao_dia: list[tuple[NutricaoItem, int]] = []
+    for refeicao, itens in cardapio_dia.items():
+        permitidos = []
+        for item in itens:
+            motivo = restricoes.motivo_exclusao(item)
+            if motivo:
+                excluidos.append({"refeicao": refeicao, "item": item.item, "motivo": motivo})
+            else:
+                permitidos.append(item)
+        meta = metas[refeicao]
+        porcoes = otimizar_refeicao(permitidos, meta, [restricoes.preferido(i) for i in permitidos])
+        selecao = [(i, q) for i, q in zip(permitidos, porcoes) if q]
+        selecao_dia.extend(selecao)
+        totais = _totais(selecao)
+        refeicoes[refeicao] = {
+            "meta": meta.to_dict(),
+            "itens": [
+                {"item": i.item, "categoria": i.categoria, "porcoes": q, "kcal": round(i.kcal * q, 1),
+                 "proteina_g": round(i.proteina_g * q, 1), "carb_g": round(i.carb_g * q, 1), "gordura_g": round(i.gordura_g * q, 1)}
+                for i, q in selecao
+            ],
+            "totais": totais,
+            "desvio_kcal_pct": round((totais["kcal"] - meta.kcal) / meta.kcal * 100, 1) if meta.kcal else None,
+        }
+    meta_servida = sum(m.kcal for m in metas.values())
+    return {
+        "plano_id": str(plano.id) if plano.id else None,
+        "refeicoes": refeicoes,
+        "totais_dia": _totais(selecao_dia),
+        "meta_refeicoes_servidas_kcal": round(meta_servida),
+        "meta_calorica_dia": plano.meta_calorica,
+        "excluidos": excluidos,
+    }
+
+
+def cardapio_normalizado(cardapios) -> dict[str, list[NutricaoItem]]:
+    """{refeicao: itens normalizados} a partir dos Cardapio carregados com o indice,
+    todos da mesma plataforma (a refeicao de uma sobrescreveria a da outra)"""
+    return {c.refeicao: nutricao_refeicao(c)[0] for c in cardapios}
+
+
+async def sugerir_para_colaborador(
+    db: AsyncSession, colaborador_id: UUID, data: date, plataforma_id: Optional[UUID] = None
+) -> dict:
+    """Sugestao do dia para o colaborador; {"error": ...} sem plano ativo ou sem cardapio.
+    Sem plataforma_id e com cardapio de mais de uma plataforma na data, o erro traz as "plataformas"."""
+    stmt = select(Colaborador).options(*CARREGAMENTO_AGENTE).where(Colaborador.id == colaborador_id)
+    colaborador = (await db.execute(stmt)).scalar_one_or_none()
+    if not colaborador:
+        return {"error": "Colaborador não encontrado"}
+    plano = next((p for p in colaborador.planos if p.ativo), None)
+    if plano is None:
+        return {"error": "Colaborador sem plano nutricional ativo"}
+    cardapios = await buscar_cardapios(db, data, plataforma_id=plataforma_id)
+    if not cardapios:
+        return {"error": "Cardápio não cadastrado para esta data"}
+    plataformas = sorted({str(c.plataforma_id) for c in cardapios})
+    if len(plataformas) > 1:
+        return {"error": "Mais de uma plataforma com cardápio nesta data; informe plataforma_id", "plataformas": plataformas}
+    sugestao = sugerir_refeicoes(
+        plano, cardapio_normalizado(cardapios), restricoes_colaborador(colaborador.preferencias, colaborador.condicoes)
+    )
+    return {"colaborador_id": str(colaborador.id), "data": str(data), **sugestao}
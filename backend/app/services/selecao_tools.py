@@ -0,0 +1,112 @@
+"""
+NutriOffshore - Selecao de Tools por Turno
+Um classificador local (palavras-chave sobre a mensagem normalizada) escolhe as
+intencoes do turno e envia ao LLM so as tools delas, em vez das 12 schemas em
+toda rodada. Cada intencao e um pacote fixo e o subconjunto sai sempre na ordem
+de TOOLS, entao cada combinacao e um prefixo estavel para o cache do provedor.
+Sem intencao reconhecida (ex.: "sim, pode salvar") ou com intencoes demais,
+vai o conjunto completo.
+"""
+from collections import Counter
+import json
+import re
+import unicodedata
+
+from app.agent.tools_definition import TOOLS
+from app.config import get_settings
+
+settings = get_settings()
+
+# Sempre enviadas: o agente busca o perfil antes de recomendar e deve poder sinalizar riscos
+TOOLS_BASE = ("get_colaborador_profile", "flag_alerta_medico")
+
+# Intencao -> (radicais que a indicam, tools do pacote). Radicais casam com o inicio das
+# palavras; os de ate 4 letras so com a palavra inteira ("comi" nao casa "comida").
+INTENCOES: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "cardapio": (
+        ("cardapio", "menu", "refeitorio", "estoque", "disponive", "prato", "comida", "servid", "servem",
+         "almoco", "jantar", "cafe", "lanche", "ceia", "sugest", "suger", "escolh", "montar", "porca", "porco"),
+        ("get_cardapio_dia", "get_cardapio_semana", "get_estoque_refeitorio", "sugerir_refeicoes_cardapio"),
+    ),
+    "registro": (
+        ("registr", "anota", "comi", "almocei", "jantei", "lanchei", "bebi", "tomei", "consumi", "comido"),
+        ("log_refeicao", "get_historico_refeicoes"),
+    ),
+    "progresso": (
+        ("peso", "pesei", "evolu", "progress", "historic", "medic", "imc", "cintura", "gordura", "emagreci", "engordei"),
+        ("get_historico_peso", "get_historico_refeicoes"),
+    ),
+    "plano": (
+        ("plano", "dieta", "meta", "caloria", "kcal", "macro", "proteina", "carboidrato", "gordura", "tmb",
+         "necessidade", "gasto", "emagrec", "perder", "ganhar", "massa", "hipertrofia", "calcul"),
+        ("calcular_necessidades", "save_plano_nutricional", "get_cardapio_dia", "get_cardapio_semana", "sugerir_refeicoes_cardapio"),
+    ),
+    "lembrete": (
+        ("lembr", "notific", "aviso", "avisa", "alarme", "alerta", "agend", "hidrat", "agua"),
+        ("send_notificacao",),
+    ),
+}
+
+# Mais intencoes que isso na mesma mensagem: o subconjunto ja seria quase o completo
+MAX_INTENCOES = 2
+
+
+def _palavras(texto: str) -> list[str]:
+    sem_acento = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode()
+    return re.findall(r"[a-z0-9]+", sem_acento)
+
+
+def _casa(palavra: str, radical: str) -> bool:
+    return palavra == radical if len(radical) <= 4 else palavra.startswith(radical)
+
+
+def classificar(mensagem: str) -> list[str]:
+    """Intencoes reconhecidas na mensagem, na ordem de INTENCOES"""
+    palavras = _palavras(mensagem)
+    return [
+        intencao for intencao, (radicais, _) in INTENCOES.items()
+        if any(_casa(p, r) for p in palavras for r in radicais)
+    ]
+
+
+class SeletorTools:
+    """Escolhe o subconjunto de TOOLS do turno e conta o que foi economizado"""
+
+    def __init__(self, tools: list[dict], enabled: bool = True):
+        self.tools = tools
+        self.enabled = enabled
+        self._tamanho = {t["function"]["name"]: len(json.dumps(t, ensure_ascii=False)) for t in tools}
+        # Subconjuntos memorizados por combinacao de intencoes: mesma lista (e mesmos bytes) sempre
+        self._subconjuntos: dict[tuple[str, ...], list[dict]] = {}
+        self.selecoes: Counter = Counter()
+        self.caracteres_enviados = 0
+        self.caracteres_completo = 0
+
+    def subconjunto(self, intencoes: tuple[str, ...]) -> list[dict]:
+        lista = self._subconjuntos.get(intencoes)
+        if lista is None:
+            nomes = set(TOOLS_BASE).union(*(INTENCOES[i][1] for i in intencoes))
+            lista = self._subconjuntos[intencoes] = [t for t in self.tools if t["function"]["name"] in nomes]
+        return lista
+
+    def selecionar(self, mensagem: str) -> list[dict]:
+        """Tools para as rodadas do turno; o conjunto completo quando a intencao nao e clara"""
+        intencoes = tuple(classificar(mensagem)) if self.enabled else ()
+        if not intencoes or len(intencoes) > MAX_INTENCOES:
+            tools, rotulo = self.tools, "completo"
+        else:
+            tools, rotulo = self.subconjunto(intencoes), "+".join(intencoes)
+        self.selecoes[rotulo] += 1
+        self.caracteres_enviados += sum(self._tamanho[t["function"]["name"]] for t in tools)
+        self.caracteres_completo += sum(self._tamanho.values())
+        return tools
+
+    def metricas(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "selecoes": dict(self.selecoes),
+            "economia_schemas": round(1 - self.caracteres_enviados / self.caracteres_completo, 3) if self.caracteres_completo else 0.0,
+        }
+
+
+seletor_tools = SeletorTools(TOOLS, enabled=settings.TOOLS_SELECAO_ENABLED)
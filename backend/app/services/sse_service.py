@@ -0,0 +1,194 @@
+"""
+NutriOffshore - Camada de Streaming SSE
+Agrupa deltas de texto em frames por tempo/tamanho, envia heartbeats, aplica
+backpressure ao stream do LLM e cancela o upstream quando o cliente desconecta.
+"""
+from typing import Any, AsyncGenerator, AsyncIterator, Optional
+import asyncio
+import json
+import logging
+import time
+
+import anyio
+from fastapi import Request
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Intervalo minimo entre checagens de request.is_disconnected()
+INTERVALO_CHECAGEM_S = 0.25
+
+_FIM = object()
+
+
+class _Falha:
+    def __init__(self, erro: BaseException):
+        self.erro = erro
+
+
+class SSEMetricas:
+    """Totais dos streams SSE desta instancia"""
+
+    def __init__(self):
+        self.ativos = 0
+        self.streams = 0
+        self.desconexoes = 0
+        self.eventos = 0
+        self.frames = 0
+        self.bytes = 0
+        self.heartbeats = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "ativos": self.ativos,
+            "streams": self.streams,
+            "desconexoes": self.desconexoes,
+            "eventos": self.eventos,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "heartbeats": self.heartbeats,
+            "eventos_por_frame": round(self.eventos / self.frames, 2) if self.frames else 0.0,
+        }
+
+
+sse_metricas = SSEMetricas()
+
+
+def _frame(evento: Any) -> str:
+    return f"data: {json.dumps(evento, ensure_ascii=False)}\n\n"
+
+
+class SSEStream:
+    """Converte um gerador de eventos do agente em frames SSE.
+
+    Deltas de texto consecutivos sao agrupados ate `flush_ms` apos o primeiro ou
+    ate `max_bytes`; outros eventos (tool_call, done, error) saem na hora, depois
+    do texto pendente. O gerador roda em uma task produtora com fila limitada:
+    cliente lento para o consumo do LLM em vez de acumular memoria. Se o cliente
+    desconectar, a produtora e o gerador sao cancelados (fechando o stream do LLM).
+    """
+
+    def __init__(
+        self,
+        eventos: AsyncGenerator[dict, None],
+        request: Optional[Request] = None,
+        flush_ms: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        heartbeat_s: Optional[float] = None,
+        tamanho_fila: Optional[int] = None,
+    ):
+        self.eventos = eventos
+        self.request = request
+        self.flush_s = (settings.SSE_FLUSH_MS if flush_ms is None else flush_ms) / 1000
+        self.max_bytes = settings.SSE_FRAME_MAX_BYTES if max_bytes is None else max_bytes
+        self.heartbeat_s = settings.SSE_HEARTBEAT_SECONDS if heartbeat_s is None else heartbeat_s
+        self.tamanho_fila = settings.SSE_FILA_MAX if tamanho_fila is None else tamanho_fila
+        self.n_eventos = 0
+        self.frames = 0
+        self.bytes = 0
+        self.heartbeats = 0
+        self.desconectado = False
+
+    async def _produzir(self, fila: asyncio.Queue) -> None:
+        try:
+            async for evento in self.eventos:
+                await fila.put(evento)
+        except Exception as e:
+            await fila.put(_Falha(e))
+        await fila.put(_FIM)
+
+    def _contar(self, frame: str, eventos: int = 1) -> str:
+        self.frames += 1
+        self.bytes += len(frame.encode("utf-8"))
+        self.n_eventos += eventos
+        return frame
+
+    async def _cliente_desconectou(self) -> bool:
+        if self.request is None:
+            return False
+        return await self.request.is_disconnected()
+
+    async def frames_sse(self) -> AsyncIterator[str]:
+        fila: asyncio.Queue = asyncio.Queue(maxsize=self.tamanho_fila)
+        produtor = asyncio.create_task(self._produzir(fila))
+        sse_metricas.ativos += 1
+        inicio = time.monotonic()
+        texto: list[str] = []
+        texto_bytes = 0
+        prazo: Optional[float] = None
+        ultimo_envio = inicio
+        ultima_checagem = inicio
+        terminou = False
+        try:
+            while True:
+                agora = time.monotonic()
+                if agora - ultima_checagem >= INTERVALO_CHECAGEM_S:
+                    ultima_checagem = agora
+                    if await self._cliente_desconectou():
+                        self.desconectado = True
+                        break
+
+                espera = min(self.heartbeat_s - (agora - ultimo_envio), INTERVALO_CHECAGEM_S)
+                if prazo is not None:
+                    espera = min(espera, prazo - agora)
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=max(espera, 0.0))
+                except asyncio.TimeoutError:
+                    evento = None
+                agora = time.monotonic()
+
+                if isinstance(evento, dict) and evento.get("type") == "text":
+                    texto.append(evento.get("content") or "")
+                    texto_bytes += len(texto[-1].encode("utf-8"))
+                    if prazo is None:
+                        prazo = agora + self.flush_s
+                    if texto_bytes < self.max_bytes and agora < prazo:
+                        continue
+                elif evento is None and (prazo is None or agora < prazo):
+                    if agora - ultimo_envio >= self.heartbeat_s:
+                        self.heartbeats += 1
+                        ultimo_envio = agora
+                        yield self._contar(": ping\n\n", eventos=0)
+                    continue
+
+                # Texto pendente sai antes de qualquer outro evento
+                if texto:
+                    yield self._contar(_frame({"type": "text", "content": "".join(texto)}), eventos=len(texto))
+                    texto, texto_bytes, prazo = [], 0, None
+                    ultimo_envio = agora
+
+                if evento is _FIM:
+                    terminou = True
+                    yield self._contar("data: [DONE]\n\n", eventos=0)
+                    break
+                if isinstance(evento, _Falha):
+                    terminou = True
+                    logger.error(f"Erro no streaming: {evento.erro}", exc_info=evento.erro)
+                    yield self._contar(_frame({"type": "error", "content": "Erro interno ao processar mensagem"}))
+                    yield self._contar("data: [DONE]\n\n", eventos=0)
+                    break
+                if isinstance(evento, dict) and evento.get("type") != "text":
+                    ultimo_envio = agora
+                    yield self._contar(_frame(evento))
+        finally:
+            # Desconexao (ou cancelamento pelo servidor): para o LLM e libera recursos
+            with anyio.CancelScope(shield=True):
+                if not produtor.done():
+                    produtor.cancel()
+                await asyncio.gather(produtor, return_exceptions=True)
+                await self.eventos.aclose()
+            self.desconectado = self.desconectado or not terminou
+            sse_metricas.ativos -= 1
+            sse_metricas.streams += 1
+            sse_metricas.desconexoes += int(self.desconectado)
+            sse_metricas.eventos += self.n_eventos
+            sse_metricas.frames += self.frames
+            sse_metricas.bytes += self.bytes
+            sse_metricas.heartbeats += self.heartbeats
+            logger.info(
+                f"SSE stream: eventos={self.n_eventos}, frames={self.frames}, bytes={self.bytes}, "
+                f"heartbeats={self.heartbeats}, desconectado={self.desconectado}, "
+                f"duracao={time.monotonic() - inicio:.1f}s"
+            )
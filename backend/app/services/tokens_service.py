@@ -0,0 +1,186 @@
+"""
+NutriOffshore - Ledger de Tokens
+Cada chamada ao LLM soma seus tokens em uso_tokens (colaborador, dia, modelo,
+rodada de tools). O agente so enfileira o registro; uma task grava em lotes com
+upsert, fora do caminho da resposta. O consumo do dia alimenta o orcamento:
+acima de TOKENS_ORCAMENTO_DIARIO_SOFT o colaborador passa para o modelo
+economico e para respostas do cache; acima do HARD o LLM nao e chamado.
+A parte do prompt lida do cache de prefixo do provedor (cached_tokens) e
+registrada junto, e por rodada em metricas(), para acompanhar o reaproveitamento.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional
+from uuid import UUID
+import asyncio
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import async_session
+from app.models.uso_tokens import UsoTokens
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+NORMAL, ECONOMICO, ESGOTADO = "normal", "economico", "esgotado"
+
+# Registros juntados em um unico upsert
+TAMANHO_LOTE = 200
+
+
+def nivel_orcamento(consumo: int) -> str:
+    """Nivel do orcamento diario para um consumo (limite 0 = desligado)"""
+    hard, soft = settings.TOKENS_ORCAMENTO_DIARIO_HARD, settings.TOKENS_ORCAMENTO_DIARIO_SOFT
+    if hard and consumo >= hard:
+        return ESGOTADO
+    if soft and consumo >= soft:
+        return ECONOMICO
+    return NORMAL
+
+
+class RegistroTokens:
+    """Fila de registros de uso e a task que os grava em lotes"""
+
+    def __init__(self, max_fila: int):
+        self._fila: asyncio.Queue = asyncio.Queue(maxsize=max_fila)
+        self._task: Optional[asyncio.Task] = None
+        # Tokens enfileirados e ainda nao gravados, por (colaborador, dia): entram no consumo_hoje
+        self._pendentes: dict[tuple[str, date], int] = defaultdict(int)
+        # Prompt e cached tokens por rodada desde o start (taxa de acerto do cache de prefixo)
+        self._prefixo: dict[int, list[int]] = defaultdict(lambda: [0, 0])
+        self.registros = 0
+        self.gravados = 0
+        self.lotes = 0
+        self.descartados = 0
+        self.erros = 0
+
+    def registrar(
+        self, colaborador_id: str, modelo: str, rodada: int, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0
+    ) -> None:
+        """Enfileira o uso de uma chamada; nao bloqueia (fila cheia descarta e conta)"""
+        prefixo = self._prefixo[rodada]
+        prefixo[0] += prompt_tokens
+        prefixo[1] += cached_tokens
+        registro = (colaborador_id, date.today(), modelo, rodada, prompt_tokens, completion_tokens, cached_tokens)
+        try:
+            self._fila.put_nowait(registro)
+        except asyncio.QueueFull:
+            self.descartados += 1
+            return
+        self.registros += 1
+        self._pendentes[(colaborador_id, registro[1])] += prompt_tokens + completion_tokens
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._gravar_continuamente())
+
+    async def _gravar_continuamente(self) -> None:
+        while True:
+            lote = [await self._fila.get()]
+            while len(lote) < TAMANHO_LOTE and not self._fila.empty():
+                lote.append(self._fila.get_nowait())
+            try:
+                await self._gravar(lote)
+            except Exception as e:
+                self.erros += 1
+                logger.error(f"Falha ao gravar {len(lote)} registros de tokens: {e}")
+            finally:
+                for colaborador_id, dia, _, _, prompt, completion, _ in lote:
+                    chave = (colaborador_id, dia)
+                    self._pendentes[chave] -= prompt + completion
+                    if self._pendentes[chave] <= 0:
+                        del self._pendentes[chave]
+                for _ in lote:
+                    self._fila.task_done()
+
+    async def _gravar(self, lote: list[tuple]) -> None:
+        somas: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+        for colaborador_id, dia, modelo, rodada, prompt, completion, cached in lote:
+            soma = somas[(colaborador_id, dia, modelo, rodada)]
+            soma[0] += prompt
+            soma[1] += completion
+            soma[2] += cached
+            soma[3] += 1
+        linhas = [
+            {
+                "colaborador_id": UUID(colaborador_id), "data": dia, "modelo": modelo, "rodada": rodada,
+                "prompt_tokens": p, "completion_tokens": c, "cached_tokens": k, "chamadas": n, "updated_at": datetime.utcnow(),
+            }
+            for (colaborador_id, dia, modelo, rodada), (p, c, k, n) in somas.items()
+        ]
+        stmt = insert(UsoTokens)
+        tabela = UsoTokens.__table__.c
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tabela.colaborador_id, tabela.data, tabela.modelo, tabela.rodada],
+            set_={
+                **{k: tabela[k] + stmt.excluded[k] for k in ("prompt_tokens", "completion_tokens", "cached_tokens", "chamadas")},
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        async with async_session() as db:
+            await db.execute(stmt, linhas)
+            await db.commit()
+        self.lotes += 1
+        self.gravados += len(lote)
+
+    async def consumo_hoje(self, colaborador_id: str) -> int:
+        """Tokens do colaborador hoje: gravados no banco + enfileirados nesta instancia"""
+        hoje = date.today()
+        async with async_session() as db:
+            stmt = select(func.coalesce(func.sum(UsoTokens.prompt_tokens + UsoTokens.completion_tokens), 0)).where(
+                UsoTokens.colaborador_id == UUID(colaborador_id), UsoTokens.data == hoje
+            )
+            gravado = (await db.execute(stmt)).scalar_one()
+        return int(gravado) + self._pendentes.get((colaborador_id, hoje), 0)
+
+    async def fechar(self) -> None:
+        """Grava o que estiver na fila (shutdown)"""
+        if self._task is not None and not self._task.done():
+            await self._fila.join()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def metricas(self) -> dict:
+        return {
+            "registros": self.registros,
+            "gravados": self.gravados,
+            "lotes": self.lotes,
+            "na_fila": self._fila.qsize(),
+            "descartados": self.descartados,
+            "erros": self.erros,
+            "prefixo_cache": {
+                rodada: {"prompt_tokens": p, "cached_tokens": k, "taxa": round(k / p, 3) if p else 0.0}
+                for rodada, (p, k) in sorted(self._prefixo.items())
+            },
+        }
+
+
+registro_tokens = RegistroTokens(settings.TOKENS_FILA_MAX)
+
+
+async def uso_periodo(db: AsyncSession, colaborador_id: UUID, dias: int) -> dict:
+    """Agregados do ledger nos ultimos `dias` dias: por dia, por modelo e por rodada de tools"""
+    inicio = date.today() - timedelta(days=dias - 1)
+    filtro = (UsoTokens.colaborador_id == colaborador_id, UsoTokens.data >= inicio)
+    colunas = (
+        func.sum(UsoTokens.prompt_tokens).label("prompt_tokens"),
+        func.sum(UsoTokens.completion_tokens).label("completion_tokens"),
+        func.sum(UsoTokens.cached_tokens).label("cached_tokens"),
+        func.sum(UsoTokens.chamadas).label("chamadas"),
+    )
+
+    async def agrupar(chave) -> list[dict]:
+        stmt = select(chave, *colunas).where(*filtro).group_by(chave).order_by(chave)
+        return [
+            {chave.key: r[0], "prompt_tokens": int(r[1]), "completion_tokens": int(r[2]),
+             "cached_tokens": int(r[3]), "total_tokens": int(r[1] + r[2]), "chamadas": int(r[4])}
+            for r in (await db.execute(stmt)).all()
+        ]
+
+    return {
+        "por_dia": await agrupar(UsoTokens.data),
+        "por_modelo": await agrupar(UsoTokens.modelo),
+        "por_rodada": await agrupar(UsoTokens.rodada),
+    }
@@ -6,31 +6,97 @@ from datetime import date, datetime, timedelta
 from typing import Any, Optional
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, desc, and_, func
+import asyncio
 import json
 import logging
+import time
 
+from app.database import async_session
 from app.models.colaborador import Colaborador
+from app.models.carregamento import CARREGAMENTO_AGENTE
 from app.models.medicao import Medicao
 from app.models.plano_nutricional import PlanoNutricional
-from app.models.cardapio import Cardapio
 from app.models.refeicao_log import RefeicaoLog
 from app.models.alerta_medico import AlertaMedico
 from app.models.condicao_saude import CondicaoSaude
 from app.models.preferencia_alimentar import PreferenciaAlimentar
 from app.services.nutri_calculator import NutriCalculator, PerfilNutricional
 from app.services.notification_service import NotificationService
+from app.services.cache_service import perfil_cache, invalidar_colaborador
+from app.services.cardapio_service import buscar_cardapios, nutricao_refeicao
+from app.services.consumo_service import acumular_refeicao
+from app.services.otimizador_service import sugerir_para_colaborador
 
 logger = logging.getLogger(__name__)
 
+# Tools sem efeitos colaterais: podem rodar em paralelo, cada uma em sua propria sessao
+TOOLS_SOMENTE_LEITURA = frozenset({
+    "get_colaborador_profile",
+    "get_cardapio_dia",
+    "get_cardapio_semana",
+    "get_historico_peso",
+    "get_historico_refeicoes",
+    "get_estoque_refeitorio",
+    "calcular_necessidades",
+    "sugerir_refeicoes_cardapio",
+})
+
+# Refeicoes detalhadas devolvidas por get_historico_refeicoes (os totais cobrem o periodo todo)
+HISTORICO_REFEICOES_LIMITE = 20
+
+# Tools que gravam dados lidos pelas demais: invalidam o memo do turno
+TOOLS_MUTAVEIS = frozenset({
+    "save_plano_nutricional",
+    "log_refeicao",
+    "flag_alerta_medico",
+})
+
+
+class MemoTurno:
+    """Resultados das tools somente leitura ja executadas no turno, por (tool, args).
+
+    Compartilhado pelas sessoes isoladas das chamadas concorrentes; e esvaziado
+    quando uma tool de TOOLS_MUTAVEIS roda no mesmo turno.
+    """
+
+    def __init__(self):
+        self._resultados: dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    @staticmethod
+    def chave(tool_name: str, tool_input: dict) -> str:
+        return tool_name + ":" + json.dumps(tool_input, sort_keys=True, default=str)
+
+    def get(self, chave: str) -> Optional[str]:
+        resultado = self._resultados.get(chave)
+        if resultado is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return resultado
+
+    def set(self, chave: str, resultado: str) -> None:
+        self._resultados[chave] = resultado
+
+    def invalidar(self) -> None:
+        if self._resultados:
+            self._resultados.clear()
+            self.invalidacoes += 1
+
 
 class ToolsHandler:
-    """Processa tool calls do agente Claude"""
+    """Processa tool calls do agente Claude.
+
+    Sem `db`, cada tool roda em uma sessao propria, aberta e fechada so durante a chamada.
+    """
 
-    def __init__(self, db: AsyncSession, authorized_colaborador_id: Optional[str] = None):
+    def __init__(self, db: Optional[AsyncSession] = None, authorized_colaborador_id: Optional[str] = None, memo: Optional[MemoTurno] = None):
         self.db = db
         self.authorized_colaborador_id = authorized_colaborador_id
+        self.memo = memo if memo is not None else MemoTurno()
 
     def set_authorized_user(self, colaborador_id: str) -> None:
         """Define o colaborador_id autorizado para esta sessao de tools."""
@@ -49,6 +115,8 @@ class ToolsHandler:
         return None
 
     async def handle_tool_call(self, tool_name: str, tool_input: dict) -> str:
+        if self.db is None:
+            return (await self._handle_isolado(tool_name, tool_input))[0]
         handlers = {
             "get_colaborador_profile": self._get_colaborador_profile,
             "get_cardapio_dia": self._get_cardapio_dia,
@@ -61,6 +129,7 @@ class ToolsHandler:
             "get_estoque_refeitorio": self._get_estoque_refeitorio,
             "flag_alerta_medico": self._flag_alerta_medico,
             "calcular_necessidades": self._calcular_necessidades,
+            "sugerir_refeicoes_cardapio": self._sugerir_refeicoes_cardapio,
         }
         handler = handlers.get(tool_name)
         if not handler:
@@ -73,61 +142,122 @@ class ToolsHandler:
             if auth_error:
                 return auth_error
 
+        chave = MemoTurno.chave(tool_name, tool_input) if tool_name in TOOLS_SOMENTE_LEITURA else None
+        if chave is not None:
+            memorizado = self.memo.get(chave)
+            if memorizado is not None:
+                return memorizado
+
         try:
             result = await handler(tool_input)
-            return json.dumps(result, default=str, ensure_ascii=False)
+            resultado = json.dumps(result, default=str, ensure_ascii=False)
+            if tool_name in TOOLS_MUTAVEIS:
+                self.memo.invalidar()
+            elif chave is not None and not (isinstance(result, dict) and "error" in result):
+                self.memo.set(chave, resultado)
+            return resultado
         except Exception as e:
             logger.error(f"Erro executando tool {tool_name}: {e}", exc_info=True)
             return json.dumps({"error": "Erro ao executar operação"})
 
+    async def handle_tool_calls(self, calls: list[tuple[str, dict]]) -> list[str]:
+        """Executa as tool calls de um turno do assistente, preservando a ordem dos resultados.
+
+        Sequencias de tools somente leitura rodam concorrentemente, cada uma em uma
+        sessao propria de async_session; tools que gravam rodam sozinhas (na sessao
+        principal, se houver) e funcionam como barreira (leituras seguintes veem o commit).
+        """
+        resultados: list[str] = [""] * len(calls)
+        inicio = time.perf_counter()
+        soma_ms = 0.0
+        i = 0
+        while i < len(calls):
+            fim = i
+            while fim < len(calls) and calls[fim][0] in TOOLS_SOMENTE_LEITURA:
+                fim += 1
+            if fim - i >= 2:
+                lote = await asyncio.gather(*(self._handle_isolado(nome, args) for nome, args in calls[i:fim]))
+                for k, (resultado, duracao_ms) in enumerate(lote):
+                    resultados[i + k] = resultado
+                    soma_ms += duracao_ms
+                i = fim
+            else:
+                t0 = time.perf_counter()
+                resultados[i] = await self.handle_tool_call(*calls[i])
+                soma_ms += (time.perf_counter() - t0) * 1000
+                i += 1
+        if len(calls) > 1:
+            wall_ms = (time.perf_counter() - inicio) * 1000
+            logger.info(
+                f"Tool round: {len(calls)} calls, wall={wall_ms:.0f}ms, "
+                f"sequencial={soma_ms:.0f}ms, economia={soma_ms - wall_ms:.0f}ms"
+            )
+        return resultados
+
+    def registrar_memo(self) -> None:
+        """Loga os contadores do memo de tools do turno"""
+        if self.memo.hits or self.memo.misses:
+            logger.info(
+                f"Tool memo: hits={self.memo.hits}, misses={self.memo.misses}, "
+                f"invalidacoes={self.memo.invalidacoes}"
+            )
+
+    async def _handle_isolado(self, tool_name: str, tool_input: dict) -> tuple[str, float]:
+        """Executa uma tool somente leitura em sessao propria; retorna (resultado, duracao_ms)"""
+        t0 = time.perf_counter()
+        async with async_session() as db:
+            handler = ToolsHandler(db, self.authorized_colaborador_id, self.memo)
+            resultado = await handler.handle_tool_call(tool_name, tool_input)
+        return resultado, (time.perf_counter() - t0) * 1000
+
     async def _get_colaborador_profile(self, params: dict) -> dict:
         colaborador_id = params.get("colaborador_id")
-        stmt = (select(Colaborador).options(selectinload(Colaborador.medicoes), selectinload(Colaborador.condicoes), selectinload(Colaborador.preferencias), selectinload(Colaborador.planos)).where(Colaborador.id == colaborador_id))
+        snapshot = await perfil_cache.get(str(colaborador_id))
+        if snapshot is not None:
+            return snapshot
+        stmt = select(Colaborador).options(*CARREGAMENTO_AGENTE).where(Colaborador.id == colaborador_id)
         result = await self.db.execute(stmt)
         colaborador = result.scalar_one_or_none()
         if not colaborador:
             return {"error": "Colaborador não encontrado"}
         ultima_medicao = None
-        if colaborador.medicoes:
-            sorted_medicoes = sorted(colaborador.medicoes, key=lambda m: m.data_medicao, reverse=True)
-            m = sorted_medicoes[0]
+        stmt = select(Medicao).where(Medicao.colaborador_id == colaborador_id).order_by(desc(Medicao.data_medicao)).limit(1)
+        m = (await self.db.execute(stmt)).scalar_one_or_none()
+        if m:
             ultima_medicao = {"data": str(m.data_medicao), "peso_kg": float(m.peso_kg) if m.peso_kg else None, "circunferencia_abdominal_cm": float(m.circunferencia_abdominal_cm) if m.circunferencia_abdominal_cm else None, "percentual_gordura": float(m.percentual_gordura) if m.percentual_gordura else None, "glicemia_jejum": float(m.glicemia_jejum) if m.glicemia_jejum else None, "colesterol_total": float(m.colesterol_total) if m.colesterol_total else None, "hdl": float(m.hdl) if m.hdl else None, "ldl": float(m.ldl) if m.ldl else None, "triglicerides": float(m.triglicerides) if m.triglicerides else None, "pressao": f"{m.pressao_sistolica}/{m.pressao_diastolica}" if m.pressao_sistolica else None}
         plano_ativo = None
         for p in colaborador.planos:
             if p.ativo:
                 plano_ativo = {"id": str(p.id), "meta_calorica": p.meta_calorica, "proteina_g": p.proteina_g, "carboidratos_g": p.carboidratos_g, "gorduras_g": p.gorduras_g, "objetivo": p.objetivo, "data_inicio": str(p.data_inicio)}
                 break
-        return {"colaborador": {"id": str(colaborador.id), "matricula": colaborador.matricula, "nome": colaborador.nome, "idade": (date.today() - colaborador.data_nascimento).days // 365, "sexo": colaborador.sexo, "altura_cm": float(colaborador.altura_cm) if colaborador.altura_cm else None, "cargo": colaborador.cargo, "nivel_atividade": colaborador.nivel_atividade, "turno_atual": colaborador.turno_atual, "regime_embarque": colaborador.regime_embarque, "meta_principal": colaborador.meta_principal}, "ultima_medicao": ultima_medicao, "condicoes_saude": [{"condicao": c.condicao, "severidade": c.severidade, "medicamentos": c.medicamentos} for c in colaborador.condicoes if c.ativo], "preferencias": [{"tipo": p.tipo, "item": p.item, "severidade": p.severidade} for p in colaborador.preferencias], "plano_ativo": plano_ativo}
+        perfil = {"colaborador": {"id": str(colaborador.id), "matricula": colaborador.matricula, "nome": colaborador.nome, "idade": (date.today() - colaborador.data_nascimento).days // 365, "sexo": colaborador.sexo, "altura_cm": float(colaborador.altura_cm) if colaborador.altura_cm else None, "cargo": colaborador.cargo, "nivel_atividade": colaborador.nivel_atividade, "turno_atual": colaborador.turno_atual, "regime_embarque": colaborador.regime_embarque, "meta_principal": colaborador.meta_principal}, "ultima_medicao": ultima_medicao, "condicoes_saude": [{"condicao": c.condicao, "severidade": c.severidade, "medicamentos": c.medicamentos} for c in colaborador.condicoes if c.ativo], "preferencias": [{"tipo": p.tipo, "item": p.item, "severidade": p.severidade} for p in colaborador.preferencias], "plano_ativo": plano_ativo}
+        await perfil_cache.set(str(colaborador_id), perfil)
+        return perfil
 
     async def _get_cardapio_dia(self, params: dict) -> dict:
         data_str = params.get("data", str(date.today()))
         data_cardapio = date.fromisoformat(data_str) if isinstance(data_str, str) else data_str
-        plataforma_id = params.get("plataforma_id")
-        stmt = select(Cardapio).where(Cardapio.data == data_cardapio)
-        if plataforma_id:
-            stmt = stmt.where(Cardapio.plataforma_id == plataforma_id)
-        result = await self.db.execute(stmt)
-        cardapios = result.scalars().all()
+        cardapios = await buscar_cardapios(self.db, data_cardapio, plataforma_id=params.get("plataforma_id"))
         if not cardapios:
             return {"data": data_str, "mensagem": "Cardápio não cadastrado para esta data", "refeicoes": {}}
         refeicoes = {}
         for c in cardapios:
-            refeicoes[c.refeicao] = c.itens
+            itens, soma = nutricao_refeicao(c)
+            refeicoes[c.refeicao] = {"itens": [i.to_dict() for i in itens], "totais": soma}
         return {"data": data_str, "refeicoes": refeicoes}
 
     async def _get_cardapio_semana(self, params: dict) -> dict:
         hoje = date.today()
         inicio_semana = hoje - timedelta(days=hoje.weekday())
         fim_semana = inicio_semana + timedelta(days=6)
-        stmt = select(Cardapio).where(and_(Cardapio.data >= inicio_semana, Cardapio.data <= fim_semana)).order_by(Cardapio.data)
-        result = await self.db.execute(stmt)
-        cardapios = result.scalars().all()
+        cardapios = await buscar_cardapios(self.db, inicio_semana, fim_semana)
         semana = {}
         for c in cardapios:
             dia = str(c.data)
             if dia not in semana:
                 semana[dia] = {}
-            semana[dia][c.refeicao] = c.itens
+            itens, soma = nutricao_refeicao(c)
+            semana[dia][c.refeicao] = {"itens": [i.to_dict() for i in itens], "totais": soma}
         return {"semana": semana, "inicio": str(inicio_semana), "fim": str(fim_semana)}
 
     async def _save_plano_nutricional(self, params: dict) -> dict:
@@ -147,12 +277,16 @@ class ToolsHandler:
         self.db.add(novo_plano)
         await self.db.commit()
         await self.db.refresh(novo_plano)
+        await invalidar_colaborador(colaborador_id)
         return {"success": True, "plano_id": str(novo_plano.id), "mensagem": "Plano salvo com sucesso"}
 
     async def _log_refeicao(self, params: dict) -> dict:
         log = RefeicaoLog(colaborador_id=params["colaborador_id"], plano_id=params.get("plano_id"), data=date.today(), refeicao=params["refeicao_tipo"], itens_consumidos=params.get("itens", []), calorias_estimadas=sum(i.get("calorias_estimadas", 0) for i in params.get("itens", [])), aderencia_percentual=params.get("aderencia_plano"), observacoes=params.get("observacoes"))
         self.db.add(log)
+        await self.db.flush()
+        await acumular_refeicao(self.db, log)
         await self.db.commit()
+        await invalidar_colaborador(params["colaborador_id"])
         return {"success": True, "mensagem": "Refeição registrada com sucesso"}
 
     async def _get_historico_peso(self, params: dict) -> dict:
@@ -172,15 +306,17 @@ class ToolsHandler:
         colaborador_id = params["colaborador_id"]
         periodo_dias = int(params.get("periodo", 7))
         data_inicio = date.today() - timedelta(days=periodo_dias)
-        stmt = (select(RefeicaoLog).where(and_(RefeicaoLog.colaborador_id == colaborador_id, RefeicaoLog.data >= data_inicio)).order_by(desc(RefeicaoLog.data)))
-        result = await self.db.execute(stmt)
-        refeicoes = result.scalars().all()
-        total_calorias = sum(r.calorias_estimadas or 0 for r in refeicoes)
+        filtro = and_(RefeicaoLog.colaborador_id == colaborador_id, RefeicaoLog.data >= data_inicio)
+        # Totais do periodo agregados no banco; so as HISTORICO_REFEICOES_LIMITE refeicoes
+        # exibidas trafegam, com colunas projetadas (itens JSONB das demais nem sao lidos)
+        stmt = select(func.count(), func.coalesce(func.sum(RefeicaoLog.calorias_estimadas), 0), func.avg(RefeicaoLog.aderencia_percentual)).where(filtro)
+        total_refeicoes, total_calorias, aderencia_media = (await self.db.execute(stmt)).one()
+        stmt = (select(RefeicaoLog.data, RefeicaoLog.refeicao, RefeicaoLog.itens_consumidos, RefeicaoLog.calorias_estimadas, RefeicaoLog.aderencia_percentual).where(filtro).order_by(desc(RefeicaoLog.data), desc(RefeicaoLog.created_at)).limit(HISTORICO_REFEICOES_LIMITE))
+        refeicoes = (await self.db.execute(stmt)).all()
         dias = max((date.today() - data_inicio).days, 1)
         media_diaria = round(total_calorias / dias)
-        aderencias = [r.aderencia_percentual for r in refeicoes if r.aderencia_percentual]
-        aderencia_media = round(sum(aderencias) / len(aderencias)) if aderencias else None
-        return {"colaborador_id": str(colaborador_id), "periodo_dias": periodo_dias, "total_refeicoes": len(refeicoes), "media_calorias_diaria": media_diaria, "aderencia_media": aderencia_media, "refeicoes": [{"data": str(r.data), "refeicao": r.refeicao, "itens": r.itens_consumidos, "calorias": r.calorias_estimadas, "aderencia": r.aderencia_percentual} for r in refeicoes[:20]]}
+        aderencia_media = round(aderencia_media) if aderencia_media is not None else None
+        return {"colaborador_id": str(colaborador_id), "periodo_dias": periodo_dias, "total_refeicoes": total_refeicoes, "media_calorias_diaria": media_diaria, "aderencia_media": aderencia_media, "refeicoes": [{"data": str(r.data), "refeicao": r.refeicao, "itens": r.itens_consumidos, "calorias": r.calorias_estimadas, "aderencia": r.aderencia_percentual} for r in refeicoes]}
 
     async def _send_notificacao(self, params: dict) -> dict:
         cid = params.get('colaborador_id', '')
@@ -199,6 +335,12 @@ class ToolsHandler:
         logger.warning(f"ALERTA MÉDICO [{alerta.tipo}]: {alerta.motivo}")
         return {"success": True, "alerta_id": str(alerta.id), "mensagem": "Alerta médico registrado e equipe notificada"}
 
+    async def _sugerir_refeicoes_cardapio(self, params: dict) -> dict:
+        data_str = params.get("data") or str(date.today())
+        return await sugerir_para_colaborador(
+            self.db, params.get("colaborador_id"), date.fromisoformat(data_str), plataforma_id=params.get("plataforma_id")
+        )
+
     async def _calcular_necessidades(self, params: dict) -> dict:
         idade = params.get("idade")
         if not idade:
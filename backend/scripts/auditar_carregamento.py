@@ -0,0 +1,119 @@
+"""
+Auditoria de carregamento: conta consultas SQL e bytes carregados por endpoint
+para um colaborador com historico longo (refeicoes e conversas volumosas).
+
+Falha (exit 1) se algum endpoint exceder o orcamento, para que carregamento
+ansioso de relacionamentos nao volte silenciosamente.
+
+Requer um Postgres com o schema aplicado (DATABASE_URL). O colaborador de
+auditoria e criado e removido pelo proprio script.
+
+Uso (a partir de backend/): python scripts/auditar_carregamento.py [--refeicoes 2000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import jwt
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.database import async_session, engine
+from app.main import app
+from app.models.conversa import ConversaAgente
+from app.models.refeicao_log import RefeicaoLog
+
+# endpoint -> (max consultas, max bytes carregados)
+ORCAMENTOS = {
+    "login": (1, 1_024),
+    "listar_colaboradores": (1, 4_096),
+    "buscar_colaborador": (4, 64_000),
+    "atualizar_colaborador": (3, 4_096),
+}
+
+
+class Contador:
+    def __init__(self):
+        self.consultas = 0
+        self.bytes = 0
+
+    def zerar(self):
+        self.consultas = 0
+        self.bytes = 0
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.consultas += 1
+
+    def on_loaded(self, session, instance):
+        state = inspect(instance)
+        for attr in state.mapper.column_attrs:
+            if attr.key in state.dict:
+                valor = state.dict[attr.key]
+                self.bytes += len(json.dumps(valor, default=str, ensure_ascii=False).encode("utf-8"))
+
+
+async def semear_historico(colaborador_id: uuid.UUID, refeicoes: int, conversas: int) -> None:
+    mensagens = [{"role": "user" if i % 2 == 0 else "assistant", "content": "x" * 800} for i in range(60)]
+    async with async_session() as db:
+        hoje = date.today()
+        for i in range(refeicoes):
+            db.add(RefeicaoLog(
+                colaborador_id=colaborador_id, data=hoje - timedelta(days=i // 4), refeicao="almoco",
+                itens_consumidos=[{"alimento": "arroz", "quantidade": "1 concha", "calorias_estimadas": 200}] * 5,
+                calorias_estimadas=1000,
+            ))
+        for _ in range(conversas):
+            db.add(ConversaAgente(colaborador_id=colaborador_id, messages=mensagens))
+        await db.commit()
+
+
+async def main(refeicoes: int, conversas: int) -> int:
+    contador = Contador()
+    event.listen(engine.sync_engine, "before_cursor_execute", contador.on_execute)
+    event.listen(Session, "loaded_as_persistent", contador.on_loaded)
+
+    matricula = f"AUD-{uuid.uuid4().hex[:8]}"
+    senha = "auditoria123"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://auditoria") as client:
+        resp = await client.post("/api/v1/auth/register", json={"matricula": matricula, "senha": senha, "nome": "Auditoria"})
+        resp.raise_for_status()
+        token = resp.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        colaborador_id = uuid.UUID(jwt.decode(token, options={"verify_signature": False})["sub"])
+        await semear_historico(colaborador_id, refeicoes, conversas)
+
+        chamadas = {
+            "login": lambda: client.post("/api/v1/auth/login", json={"matricula": matricula, "senha": senha}),
+            "listar_colaboradores": lambda: client.get("/api/v1/colaboradores/", headers=headers),
+            "buscar_colaborador": lambda: client.get(f"/api/v1/colaboradores/{colaborador_id}", headers=headers),
+            "atualizar_colaborador": lambda: client.put(f"/api/v1/colaboradores/{colaborador_id}", json={"cargo": "soldador"}, headers=headers),
+        }
+        falhas = 0
+        print(f"{'endpoint':<24}{'consultas':>10}{'bytes':>12}  status")
+        for nome, chamada in chamadas.items():
+            contador.zerar()
+            resp = await chamada()
+            max_consultas, max_bytes = ORCAMENTOS[nome]
+            ok = resp.status_code < 400 and contador.consultas <= max_consultas and contador.bytes <= max_bytes
+            falhas += not ok
+            print(f"{nome:<24}{contador.consultas:>10}{contador.bytes:>12}  {'ok' if ok else f'FALHOU (http {resp.status_code}, orcamento {max_consultas}/{max_bytes})'}")
+
+        await client.delete(f"/api/v1/colaboradores/{colaborador_id}", headers=headers)
+    await engine.dispose()
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--refeicoes", type=int, default=2000)
+    parser.add_argument("--conversas", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.refeicoes, args.conversas)))
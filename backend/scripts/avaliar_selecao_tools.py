@@ -0,0 +1,87 @@
+"""
+Relatorio offline de tokens da selecao de tools por turno (sem LLM nem banco).
+
+Para as mensagens rotuladas de tests/test_selecao_tools.py (tools que um turno
+correto precisa e quantas rodadas de tools ele leva), compara o conjunto
+completo (TOOLS) com o subconjunto do seletor:
+  - cobertura: mensagens cujo subconjunto tem todas as tools necessarias;
+  - tokens de schemas de tools por chamada e no turno (rodadas de tools + resposta),
+    contados com o tokenizer do ContextWindow;
+  - tools "distratoras" oferecidas (nao necessarias), que induzem chamadas erradas;
+  - rodadas: um erro de cobertura e contado como o turno perdido e refeito com o
+    conjunto completo (o colaborador reformula), somando as rodadas dele.
+A cobertura minima e os subconjuntos sao verificados pelo pytest; aqui sai com
+codigo 1 so se a selecao nao economizar tokens.
+
+Uso (a partir de backend/):
+    python scripts/avaliar_selecao_tools.py [--detalhes]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+
+from app.agent.tools_definition import TOOLS
+from app.config import get_settings
+from app.services.context_window import criar_tokenizer
+from app.services.selecao_tools import SeletorTools, classificar
+from tests.test_selecao_tools import CASOS
+
+
+def main(detalhes: bool) -> None:
+    tokenizer = criar_tokenizer(get_settings().CONTEXT_TOKENIZER)
+    seletor = SeletorTools(TOOLS)
+    tokens_completo = tokenizer.contar(json.dumps(TOOLS, ensure_ascii=False))
+
+    cobertos = 0
+    soma = {"sel": 0, "completo": 0, "turno_sel": 0, "turno_completo": 0, "distr_sel": 0, "distr_completo": 0,
+            "rodadas_sel": 0, "rodadas_completo": 0, "fallback": 0}
+    for mensagem, necessarias, rodadas in CASOS:
+        tools = seletor.selecionar(mensagem)
+        nomes = {t["function"]["name"] for t in tools}
+        tokens = tokenizer.contar(json.dumps(tools, ensure_ascii=False))
+        chamadas = rodadas + 1
+        coberto = necessarias <= nomes
+        cobertos += coberto
+        soma["fallback"] += len(tools) == len(TOOLS)
+        soma["sel"] += tokens
+        soma["completo"] += tokens_completo
+        soma["distr_sel"] += len(nomes - necessarias)
+        soma["distr_completo"] += len(TOOLS) - len(necessarias)
+        soma["turno_completo"] += chamadas * tokens_completo
+        soma["rodadas_completo"] += chamadas
+        # Sem a tool necessaria o turno e perdido e refeito com o conjunto completo
+        soma["turno_sel"] += chamadas * tokens + (0 if coberto else chamadas * tokens_completo)
+        soma["rodadas_sel"] += chamadas + (0 if coberto else chamadas)
+        if detalhes or not coberto:
+            faltam = sorted(necessarias - nomes)
+            print(f"{'ok   ' if coberto else 'FALTA'} {len(tools):2d} tools {tokens:5d} tok  "
+                  f"{'+'.join(classificar(mensagem)) or 'completo':20s} {mensagem[:55]!r}" + (f"  faltam {faltam}" if faltam else ""))
+
+    n = len(CASOS)
+    cobertura = cobertos / n
+    economia = 1 - soma["turno_sel"] / soma["turno_completo"]
+    print(f"\n{n} mensagens; conjunto completo: {len(TOOLS)} tools, {tokens_completo} tokens por chamada")
+    print(f"cobertura                 {cobertura:6.1%}  ({n - cobertos} turnos sem a tool necessaria, "
+          f"{soma['fallback']} com o conjunto completo por fallback)")
+    print(f"tokens de tools/chamada   completo {soma['completo'] / n:7.0f}   selecao {soma['sel'] / n:7.0f}   "
+          f"({1 - soma['sel'] / soma['completo']:.1%} a menos)")
+    print(f"tokens de tools/turno     completo {soma['turno_completo'] / n:7.0f}   selecao {soma['turno_sel'] / n:7.0f}   "
+          f"({economia:.1%} a menos, contando os turnos refeitos)")
+    print(f"tools distratoras/turno   completo {soma['distr_completo'] / n:7.1f}   selecao {soma['distr_sel'] / n:7.1f}")
+    print(f"chamadas ao LLM/turno     completo {soma['rodadas_completo'] / n:7.2f}   selecao {soma['rodadas_sel'] / n:7.2f}")
+
+    if economia <= 0:
+        print("FALHA: a selecao nao economiza tokens")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--detalhes", action="store_true", help="mostra o subconjunto de cada mensagem")
+    args = parser.parse_args()
+    main(args.detalhes)
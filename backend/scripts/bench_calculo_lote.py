@@ -0,0 +1,89 @@
+"""
+Benchmark: NutriCalculator.calcular_completo (escalar) vs calcular_lote (NumPy).
+Gera perfis sinteticos, confere que os dois caminhos produzem resultados identicos
+e mede a vazao por perfil em 10k e 1M perfis.
+
+Uso (a partir de backend/): python scripts/bench_calculo_lote.py [--verificar 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.nutri_calculator import AJUSTE_NEAT_FUNCAO, NutriCalculator, PerfilNutricional
+
+NIVEIS = ["sedentario", "leve", "moderado", "intenso"]
+OBJETIVOS = ["perda_peso", "ganho_massa", "manutencao", "performance", "saude_geral"]
+CARGOS = list(AJUSTE_NEAT_FUNCAO) + ["Soldador", "engenheiro", None]
+CONDICOES = [[], [], [], ["diabetes_tipo2"], ["dislipidemia"], ["diabetes_tipo2", "dislipidemia"]]
+
+
+def gerar_perfis(n: int, seed: int = 42) -> tuple[list[PerfilNutricional], list[list[str]]]:
+    rng = random.Random(seed)
+    perfis = [
+        PerfilNutricional(
+            peso_kg=round(rng.uniform(45, 160), rng.choice([0, 1, 2])),
+            altura_cm=round(rng.uniform(150, 205), rng.choice([0, 1])),
+            idade=rng.randint(18, 67),
+            sexo=rng.choice(["M", "F"]),
+            nivel_atividade=rng.choice(NIVEIS),
+            turno=rng.choice(["diurno", "noturno"]),
+            objetivo=rng.choice(OBJETIVOS),
+            percentual_gordura=rng.choice([None, 0, round(rng.uniform(8, 40), 1)]),
+            cargo=rng.choice(CARGOS),
+        )
+        for _ in range(n)
+    ]
+    condicoes = [rng.choice(CONDICOES) for _ in range(n)]
+    return perfis, condicoes
+
+
+def verificar(n: int) -> None:
+    perfis, condicoes = gerar_perfis(n, seed=7)
+    lote = NutriCalculator.calcular_lote_perfis(perfis, condicoes)
+    divergencias = 0
+    for i, (perfil, cond) in enumerate(zip(perfis, condicoes)):
+        if lote[i] != NutriCalculator.calcular_completo(perfil, cond):
+            divergencias += 1
+    print(f"verificacao: {n} perfis, {divergencias} divergencias")
+    if divergencias:
+        sys.exit(1)
+
+
+def medir(n: int, escalar_max: int) -> None:
+    perfis, condicoes = gerar_perfis(n)
+    colunas = dict(
+        peso_kg=[p.peso_kg for p in perfis], altura_cm=[p.altura_cm for p in perfis],
+        idade=[p.idade for p in perfis], sexo=[p.sexo for p in perfis],
+        nivel_atividade=[p.nivel_atividade for p in perfis], turno=[p.turno for p in perfis],
+        objetivo=[p.objetivo for p in perfis], percentual_gordura=[p.percentual_gordura for p in perfis],
+        cargo=[p.cargo for p in perfis], condicoes=condicoes,
+    )
+
+    amostra = min(n, escalar_max)
+    inicio = time.perf_counter()
+    for perfil, cond in zip(perfis[:amostra], condicoes[:amostra]):
+        NutriCalculator.calcular_completo(perfil, cond)
+    escalar_us = (time.perf_counter() - inicio) / amostra * 1e6
+
+    inicio = time.perf_counter()
+    NutriCalculator.calcular_lote(**colunas)
+    lote_us = (time.perf_counter() - inicio) / n * 1e6
+
+    print(
+        f"n={n:>9,}  escalar={escalar_us:7.2f} us/perfil (amostra {amostra:,})  "
+        f"lote={lote_us:7.3f} us/perfil  speedup={escalar_us / lote_us:6.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--verificar", type=int, default=20000, help="perfis comparados campo a campo")
+    parser.add_argument("--escalar-max", type=int, default=100000, help="limite de perfis no laco escalar")
+    args = parser.parse_args()
+    verificar(args.verificar)
+    for n in (10_000, 1_000_000):
+        medir(n, args.escalar_max)
@@ -0,0 +1,101 @@
+"""
+Benchmark: corte de historico em conversas de 1k mensagens.
+
+Compara o algoritmo antigo de AgentService._trim_messages (len/4 recalculado a
+cada round, `in` com igualdade de dicts) com ContextWindow.ajustar, simulando
+um turno com 8 rounds de tools (o historico e cortado antes de cada round).
+So mede tempo; o que o corte preserva e verificado em tests/test_context_window.py.
+
+Uso (a partir de backend/): python scripts/bench_context_window.py [--mensagens 1000]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+logging.disable(logging.INFO)
+
+from app.services.context_window import ContextWindow, RegexTokenizer, criar_tokenizer
+
+FRASES = [
+    "Quantas calorias tem o almoco de hoje?",
+    "Hoje o cardapio tem frango grelhado (180 kcal), arroz integral e salada de folhas.",
+    "Estou no turno noturno e sinto fome as 3h da manha, o que posso comer?",
+    "Recomendo uma ceia leve: iogurte natural com aveia ou torrada integral com queijo branco.",
+]
+
+
+def trim_legado(messages: list, max_tokens: int) -> list:
+    def estimate_tokens(msg: dict) -> int:
+        content = msg.get("content", "") or ""
+        extra = ""
+        for tc in msg.get("tool_calls", []) or []:
+            func = tc.get("function", {})
+            extra += func.get("arguments", "") + func.get("name", "")
+        return int((len(content) + len(extra)) / 4)
+
+    total = sum(estimate_tokens(m) for m in messages)
+    if total <= max_tokens:
+        return messages
+    system_msg = messages[0] if messages and messages[0].get("role") == "system" else None
+    last_user_idx = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].get("role") == "user"), None)
+    trimmed = [system_msg] if system_msg else []
+    remaining = max_tokens - (estimate_tokens(system_msg) if system_msg else 0)
+    kept = []
+    for msg in reversed(messages[1:]):
+        t = estimate_tokens(msg)
+        if remaining - t >= 0:
+            kept.append(msg)
+            remaining -= t
+        else:
+            break
+    kept.reverse()
+    if last_user_idx is not None and messages[last_user_idx] not in kept:
+        kept.append(messages[last_user_idx])
+    trimmed.extend(kept)
+    return trimmed
+
+
+def gerar_conversa(n: int) -> list:
+    rng = random.Random(1)
+    messages = [{"role": "system", "content": "Voce e o NutriOffshore. " * 200}]
+    for i in range(n):
+        role = "user" if i % 2 == 0 else "assistant"
+        messages.append({"role": role, "content": " ".join(rng.choice(FRASES) for _ in range(rng.randint(1, 12)))})
+    return messages
+
+
+def medir(nome: str, novo_trim, base: list, rounds: int, repeticoes: int) -> None:
+    """novo_trim() devolve a funcao de corte de um turno (estado por turno, como no AgentService)"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        trim = novo_trim()
+        messages = list(base)
+        for r in range(rounds):
+            trim(messages)
+            messages.append({"role": "tool", "tool_call_id": f"t{r}", "content": '{"ok": true}'})
+    por_turno_ms = (time.perf_counter() - inicio) / repeticoes * 1000
+    print(f"{nome:<28} {por_turno_ms:8.2f} ms/turno ({rounds} rounds, {len(base)} mensagens)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensagens", type=int, default=1000)
+    parser.add_argument("--max-tokens", type=int, default=12000)
+    parser.add_argument("--rounds", type=int, default=8)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    base = gerar_conversa(args.mensagens)
+    medir("legado (len/4)", lambda: lambda m: trim_legado(m, args.max_tokens), base, args.rounds, args.repeticoes)
+    tokenizers = {t.nome: t for t in (RegexTokenizer(), criar_tokenizer("auto"))}
+    for tokenizer in tokenizers.values():
+        medir(
+            f"ContextWindow ({tokenizer.nome})",
+            lambda tok=tokenizer: ContextWindow(args.max_tokens, tokenizer=tok).ajustar,
+            base, args.rounds, args.repeticoes,
+        )
@@ -0,0 +1,96 @@
+"""
+Benchmark: custo de escrita por turno de conversa.
+
+Compara o armazenamento append-only (mensagens_conversa) com o modelo antigo
+(reescrever conversas_agente.messages inteiro a cada turno) ao longo de N turnos.
+O append-only deve manter tempo e bytes enviados constantes por turno.
+
+Requer Postgres com o schema aplicado (DATABASE_URL). Os dados criados sao removidos.
+
+Uso (a partir de backend/): python scripts/bench_conversa_incremental.py [--turnos 600]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+
+from sqlalchemy import delete, update
+
+from app.database import async_session, engine
+from app.models.colaborador import Colaborador
+from app.models.conversa import ConversaAgente
+from app.services.agent_service import AgentService
+
+TURNO = [
+    {"role": "user", "content": "O que tem no almoco hoje e quanto devo comer? " * 4},
+    {"role": "assistant", "content": "Hoje o almoco tem frango grelhado, arroz integral e salada. " * 12},
+]
+
+
+def resumir(nome: str, tempos: list[float], bytes_turno: list[int]) -> None:
+    faixas = [(0, 50), (len(tempos) // 2 - 25, len(tempos) // 2 + 25), (len(tempos) - 50, len(tempos))]
+    partes = []
+    for inicio, fim in faixas:
+        partes.append(
+            f"turnos {inicio + 1}-{fim}: {statistics.median(tempos[inicio:fim]):6.2f} ms, "
+            f"{statistics.median(bytes_turno[inicio:fim]) / 1024:8.1f} KiB"
+        )
+    print(f"{nome:<12} " + " | ".join(partes))
+
+
+async def main(turnos: int) -> None:
+    async with async_session() as db:
+        colaborador = Colaborador(matricula=f"BEN-{uuid.uuid4().hex[:8]}", nome="Benchmark", data_nascimento=date(1990, 1, 1), sexo="M")
+        db.add(colaborador)
+        await db.commit()
+        colaborador_id = colaborador.id
+
+    # Append-only
+    tempos, bytes_turno = [], []
+    conversa = None
+    bytes_por_turno = len(json.dumps(TURNO, ensure_ascii=False).encode("utf-8"))
+    async with async_session() as db:
+        agent = AgentService(db)
+        for _ in range(turnos):
+            inicio = time.perf_counter()
+            conversa = await agent._persistir_turno(conversa, str(colaborador_id), TURNO, 100)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            bytes_turno.append(bytes_por_turno)
+    resumir("append-only", tempos, bytes_turno)
+
+    # Blob legado
+    tempos, bytes_turno = [], []
+    historico: list = []
+    async with async_session() as db:
+        legado = ConversaAgente(colaborador_id=colaborador_id, messages=[])
+        db.add(legado)
+        await db.commit()
+        for _ in range(turnos):
+            historico.extend(TURNO)
+            inicio = time.perf_counter()
+            await db.execute(update(ConversaAgente).where(ConversaAgente.id == legado.id).values(messages=historico))
+            await db.commit()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            bytes_turno.append(len(json.dumps(historico, ensure_ascii=False).encode("utf-8")))
+    resumir("blob legado", tempos, bytes_turno)
+
+    async with async_session() as db:
+        await db.execute(delete(ConversaAgente).where(ConversaAgente.colaborador_id == colaborador_id))
+        await db.execute(delete(Colaborador).where(Colaborador.id == colaborador_id))
+        await db.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turnos", type=int, default=600)
+    args = parser.parse_args()
+    asyncio.run(main(args.turnos))
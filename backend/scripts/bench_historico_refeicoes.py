@@ -0,0 +1,115 @@
+"""
+Benchmark da tool get_historico_refeicoes em um historico de 1 ano.
+
+Cria um colaborador com --refeicoes-dia refeicoes por dia durante --dias dias (itens
+JSONB realistas) e compara, para periodos de 7 a 365 dias, a implementacao antiga
+(carrega todas as refeicoes do periodo como ORM e soma em Python) com a atual
+(agregados no SQL + LIMIT com colunas projetadas). Verifica que os resultados sao
+iguais. Os dados criados sao removidos.
+
+Requer Postgres com o schema aplicado (DATABASE_URL).
+
+Uso (a partir de backend/): python scripts/bench_historico_refeicoes.py [--dias 365] [--refeicoes-dia 5] [--repeticoes 20]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+
+from sqlalchemy import and_, delete, desc, insert, select
+
+from app.database import async_session, engine
+from app.models.colaborador import Colaborador
+from app.models.refeicao_log import RefeicaoLog
+from app.services.tools_handler import ToolsHandler
+
+REFEICOES = ["cafe_manha", "lanche_manha", "almoco", "lanche_tarde", "jantar", "ceia"]
+ALIMENTOS = ["Arroz integral", "Feijão carioca", "Frango grelhado", "Salada verde", "Ovos mexidos", "Pão integral",
+             "Batata doce", "Peixe assado", "Iogurte natural", "Frutas variadas", "Legumes refogados", "Omelete"]
+
+
+async def historico_antigo(db, colaborador_id, periodo_dias: int) -> dict:
+    """Implementacao anterior: todas as linhas do periodo viram ORM, totais em Python"""
+    data_inicio = date.today() - timedelta(days=periodo_dias)
+    stmt = (select(RefeicaoLog).where(and_(RefeicaoLog.colaborador_id == colaborador_id, RefeicaoLog.data >= data_inicio)).order_by(desc(RefeicaoLog.data), desc(RefeicaoLog.created_at)))
+    refeicoes = (await db.execute(stmt)).scalars().all()
+    total_calorias = sum(r.calorias_estimadas or 0 for r in refeicoes)
+    dias = max((date.today() - data_inicio).days, 1)
+    aderencias = [r.aderencia_percentual for r in refeicoes if r.aderencia_percentual]
+    return {"colaborador_id": str(colaborador_id), "periodo_dias": periodo_dias, "total_refeicoes": len(refeicoes), "media_calorias_diaria": round(total_calorias / dias), "aderencia_media": round(sum(aderencias) / len(aderencias)) if aderencias else None, "refeicoes": [{"data": str(r.data), "refeicao": r.refeicao, "itens": r.itens_consumidos, "calorias": r.calorias_estimadas, "aderencia": r.aderencia_percentual} for r in refeicoes[:20]]}
+
+
+async def popular(colaborador_id, dias: int, por_dia: int) -> int:
+    rnd = random.Random(7)
+    linhas = []
+    for d in range(dias):
+        dia = date.today() - timedelta(days=d)
+        for r in range(por_dia):
+            itens = [{"alimento": a, "quantidade": f"{rnd.randint(50, 250)}g", "calorias_estimadas": rnd.randint(40, 350)}
+                     for a in rnd.sample(ALIMENTOS, rnd.randint(3, 6))]
+            linhas.append({
+                "colaborador_id": colaborador_id, "data": dia, "refeicao": REFEICOES[r % len(REFEICOES)],
+                "itens_consumidos": itens, "calorias_estimadas": sum(i["calorias_estimadas"] for i in itens),
+                "proteina_g": rnd.randint(5, 50), "carboidratos_g": rnd.randint(10, 90), "gorduras_g": rnd.randint(2, 35),
+                "aderencia_percentual": rnd.choice([None, rnd.randint(10, 100)]), "observacoes": "registro de benchmark " * 3,
+            })
+    async with async_session() as db:
+        for i in range(0, len(linhas), 1000):
+            await db.execute(insert(RefeicaoLog), linhas[i:i + 1000])
+        await db.commit()
+    return len(linhas)
+
+
+async def medir(funcao, repeticoes: int) -> tuple[float, dict]:
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        async with async_session() as db:
+            inicio = time.perf_counter()
+            resultado = await funcao(db)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), resultado
+
+
+async def main(dias: int, por_dia: int, repeticoes: int) -> None:
+    async with async_session() as db:
+        colaborador = Colaborador(matricula=f"BEN-{uuid.uuid4().hex[:8]}", nome="Benchmark", data_nascimento=date(1990, 1, 1), sexo="M")
+        db.add(colaborador)
+        await db.commit()
+        colaborador_id = colaborador.id
+
+    try:
+        total = await popular(colaborador_id, dias, por_dia)
+        print(f"historico: {total} refeicoes em {dias} dias")
+        print(f"{'periodo':>8} {'linhas':>7} {'antigo (ms)':>12} {'SQL (ms)':>9} {'ganho':>6}")
+        for periodo in (7, 30, 90, 180, 365):
+            antigo_ms, antigo = await medir(lambda db: historico_antigo(db, colaborador_id, periodo), repeticoes)
+            novo_ms, novo = await medir(
+                lambda db: ToolsHandler(db)._get_historico_refeicoes({"colaborador_id": str(colaborador_id), "periodo": periodo}),
+                repeticoes,
+            )
+            assert antigo == novo, f"resultados divergem no periodo de {periodo} dias"
+            print(f"{periodo:>7}d {novo['total_refeicoes']:>7} {antigo_ms:>12.2f} {novo_ms:>9.2f} {antigo_ms / novo_ms:>5.1f}x")
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(RefeicaoLog).where(RefeicaoLog.colaborador_id == colaborador_id))
+            await db.execute(delete(Colaborador).where(Colaborador.id == colaborador_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--refeicoes-dia", type=int, default=5)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.dias, args.refeicoes_dia, args.repeticoes))
@@ -0,0 +1,145 @@
+"""
+Benchmark: cliente LLM por request (comportamento antigo) vs cliente compartilhado.
+
+Sobe um stub local do endpoint /chat/completions do OpenRouter (HTTPS com certificado
+autoassinado gerado na hora, para incluir o handshake TLS) e mede a latencia por
+mensagem: criando um openai.AsyncOpenAI novo a cada request, como o AgentService
+fazia, contra o cliente unico do LLMClientManager com conexoes keep-alive.
+
+Uso (a partir de backend/): python scripts/bench_llm_client.py [--requests 200] [--concorrencia 1]
+"""
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import json
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESPOSTA = json.dumps({
+    "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode()
+
+
+def gerar_certificado(diretorio: str) -> tuple[str, str]:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    chave = ec.generate_private_key(ec.SECP256R1())
+    nome = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    agora = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(nome).issuer_name(nome).public_key(chave.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(agora).not_valid_after(agora + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(chave, hashes.SHA256())
+    )
+    cert_path, key_path = os.path.join(diretorio, "cert.pem"), os.path.join(diretorio, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(chave.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+async def atender(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, latencia: float) -> None:
+    """HTTP/1.1 minimo com keep-alive: le headers + corpo e responde o JSON fixo"""
+    try:
+        while True:
+            cabecalho = await reader.readuntil(b"\r\n\r\n")
+            tamanho = 0
+            for linha in cabecalho.split(b"\r\n"):
+                if linha.lower().startswith(b"content-length:"):
+                    tamanho = int(linha.split(b":", 1)[1])
+            await reader.readexactly(tamanho)
+            if latencia:
+                await asyncio.sleep(latencia)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: keep-alive\r\n"
+                + f"Content-Length: {len(RESPOSTA)}\r\n\r\n".encode() + RESPOSTA
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def medir(nome: str, chamar, total: int, concorrencia: int) -> float:
+    latencias: list[float] = []
+    fila = asyncio.Queue()
+    for _ in range(total):
+        fila.put_nowait(None)
+
+    async def trabalhador():
+        while not fila.empty():
+            fila.get_nowait()
+            inicio = time.perf_counter()
+            await chamar()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    latencias.sort()
+    p50 = statistics.median(latencias)
+    print(f"{nome:<14} p50={p50:7.2f} ms  p95={latencias[int(len(latencias) * 0.95) - 1]:7.2f} ms  max={latencias[-1]:7.2f} ms")
+    return p50
+
+
+async def main(total: int, concorrencia: int, latencia: float) -> None:
+    diretorio = tempfile.mkdtemp()
+    cert_path, key_path = gerar_certificado(diretorio)
+    ssl_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ssl_ctx.load_cert_chain(cert_path, key_path)
+    server = await asyncio.start_server(lambda r, w: atender(r, w, latencia), "127.0.0.1", 0, ssl=ssl_ctx)
+    porta = server.sockets[0].getsockname()[1]
+
+    # Settings sao lidas no import; o cliente confia no certificado via SSL_CERT_FILE
+    os.environ["SSL_CERT_FILE"] = cert_path
+    os.environ["OPENROUTER_BASE_URL"] = f"https://localhost:{porta}/v1"
+    os.environ["OPENROUTER_API_KEY"] = "stub"
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+    import openai
+    from app.services.llm_service import llm_clients
+
+    mensagens = [{"role": "user", "content": "qual o almoco de hoje?"}]
+
+    async def por_request():
+        client = openai.AsyncOpenAI(base_url=os.environ["OPENROUTER_BASE_URL"], api_key="stub")
+        await client.chat.completions.create(model="stub", messages=mensagens)
+        await client.close()
+
+    async def compartilhado():
+        await llm_clients.client.chat.completions.create(model="stub", messages=mensagens)
+
+    # Aquecimento (imports, primeira conexao)
+    await por_request()
+    await compartilhado()
+    antigo = await medir("por request", por_request, total, concorrencia)
+    novo = await medir("compartilhado", compartilhado, total, concorrencia)
+    print(f"reducao por mensagem: {antigo - novo:.2f} ms ({(1 - novo / antigo) * 100:.0f}%)")
+
+    await llm_clients.fechar()
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=1)
+    parser.add_argument("--latencia", type=float, default=0.0, help="atraso do stub em segundos")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concorrencia, args.latencia))
@@ -0,0 +1,130 @@
+"""
+Benchmark do otimizador cardapio x plano para uma tripulacao inteira.
+
+Gera N colaboradores sinteticos (meta calorica, macros, alergias, intolerancias e
+condicoes variadas) e calcula a sugestao de cada um contra o cardapio de um dia:
+o do seed (embutido) ou, com --banco, o cardapio de hoje gravado no banco. Mede o
+tempo por colaborador (p50/p95/max), o desvio medio de kcal por refeicao e
+verifica que nenhum item excluido pelas restricoes foi sugerido.
+
+Uso (a partir de backend/): python scripts/bench_otimizador_cardapio.py [--tripulacao 200] [--banco]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+
+from app.services.cardapio_service import normalizar_item
+from app.services.nutri_calculator import NutriCalculator
+from app.services.otimizador_service import cardapio_normalizado, restricoes_colaborador, sugerir_refeicoes
+
+CARDAPIO_SEED = {
+    "cafe_manha": [
+        ("Ovos mexidos", "proteina", 180, 14, 2, 12), ("Pão integral", "carboidrato", 130, 5, 24, 2),
+        ("Pão francês", "carboidrato", 150, 4, 30, 1), ("Tapioca", "carboidrato", 120, 0, 28, 0),
+        ("Frutas variadas", "fruta", 80, 1, 20, 0), ("Iogurte natural", "laticinio", 90, 6, 8, 4),
+        ("Granola", "cereal", 140, 3, 22, 5), ("Café", "bebida", 5, 0, 0, 0),
+    ],
+    "almoco": [
+        ("Arroz branco", "carboidrato", 200, 4, 44, 0, "alto"), ("Arroz integral", "carboidrato", 180, 4, 38, 2, "medio"),
+        ("Feijão carioca", "leguminosa", 150, 9, 25, 1, "baixo"), ("Frango grelhado", "proteina", 220, 35, 0, 8),
+        ("Peixe assado", "proteina", 200, 30, 0, 8), ("Bife acebolado", "proteina", 280, 28, 5, 16),
+        ("Salada verde", "vegetal", 25, 2, 4, 0), ("Batata doce", "carboidrato", 160, 2, 37, 0, "medio"),
+        ("Legumes refogados", "vegetal", 80, 3, 12, 3), ("Sobremesa - Fruta", "fruta", 70, 1, 18, 0),
+    ],
+    "jantar": [
+        ("Sopa de legumes com frango", "prato_completo", 250, 18, 28, 6),
+        ("Macarrão integral com molho", "carboidrato", 320, 12, 52, 8),
+        ("Omelete de legumes", "proteina", 200, 16, 4, 14), ("Salada completa", "vegetal", 120, 6, 15, 4),
+        ("Pão integral", "carboidrato", 130, 5, 24, 2), ("Fruta da estação", "fruta", 70, 1, 18, 0),
+    ],
+}
+
+PREFERENCIAS = [
+    ("alergia", "Amendoim"), ("intolerancia", "Lactose"), ("restricao", "Frituras"), ("aversao", "Peixe"),
+    ("aversao", "Ovos"), ("restricao", "Doces"), ("preferencia", "Frango grelhado"), ("preferencia", "Saladas"),
+    ("preferencia", "Arroz integral"), ("alergia", "Frutos do mar"),
+]
+CONDICOES = ["Colesterol Alto", "Pré-diabetes", "Hipertensão", "Intolerância à Lactose", "Diabetes tipo 2"]
+
+
+def cardapio_seed() -> dict:
+    cardapio = {}
+    for refeicao, itens in CARDAPIO_SEED.items():
+        cardapio[refeicao] = [
+            normalizar_item({"item": i[0], "categoria": i[1], "calorias_porcao": i[2], "proteina_g": i[3],
+                             "carb_g": i[4], "gordura_g": i[5], "indice_glicemico": i[6] if len(i) > 6 else None})
+            for i in itens
+        ]
+    return cardapio
+
+
+async def cardapio_banco() -> dict:
+    from app.database import async_session, engine
+    from app.services.cardapio_service import buscar_cardapios
+
+    async with async_session() as db:
+        cardapios = await buscar_cardapios(db, date.today())
+    await engine.dispose()
+    if not cardapios:
+        sys.exit("Nenhum cardapio cadastrado para hoje")
+    return cardapio_normalizado(cardapios)
+
+
+def tripulacao(n: int, rnd: random.Random) -> list[tuple]:
+    colaboradores = []
+    for _ in range(n):
+        peso = rnd.uniform(60, 110)
+        meta = rnd.choice(range(1800, 3700, 100))
+        condicoes = rnd.sample(CONDICOES, rnd.choice((0, 0, 1, 2)))
+        macros = NutriCalculator.distribuir_macros(meta, peso, rnd.choice(("perda_peso", "manutencao", "ganho_massa")))
+        plano = SimpleNamespace(
+            id=None, meta_calorica=meta, proteina_g=macros["proteina_g"], carboidratos_g=macros["carboidratos_g"],
+            gorduras_g=macros["gorduras_g"], refeicoes_detalhadas=None,
+        )
+        preferencias = [SimpleNamespace(tipo=t, item=i) for t, i in rnd.sample(PREFERENCIAS, rnd.randint(0, 4))]
+        colaboradores.append((plano, preferencias, [SimpleNamespace(condicao=c, ativo=True) for c in condicoes]))
+    return colaboradores
+
+
+def main(n: int, banco: bool) -> None:
+    cardapio = asyncio.run(cardapio_banco()) if banco else cardapio_seed()
+    colaboradores = tripulacao(n, random.Random(42))
+
+    tempos_ms, desvios, violacoes = [], [], 0
+    inicio = time.perf_counter()
+    for plano, preferencias, condicoes in colaboradores:
+        t0 = time.perf_counter()
+        restricoes = restricoes_colaborador(preferencias, condicoes)
+        sugestao = sugerir_refeicoes(plano, cardapio, restricoes)
+        tempos_ms.append((time.perf_counter() - t0) * 1000)
+        for refeicao, resultado in sugestao["refeicoes"].items():
+            desvios.append(abs(resultado["desvio_kcal_pct"]))
+            nomes = {i["item"] for i in resultado["itens"]}
+            violacoes += sum(1 for i in cardapio[refeicao] if i.item in nomes and restricoes.motivo_exclusao(i))
+    total_ms = (time.perf_counter() - inicio) * 1000
+
+    tempos_ms.sort()
+    print(f"tripulacao={n} refeicoes={len(cardapio)} itens={sum(len(v) for v in cardapio.values())}")
+    print(f"total={total_ms:.1f}ms  por colaborador: p50={statistics.median(tempos_ms):.2f}ms "
+          f"p95={tempos_ms[int(len(tempos_ms) * 0.95) - 1]:.2f}ms max={tempos_ms[-1]:.2f}ms")
+    print(f"desvio |kcal| por refeicao: medio={statistics.mean(desvios):.1f}% p95={sorted(desvios)[int(len(desvios) * 0.95) - 1]:.1f}%")
+    print(f"itens restritos sugeridos: {violacoes}")
+    if violacoes:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tripulacao", type=int, default=200)
+    parser.add_argument("--banco", action="store_true", help="usa o cardapio de hoje gravado no banco")
+    args = parser.parse_args()
+    main(args.tripulacao, args.banco)
@@ -0,0 +1,107 @@
+"""
+Benchmark/verificacao da camada SSE (SSEStream).
+
+1. Agrupamento: um "LLM" falso emite deltas de poucos caracteres a cada --intervalo-ms;
+   compara frames/bytes do formato antigo (um frame por delta) com o SSEStream.
+2. Heartbeat: pausa longa do upstream deve gerar comentarios ": ping".
+3. Desconexao: request falso que desconecta no meio; o upstream deve ser fechado
+   e parar de produzir deltas logo depois.
+
+Uso (a partir de backend/): python scripts/bench_sse_stream.py [--deltas 400] [--intervalo-ms 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+
+from app.services.sse_service import SSEStream, sse_metricas
+
+
+class Upstream:
+    """Gerador de eventos no formato do AgentService, com contadores"""
+
+    def __init__(self, deltas: int, intervalo: float, pausa: float = 0.0):
+        self.deltas = deltas
+        self.intervalo = intervalo
+        self.pausa = pausa
+        self.produzidos = 0
+        self.fechado = False
+
+    async def eventos(self):
+        try:
+            yield {"type": "tool_call", "tool": "get_cardapio_dia"}
+            for i in range(self.deltas):
+                if self.pausa and i == self.deltas // 2:
+                    await asyncio.sleep(self.pausa)
+                await asyncio.sleep(self.intervalo)
+                self.produzidos += 1
+                yield {"type": "text", "content": "ção "}
+            yield {"type": "done", "conversa_id": "00000000-0000-0000-0000-000000000000"}
+        finally:
+            self.fechado = True
+
+
+class RequestFalso:
+    def __init__(self, desconecta_em: float):
+        self.desconecta_em = time.monotonic() + desconecta_em
+
+    async def is_disconnected(self) -> bool:
+        return time.monotonic() >= self.desconecta_em
+
+
+async def formato_antigo(up: Upstream) -> tuple[int, int]:
+    frames = bytes_ = 0
+    async for chunk in up.eventos():
+        frame = f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        frames += 1
+        bytes_ += len(frame.encode())
+    frame = "data: [DONE]\n\n"
+    return frames + 1, bytes_ + len(frame)
+
+
+async def consumir(stream: SSEStream) -> list[str]:
+    return [frame async for frame in stream.frames_sse()]
+
+
+async def main(deltas: int, intervalo_ms: float) -> None:
+    intervalo = intervalo_ms / 1000
+
+    frames, bytes_ = await formato_antigo(Upstream(deltas, intervalo))
+    up = Upstream(deltas, intervalo)
+    stream = SSEStream(up.eventos(), flush_ms=50, max_bytes=1024, heartbeat_s=15)
+    saida = await consumir(stream)
+    texto = "".join(json.loads(f[6:])["content"] for f in saida if f.startswith('data: {"type": "text"'))
+    assert texto == "ção " * deltas, "texto agrupado diverge do original"
+    print(f"agrupamento   antigo: frames={frames:4d} bytes={bytes_:6d}   "
+          f"SSEStream: frames={stream.frames:4d} bytes={stream.bytes:6d}   "
+          f"({stream.n_eventos / stream.frames:.1f} eventos/frame)")
+
+    up = Upstream(20, 0.001, pausa=1.0)
+    stream = SSEStream(up.eventos(), flush_ms=50, heartbeat_s=0.3)
+    saida = await consumir(stream)
+    print(f"heartbeat     pausa de 1.0s com heartbeat de 0.3s: pings={saida.count(': ping' + chr(10) * 2)}")
+
+    up = Upstream(deltas * 10, intervalo)
+    stream = SSEStream(up.eventos(), RequestFalso(desconecta_em=0.6), flush_ms=50)
+    inicio = time.monotonic()
+    await consumir(stream)
+    apos = up.produzidos
+    await asyncio.sleep(0.3)
+    print(f"desconexao    encerrado em {time.monotonic() - inicio:.2f}s, upstream fechado={up.fechado}, "
+          f"deltas produzidos={apos}/{deltas * 10}, produzidos apos fechar={up.produzidos - apos}")
+    assert up.fechado and up.produzidos == apos
+
+    print(f"metricas: {sse_metricas.snapshot()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deltas", type=int, default=400)
+    parser.add_argument("--intervalo-ms", type=float, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.deltas, args.intervalo_ms))
@@ -0,0 +1,68 @@
+"""
+Teste de carga: latencia do event loop durante uma rajada de logins.
+
+Simula um stream SSE de chat (um "tick" a cada 20 ms, como deltas de token) enquanto
+N logins verificam bcrypt. Compara bcrypt sincrono no handler (comportamento antigo)
+com verify_password_async (pool de threads). Com o pool, o atraso dos ticks deve
+permanecer proximo de zero independentemente da rajada.
+
+Uso (a partir de backend/): python scripts/carga_login_event_loop.py [--logins 40]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+
+from app.auth import hash_password, password_pool, verify_password, verify_password_async
+
+INTERVALO_TICK = 0.020
+
+
+async def stream_sse(parar: asyncio.Event, atrasos: list[float]) -> None:
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(INTERVALO_TICK)
+        atrasos.append((time.perf_counter() - inicio - INTERVALO_TICK) * 1000)
+
+
+async def login_sincrono(senha: str, hashed: str) -> bool:
+    return verify_password(senha, hashed)
+
+
+async def rodar(nome: str, login, logins: int, streams: int, hashed: str) -> None:
+    atrasos: list[float] = []
+    parar = asyncio.Event()
+    tarefas_sse = [asyncio.create_task(stream_sse(parar, atrasos)) for _ in range(streams)]
+    await asyncio.sleep(0.2)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(login("senha-correta", hashed) for _ in range(logins)))
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    await asyncio.gather(*tarefas_sse)
+    atrasos.sort()
+    p99 = atrasos[int(len(atrasos) * 0.99) - 1]
+    print(
+        f"{nome:<10} rajada={duracao:6.2f}s  atraso SSE p50={statistics.median(atrasos):7.1f} ms  "
+        f"p99={p99:7.1f} ms  max={atrasos[-1]:7.1f} ms"
+    )
+
+
+async def main(logins: int, streams: int) -> None:
+    hashed = hash_password("senha-correta")
+    await rodar("sincrono", login_sincrono, logins, streams, hashed)
+    await rodar("pool", verify_password_async, logins, streams, hashed)
+    print(f"metricas do pool: {password_pool.metricas()}")
+    password_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--streams", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.streams))
@@ -0,0 +1,164 @@
+"""
+Teste de carga: esgotamento do pool de conexoes com streams de chat concorrentes.
+
+Dispara N streams em /api/v1/chat/mensagem/stream contra o app (ASGI em processo) com
+um LLM falso: o round 0 pede get_colaborador_profile e o round 1 transmite a resposta
+devagar. Em paralelo, requests curtos de cardapio disputam o mesmo pool. Se as sessoes
+dos streams segurarem conexoes durante o LLM, os requests curtos esperam ate
+DB_POOL_TIMEOUT e falham. Ao final imprime as metricas de /metrics (db_pool).
+
+Antes da carga, streams sequenciais verificam que nenhuma conexao do pool fica em uso
+enquanto o LLM responde (amostrado a cada chunk); sai com codigo 1 se ficar.
+
+Uso (a partir de backend/, com o banco do seed):
+    python scripts/carga_pool_chat_stream.py [--streams 20] [--pool 4] [--overflow 0] [--timeout 3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def configurar_ambiente(args) -> None:
+    # Settings sao lidas no import: configurar o pool antes de importar o app
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+    os.environ["DB_POOL_SIZE"] = str(args.pool)
+    os.environ["DB_MAX_OVERFLOW"] = str(args.overflow)
+    os.environ["DB_POOL_TIMEOUT"] = str(args.timeout)
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    # Mede o pool, nao a admissao: todos os streams entram juntos
+    os.environ["LLM_ADMISSAO_MAX_CONCORRENTES"] = str(args.streams)
+    os.environ["AUTH_ENABLED"] = "false"
+    os.environ["METRICS_TOKEN"] = "carga"
+
+
+def _chunk(content=None, tool_call=None):
+    delta = SimpleNamespace(content=content, tool_calls=[tool_call] if tool_call else None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class StreamFalso:
+    # Conexoes em uso no pool amostradas durante a "latencia" do modelo
+    amostras_em_uso: list[int] = []
+
+    def __init__(self, chunks, atraso):
+        self.chunks = chunks
+        self.atraso = atraso
+
+    def __aiter__(self):
+        return self._gerar()
+
+    async def _gerar(self):
+        from app.database import pool_metricas
+        for c in self.chunks:
+            self.amostras_em_uso.append(pool_metricas.em_uso)
+            await asyncio.sleep(self.atraso)
+            yield c
+
+
+class LLMFalso:
+    """Substitui o cliente LLM compartilhado: tool call no primeiro round, texto lento no segundo"""
+
+    tokens = 40
+    atraso = 0.05
+    colaborador_id = ""
+
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, stream=False, **kwargs):
+        if not any(m.get("role") == "tool" for m in messages):
+            tc = SimpleNamespace(
+                index=0, id="call_0",
+                function=SimpleNamespace(name="get_colaborador_profile", arguments=json.dumps({"colaborador_id": self.colaborador_id})),
+            )
+            return StreamFalso([_chunk(tool_call=tc)], self.atraso)
+        return StreamFalso([_chunk(content="tok ") for _ in range(self.tokens)], self.atraso)
+
+
+async def main(args) -> None:
+    import httpx
+    from sqlalchemy import text
+    from app.main import app
+    from app.database import async_session, engine
+    from app.rate_limit import limiter
+    from app.services.llm_service import llm_clients
+
+    limiter.enabled = False
+    llm_clients.substituir(LLMFalso())
+    LLMFalso.tokens, LLMFalso.atraso = args.tokens, args.atraso
+
+    async with async_session() as db:
+        colaborador_id = str((await db.execute(text("select id from colaboradores limit 1"))).scalar_one())
+    LLMFalso.colaborador_id = colaborador_id
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://carga", timeout=120) as client:
+
+        async def stream() -> tuple[float, bool]:
+            inicio = time.perf_counter()
+            ok = True
+            async with client.stream(
+                "POST", "/api/v1/chat/mensagem/stream",
+                json={"colaborador_id": colaborador_id, "mensagem": "qual meu plano?"},
+            ) as r:
+                async for linha in r.aiter_lines():
+                    if linha.startswith("data: {") and json.loads(linha[6:]).get("type") == "error":
+                        ok = False
+            return time.perf_counter() - inicio, ok
+
+        async def leitura_curta() -> tuple[float, bool]:
+            inicio = time.perf_counter()
+            r = await client.get("/api/v1/cardapios/semana")
+            return time.perf_counter() - inicio, r.status_code == 200
+
+        for _ in range(3):
+            await stream()
+        max_em_uso = max(StreamFalso.amostras_em_uso)
+        print(
+            f"conexoes em uso durante a latencia do LLM: max={max_em_uso} "
+            f"({len(StreamFalso.amostras_em_uso)} amostras)"
+        )
+        if max_em_uso:
+            print("FALHA: o agente segura conexoes do pool enquanto espera o modelo")
+            sys.exit(1)
+
+        inicio = time.perf_counter()
+        tarefas = [asyncio.create_task(stream()) for _ in range(args.streams)]
+        await asyncio.sleep(args.atraso * 3)
+        curtas = await asyncio.gather(*(leitura_curta() for _ in range(args.leituras)), return_exceptions=True)
+        streams = await asyncio.gather(*tarefas, return_exceptions=True)
+        duracao = time.perf_counter() - inicio
+
+        def resumo(nome, resultados):
+            ok = [r[0] * 1000 for r in resultados if not isinstance(r, BaseException) and r[1]]
+            falhas = len(resultados) - len(ok)
+            lat = f"p50={statistics.median(ok):7.0f} ms  max={max(ok):7.0f} ms" if ok else "sem sucesso"
+            print(f"{nome:<16} ok={len(ok):3d}  falhas={falhas:3d}  {lat}")
+
+        print(f"pool_size={args.pool} overflow={args.overflow} timeout={args.timeout}s streams={args.streams} ({duracao:.1f}s)")
+        resumo("streams de chat", streams)
+        resumo("leituras curtas", curtas)
+        metricas = (await client.get("/metrics", headers={"Authorization": "Bearer carga"})).json()["db_pool"]
+        print(json.dumps(metricas, indent=2))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--leituras", type=int, default=10)
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--overflow", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=3.0)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--atraso", type=float, default=0.05, help="segundos entre chunks do LLM falso")
+    args = parser.parse_args()
+    configurar_ambiente(args)
+    asyncio.run(main(args))
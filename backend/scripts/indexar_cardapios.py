@@ -0,0 +1,52 @@
+"""
+Backfill do indice nutricional dos cardapios (revisao Alembic 0007).
+
+Indexa os cardapios ainda sem indexado_em (ou todos, com --todos): grava os totais
+da refeicao em cardapios e os itens normalizados em cardapio_itens, em lotes.
+
+Uso (a partir de backend/): python scripts/indexar_cardapios.py [--todos] [--lote 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+
+from sqlalchemy import select
+
+from app.database import async_session, engine
+from app.models.cardapio import Cardapio
+from app.services.cardapio_service import CARREGAMENTO_INDICE, indexar
+
+
+async def main(todos: bool, lote: int) -> None:
+    total = 0
+    ultimo_id = None
+    while True:
+        async with async_session() as db:
+            stmt = select(Cardapio).options(*CARREGAMENTO_INDICE).order_by(Cardapio.id).limit(lote)
+            if not todos:
+                stmt = stmt.where(Cardapio.indexado_em.is_(None))
+            if ultimo_id is not None:
+                stmt = stmt.where(Cardapio.id > ultimo_id)
+            cardapios = (await db.execute(stmt)).scalars().all()
+            if not cardapios:
+                break
+            for c in cardapios:
+                indexar(c)
+            await db.commit()
+            ultimo_id = cardapios[-1].id
+            total += len(cardapios)
+            print(f"  {total} cardapios indexados")
+    print(f"concluido: {total} cardapios")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--todos", action="store_true", help="reindexa tambem os ja indexados")
+    parser.add_argument("--lote", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.todos, args.lote))
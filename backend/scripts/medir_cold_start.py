@@ -0,0 +1,90 @@
+"""
+Mede o cold start da API contra o orcamento (STARTUP_ORCAMENTO_MS).
+
+Sobe o uvicorn em um processo novo --rodadas vezes e mede o tempo ate o primeiro
+GET /health respondido: o que espera quem acorda uma instancia free tier que
+dormiu. De cada rodada le em /metrics a quebra feita pela propria API (import do
+app, verificacao do schema). Falha (exit 1) se a mediana passar do orcamento.
+
+Requer o banco em `alembic upgrade head` (DATABASE_URL).
+
+Uso (a partir de backend/): python scripts/medir_cold_start.py [--rodadas 5] [--orcamento-ms 3000]
+"""
+import argparse
+import os
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+# Herdado pelo uvicorn: libera /metrics para este script
+os.environ.setdefault("METRICS_TOKEN", secrets.token_hex(16))
+
+from app.config import get_settings
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rodada(timeout_s: float) -> tuple[float, dict]:
+    porta = porta_livre()
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(porta), "--log-level", "warning"],
+        cwd=BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{porta}") as cliente:
+            while True:
+                if processo.poll() is not None:
+                    sys.exit(f"a API terminou no startup:\n{processo.stderr.read().decode()[-2000:]}")
+                if time.perf_counter() - inicio > timeout_s:
+                    sys.exit(f"a API nao respondeu em {timeout_s:.0f} s")
+                try:
+                    if cliente.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            pronto_ms = (time.perf_counter() - inicio) * 1000
+            return pronto_ms, cliente.get("/metrics", headers={"Authorization": f"Bearer {os.environ['METRICS_TOKEN']}"}).json()["startup"]
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def main(rodadas: int, orcamento_ms: int, timeout_s: float) -> None:
+    prontos, quebras = [], []
+    for i in range(rodadas):
+        pronto_ms, startup = rodada(timeout_s)
+        prontos.append(pronto_ms)
+        quebras.append(startup)
+        print(f"rodada {i + 1}: pronto em {pronto_ms:.0f} ms (import {startup['import_ms']:.0f} ms, "
+              f"schema {startup['schema_ms']:.0f} ms, revisao {startup['schema_revisao']})")
+
+    mediana = statistics.median(prontos)
+    print(f"processo -> primeiro /health: mediana {mediana:.0f} ms, max {max(prontos):.0f} ms, orcamento {orcamento_ms} ms")
+    print(f"import do app: mediana {statistics.median(q['import_ms'] for q in quebras):.0f} ms; "
+          f"verificacao do schema: mediana {statistics.median(q['schema_ms'] for q in quebras):.0f} ms")
+    if mediana > orcamento_ms:
+        print("FALHA: cold start acima do orcamento")
+        sys.exit(1)
+    print("OK: dentro do orcamento")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--orcamento-ms", type=int, default=get_settings().STARTUP_ORCAMENTO_MS)
+    parser.add_argument("--timeout", type=float, default=60.0, help="segundos ate desistir de uma rodada")
+    args = parser.parse_args()
+    main(args.rodadas, args.orcamento_ms, args.timeout)
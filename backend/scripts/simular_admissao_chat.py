@@ -0,0 +1,186 @@
+"""
+Simula uma rajada de chats contra um upstream com limite de concorrencia (free tier).
+
+Roda o app (ASGI em processo) com um LLM falso que devolve 429 quando mais de
+--limite-upstream chamadas estao em andamento, como o OpenRouter gratuito. Cria
+--usuarios colaboradores temporarios e verifica que:
+  - sem admissao (vagas ilimitadas) a rajada vira 429 do provedor em cascata;
+  - com LLM_ADMISSAO_MAX_CONCORRENTES = limite do upstream nenhum 429 chega ao
+    provedor, e quem espera recebe eventos "fila" com a posicao;
+  - a fila e justa: com uma vaga ocupada, as 2 mensagens de um colaborador que
+    chegou primeiro nao passam na frente dos outros 5 (rodizio, nao FIFO);
+  - com prazo curto o excesso e recusado na hora com 429 + Retry-After.
+Os colaboradores criados sao removidos. Sai com codigo 1 se algo falhar.
+
+Uso (a partir de backend/, com o schema aplicado):
+    python scripts/simular_admissao_chat.py [--usuarios 30] [--limite-upstream 4] [--atraso 0.02]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["AUTH_ENABLED"] = "false"
+os.environ["LLM_HEDGE_ENABLED"] = "false"
+
+import httpx
+from sqlalchemy import delete
+
+from app.database import async_session, engine
+from app.main import app
+from app.models.colaborador import Colaborador
+from app.rate_limit import limiter
+from app.services.admissao_service import controle_admissao
+from app.services.llm_service import EstatisticasModelo, llm_clients, model_router
+
+
+def _chunk(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=None))])
+
+
+class UpstreamFalso:
+    """Cliente LLM falso com limite de chamadas simultaneas; registra a ordem de atendimento"""
+
+    def __init__(self, limite: int, tokens: int, atraso: float):
+        self.limite, self.tokens, self.atraso = limite, tokens, atraso
+        self.em_andamento = 0
+        self.recusas_429 = 0
+        self.ordem: list[str] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, stream=False, **kwargs):
+        if self.em_andamento >= self.limite:
+            self.recusas_429 += 1
+            raise RuntimeError("Error code: 429 - rate limit exceeded (free tier)")
+        self.em_andamento += 1
+        self.ordem.append(messages[-1]["content"])
+        return self._gerar()
+
+    async def _gerar(self):
+        try:
+            for _ in range(self.tokens):
+                await asyncio.sleep(self.atraso)
+                yield _chunk("tok ")
+        finally:
+            self.em_andamento -= 1
+
+
+async def chat(cliente: httpx.AsyncClient, colaborador_id: str, mensagem: str) -> dict:
+    resultado = {"status": None, "eventos": [], "retry_after": None}
+    async with cliente.stream(
+        "POST", "/api/v1/chat/mensagem/stream", json={"colaborador_id": colaborador_id, "mensagem": mensagem}
+    ) as r:
+        resultado["status"] = r.status_code
+        resultado["retry_after"] = r.headers.get("retry-after")
+        async for linha in r.aiter_lines():
+            if linha.startswith("data: {"):
+                resultado["eventos"].append(json.loads(linha[6:]))
+    return resultado
+
+
+def configurar(upstream: UpstreamFalso, max_concorrentes: int, prazo_s: float, max_por_usuario: int = 2) -> None:
+    llm_clients.substituir(upstream)
+    # Cada cenario comeca com o circuito fechado: os 429 da rajada sem admissao o abrem
+    model_router.estatisticas = {m: EstatisticasModelo(m) for m in model_router.modelos}
+    controle_admissao.max_concorrentes = max_concorrentes
+    controle_admissao.prazo_s = prazo_s
+    controle_admissao.max_por_usuario = max_por_usuario
+    controle_admissao.duracao_media_s = upstream.tokens * upstream.atraso
+
+
+def erros(resultados: list[dict]) -> int:
+    return sum(any(e.get("type") == "error" for e in r["eventos"]) for r in resultados)
+
+
+async def main(usuarios: int, limite: int, atraso: float) -> None:
+    limiter.enabled = False
+    falhas = []
+    async with async_session() as db:
+        colaboradores = [
+            Colaborador(matricula=f"ADM-{uuid.uuid4().hex[:8]}", nome=f"Admissao {i}", data_nascimento=date(1990, 1, 1), sexo="M")
+            for i in range(usuarios)
+        ]
+        db.add_all(colaboradores)
+        await db.commit()
+        ids = [str(c.id) for c in colaboradores]
+
+    try:
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://admissao", timeout=120) as cliente:
+            # 1. Sem admissao: todos disparam no upstream ao mesmo tempo
+            upstream = UpstreamFalso(limite, tokens=20, atraso=atraso)
+            configurar(upstream, max_concorrentes=10_000, prazo_s=600)
+            sem = await asyncio.gather(*(chat(cliente, c, "oi") for c in ids))
+            print(f"sem admissao:  {len(sem)} chats, {erros(sem)} com erro, {upstream.recusas_429} 429 do provedor")
+
+            # 2. Com admissao: vagas = limite do upstream, prazo folgado
+            upstream = UpstreamFalso(limite, tokens=20, atraso=atraso)
+            configurar(upstream, max_concorrentes=limite, prazo_s=600)
+            com = await asyncio.gather(*(chat(cliente, c, "oi") for c in ids))
+            com_fila = sum(any(e.get("type") == "fila" for e in r["eventos"]) for r in com)
+            print(f"com admissao:  {len(com)} chats, {erros(com)} com erro, {upstream.recusas_429} 429 do provedor, "
+                  f"{com_fila} receberam posicao na fila; metricas {controle_admissao.metricas()}")
+            if upstream.recusas_429 or erros(com):
+                falhas.append("com admissao ainda houve 429 do provedor")
+            if erros(sem) <= erros(com):
+                falhas.append("sem admissao deveria haver 429 em cascata")
+            if not com_fila:
+                falhas.append("nenhum evento de posicao na fila")
+
+            # 3. Justica: uma vaga ocupada; o colaborador 1 pede 2 turnos e depois chegam 5 outros
+            upstream = UpstreamFalso(1, tokens=10, atraso=atraso)
+            configurar(upstream, max_concorrentes=1, prazo_s=600)
+            tarefas = [asyncio.create_task(chat(cliente, ids[0], "ocupando a vaga"))]
+            await asyncio.sleep(atraso)
+            for mensagem in ("pesado-1", "pesado-2"):
+                tarefas.append(asyncio.create_task(chat(cliente, ids[1], mensagem)))
+                await asyncio.sleep(0)
+            await asyncio.sleep(atraso / 4)
+            for i in range(5):
+                tarefas.append(asyncio.create_task(chat(cliente, ids[2 + i], f"outro-{i}")))
+                await asyncio.sleep(0)
+            await asyncio.gather(*tarefas)
+            print(f"ordem de atendimento: {upstream.ordem}")
+            if upstream.ordem[-1] != "pesado-2":
+                falhas.append("a segunda mensagem do colaborador pesado passou na frente dos outros")
+
+            # 4. Prazo curto: o excesso e recusado na hora, com Retry-After
+            upstream = UpstreamFalso(limite, tokens=20, atraso=atraso)
+            configurar(upstream, max_concorrentes=limite, prazo_s=upstream.tokens * atraso * 2)
+            curtos = await asyncio.gather(*(chat(cliente, c, "oi") for c in ids))
+            recusados = [r for r in curtos if r["status"] == 429]
+            atendidos = [r for r in curtos if r["status"] == 200 and not erros([r])]
+            expirados = len(curtos) - len(atendidos) - len(recusados)
+            print(f"prazo curto:   {len(atendidos)} atendidos, {len(recusados)} recusados com 429 "
+                  f"(Retry-After {sorted({r['retry_after'] for r in recusados})}), {expirados} expirados na fila, "
+                  f"{upstream.recusas_429} 429 do provedor")
+            if not recusados or any(not r["retry_after"] for r in recusados) or upstream.recusas_429:
+                falhas.append("excesso nao foi recusado com Retry-After")
+            if controle_admissao.ativos or controle_admissao.na_fila:
+                falhas.append("vagas nao devolvidas ao fim dos streams")
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(Colaborador).where(Colaborador.id.in_(ids)))
+            await db.commit()
+        await engine.dispose()
+
+    if falhas:
+        print("FALHA: " + "; ".join(falhas))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=30)
+    parser.add_argument("--limite-upstream", type=int, default=4)
+    parser.add_argument("--atraso", type=float, default=0.02, help="segundos por chunk do LLM falso")
+    args = parser.parse_args()
+    asyncio.run(main(args.usuarios, args.limite_upstream, args.atraso))
@@ -0,0 +1,170 @@
+"""
+Verifica o ledger de tokens e o orcamento diario com um LLM falso.
+
+Roda o app (ASGI em processo) com um cliente LLM falso que informa o usage de
+cada chamada (no streaming, no ultimo chunk, como include_usage) e pede uma tool
+no primeiro round. Com orcamentos pequenos (--soft/--hard) um colaborador
+temporario conversa ate esgotar o dia, verificando que:
+  - cada chamada entra em uso_tokens por dia, modelo e rodada de tools, e os
+    agregados de /api/v1/chat/uso batem com o usage informado pelo "provedor";
+  - acima do soft o turno usa o modelo economico;
+  - acima do hard o LLM nao e chamado e o turno responde com o aviso (200, sem erro).
+O colaborador criado e removido. Sai com codigo 1 se algo falhar.
+
+Uso (a partir de backend/, com o schema em head):
+    python scripts/simular_orcamento_tokens.py [--soft 3000] [--hard 6000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def configurar_ambiente(args) -> None:
+    # Settings sao lidas no import: orcamento e modelos antes de importar o app
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+    os.environ["TOKENS_ORCAMENTO_DIARIO_SOFT"] = str(args.soft)
+    os.environ["TOKENS_ORCAMENTO_DIARIO_HARD"] = str(args.hard)
+    os.environ["OPENROUTER_MODEL"] = "modelo/principal"
+    os.environ["OPENROUTER_FALLBACK_MODELS"] = ""
+    os.environ["OPENROUTER_MODELO_ECONOMICO"] = "modelo/economico"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    os.environ["AUTH_ENABLED"] = "false"
+
+
+PROMPT, COMPLETION = 700, 300
+
+
+def _usage():
+    return SimpleNamespace(prompt_tokens=PROMPT, completion_tokens=COMPLETION)
+
+
+class LLMFalso:
+    """Tool call no primeiro round, texto no segundo; usage fixo por chamada"""
+
+    colaborador_id = ""
+
+    def __init__(self):
+        self.chamadas: list[str] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        self.chamadas.append(model)
+        pediu_tool = not any(m.get("role") == "tool" for m in messages)
+        if not stream:
+            tool_calls = [SimpleNamespace(
+                id="call_0", function=SimpleNamespace(name="get_colaborador_profile", arguments=json.dumps({"colaborador_id": self.colaborador_id})),
+            )] if pediu_tool else None
+            mensagem = SimpleNamespace(content=None if pediu_tool else "resposta", tool_calls=tool_calls)
+            return SimpleNamespace(model=model, usage=_usage(), choices=[SimpleNamespace(message=mensagem, finish_reason="stop")])
+        return self._stream(pediu_tool)
+
+    async def _stream(self, pediu_tool: bool):
+        if pediu_tool:
+            tc = SimpleNamespace(index=0, id="call_0", function=SimpleNamespace(
+                name="get_colaborador_profile", arguments=json.dumps({"colaborador_id": self.colaborador_id})))
+            delta = SimpleNamespace(content=None, tool_calls=[tc])
+        else:
+            delta = SimpleNamespace(content="resposta", tool_calls=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=_usage())
+
+
+async def main(args) -> None:
+    import httpx
+    from sqlalchemy import delete
+
+    from app.database import async_session, engine
+    from app.main import app
+    from app.models.colaborador import Colaborador
+    from app.rate_limit import limiter
+    from app.services.llm_service import llm_clients
+    from app.services.tokens_service import registro_tokens
+
+    limiter.enabled = False
+    llm = LLMFalso()
+    llm_clients.substituir(llm)
+    falhas = []
+
+    async with async_session() as db:
+        colaborador = Colaborador(matricula=f"TOK-{uuid.uuid4().hex[:8]}", nome="Orcamento", data_nascimento=date(1990, 1, 1), sexo="M")
+        db.add(colaborador)
+        await db.commit()
+        colaborador_id = str(colaborador.id)
+    LLMFalso.colaborador_id = colaborador_id
+
+    try:
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://orcamento", timeout=60) as cliente:
+            turnos = []
+            for i in range(args.turnos):
+                antes = len(llm.chamadas)
+                if i % 2:
+                    eventos = []
+                    async with cliente.stream("POST", "/api/v1/chat/mensagem/stream",
+                                              json={"colaborador_id": colaborador_id, "mensagem": f"pergunta {i}"}) as r:
+                        async for linha in r.aiter_lines():
+                            if linha.startswith("data: {"):
+                                eventos.append(json.loads(linha[6:]))
+                    status = r.status_code
+                    texto = "".join(e.get("content") or "" for e in eventos if e["type"] == "text")
+                    erro = any(e["type"] == "error" for e in eventos)
+                else:
+                    r = await cliente.post("/api/v1/chat/mensagem", json={"colaborador_id": colaborador_id, "mensagem": f"pergunta {i}"})
+                    status, texto, erro = r.status_code, r.json().get("resposta", ""), False
+                modelos = sorted(set(llm.chamadas[antes:]))
+                uso = (await cliente.get(f"/api/v1/chat/uso/{colaborador_id}")).json()["hoje"]
+                turnos.append((i, status, erro, modelos, uso))
+                print(f"turno {i} ({'stream' if i % 2 else 'json  '}): status={status} erro={erro} "
+                      f"modelos={modelos or '-'} consumo={uso['tokens']} nivel={uso['nivel']} resposta={texto[:40]!r}")
+
+            await registro_tokens.fechar()
+            agregados = (await cliente.get(f"/api/v1/chat/uso/{colaborador_id}")).json()
+            print(f"por_modelo: {agregados['por_modelo']}")
+            print(f"por_rodada: {agregados['por_rodada']}")
+            print(f"metricas: {registro_tokens.metricas()}")
+
+        total_chamadas = len(llm.chamadas)
+        if sum(m["total_tokens"] for m in agregados["por_dia"]) != total_chamadas * (PROMPT + COMPLETION):
+            falhas.append("total do ledger diferente do usage informado")
+        if sum(m["chamadas"] for m in agregados["por_modelo"]) != total_chamadas:
+            falhas.append("chamadas do ledger diferentes das feitas ao LLM")
+        if {r["rodada"] for r in agregados["por_rodada"]} != {0, 1}:
+            falhas.append("rodadas de tools nao separadas no ledger")
+        if any(status != 200 or erro for _, status, erro, _, _ in turnos):
+            falhas.append("algum turno falhou em vez de degradar")
+        economicos = [t for t in turnos if t[3] == ["modelo/economico"]]
+        esgotados = [t for t in turnos if not t[3]]
+        if not economicos:
+            falhas.append("nenhum turno usou o modelo economico acima do soft")
+        if not esgotados:
+            falhas.append("o orcamento hard nao bloqueou o LLM")
+        if any(t[4]["nivel"] == "normal" for t in economicos + esgotados):
+            falhas.append("degradacao antes de atingir o orcamento")
+    finally:
+        await registro_tokens.fechar()
+        async with async_session() as db:
+            await db.execute(delete(Colaborador).where(Colaborador.id == colaborador.id))
+            await db.commit()
+        await engine.dispose()
+
+    if falhas:
+        print("FALHA: " + "; ".join(falhas))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--soft", type=int, default=3000)
+    parser.add_argument("--hard", type=int, default=6000)
+    parser.add_argument("--turnos", type=int, default=8)
+    args = parser.parse_args()
+    configurar_ambiente(args)
+    asyncio.run(main(args))
@@ -0,0 +1,157 @@
+"""
+Verificacao do ModelRouter contra um servidor local compativel com a API da OpenAI.
+
+O servidor falso responde /chat/completions conforme o modelo pedido:
+  modelo/rapido -> 50 ms, modelo/lento -> 3 s, modelo/falho -> HTTP 429,
+  modelo/invalido -> HTTP 400 (erro da requisicao: sem failover nem circuit breaker).
+Cenarios: failover, abertura/fechamento do circuit breaker (uma chamada de teste
+no meio aberto, mesmo com requisicoes concorrentes), hedge sem streaming
+e hedge no streaming (tempo ate o primeiro chunk). Sai com erro se algum falhar.
+
+Uso (a partir de backend/): python scripts/testar_model_router.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LATENCIAS = {"modelo/rapido": 0.05, "modelo/lento": 3.0}
+hits: Counter = Counter()
+
+
+def _completion(modelo: str) -> bytes:
+    return json.dumps({
+        "id": "fake", "object": "chat.completion", "created": 0, "model": modelo,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": f"resposta de {modelo}"}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }).encode()
+
+
+def _chunk(modelo: str, texto: str) -> bytes:
+    corpo = json.dumps({
+        "id": "fake", "object": "chat.completion.chunk", "created": 0, "model": modelo,
+        "choices": [{"index": 0, "delta": {"content": texto}, "finish_reason": None}],
+    })
+    return f"data: {corpo}\n\n".encode()
+
+
+async def atender(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            cabecalho = await reader.readuntil(b"\r\n\r\n")
+            tamanho = next(
+                int(l.split(b":", 1)[1]) for l in cabecalho.split(b"\r\n") if l.lower().startswith(b"content-length:")
+            )
+            pedido = json.loads(await reader.readexactly(tamanho))
+            modelo = pedido["model"]
+            hits[modelo] += 1
+            if modelo in ("modelo/falho", "modelo/invalido"):
+                codigo, status = (429, "Too Many Requests") if modelo == "modelo/falho" else (400, "Bad Request")
+                corpo = json.dumps({"error": {"message": status.lower(), "code": codigo}}).encode()
+                writer.write(
+                    f"HTTP/1.1 {codigo} {status}\r\nContent-Type: application/json\r\n".encode()
+                    + f"Content-Length: {len(corpo)}\r\n\r\n".encode() + corpo
+                )
+                await writer.drain()
+                continue
+            await asyncio.sleep(LATENCIAS[modelo])
+            if pedido.get("stream"):
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+                for texto in ("resposta ", "de ", modelo):
+                    writer.write(_chunk(modelo, texto))
+                    await writer.drain()
+                    await asyncio.sleep(0.01)
+                writer.write(b"data: [DONE]\n\n")
+                await writer.drain()
+                break
+            corpo = _completion(modelo)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(corpo)}\r\n\r\n".encode() + corpo
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+        # Cancelado: o cliente abandonou o request (perdedor do hedge) ou o script terminou
+        pass
+    finally:
+        writer.close()
+
+
+def verificar(condicao: bool, descricao: str) -> None:
+    print(f"  [{'ok' if condicao else 'FALHOU'}] {descricao}")
+    if not condicao:
+        sys.exit(1)
+
+
+async def main() -> None:
+    server = await asyncio.start_server(atender, "127.0.0.1", 0)
+    porta = server.sockets[0].getsockname()[1]
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{porta}/v1"
+    os.environ["OPENROUTER_API_KEY"] = "fake"
+    os.environ["LLM_HEDGE_INICIAL_MS"] = "300"
+    os.environ["LLM_HEDGE_MIN_MS"] = "300"
+    os.environ["LLM_CIRCUIT_FALHAS"] = "3"
+    os.environ["LLM_CIRCUIT_RESET_SECONDS"] = "2"
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+    import openai
+    from app.services.llm_service import ModelRouter, llm_clients
+
+    mensagens = [{"role": "user", "content": "qual o almoco de hoje?"}]
+
+    print("failover + circuit breaker")
+    router = ModelRouter(["modelo/falho", "modelo/rapido"])
+    for _ in range(5):
+        resposta = await router.completar(messages=mensagens)
+        verificar(resposta.model == "modelo/rapido", "resposta veio do fallback")
+    verificar(hits["modelo/falho"] == 3, f"modelo falho chamado 3x e depois pulado (chamadas={hits['modelo/falho']})")
+    verificar(router.metricas()["modelos"]["modelo/falho"]["circuito"] == "aberto", "circuito aberto")
+    await asyncio.sleep(2.1)
+    await router.completar(messages=mensagens)
+    verificar(hits["modelo/falho"] == 4, "apos o reset, uma chamada de teste (meio aberto)")
+    verificar(router.metricas()["modelos"]["modelo/falho"]["circuito"] == "aberto", "teste falhou, circuito reaberto")
+    await asyncio.sleep(2.1)
+    respostas = await asyncio.gather(*(router.completar(messages=mensagens) for _ in range(5)))
+    verificar(hits["modelo/falho"] == 5, f"meio aberto com 5 requisicoes concorrentes: uma so chamada de teste (chamadas={hits['modelo/falho']})")
+    verificar(all(r.model == "modelo/rapido" for r in respostas), "as demais pularam o modelo")
+    verificar(not router.metricas()["modelos"]["modelo/falho"]["sondando"], "chamada de teste liberada")
+
+    print("erro da requisicao (400)")
+    router = ModelRouter(["modelo/invalido", "modelo/rapido"])
+    rapido_antes = hits["modelo/rapido"]
+    for _ in range(4):
+        try:
+            await router.completar(messages=mensagens)
+            verificar(False, "400 deveria subir para quem chamou")
+        except openai.BadRequestError:
+            pass
+    verificar(hits["modelo/invalido"] == 4 and hits["modelo/rapido"] == rapido_antes, "400 sobe sem failover")
+    estado = router.metricas()["modelos"]["modelo/invalido"]
+    verificar(estado["circuito"] == "fechado" and estado["falhas"] == 0, "400 nao conta no circuit breaker (circuito fechado)")
+
+    print("hedge sem streaming")
+    router = ModelRouter(["modelo/lento", "modelo/rapido"])
+    inicio = time.monotonic()
+    resposta = await router.completar(messages=mensagens)
+    duracao = time.monotonic() - inicio
+    verificar(resposta.model == "modelo/rapido", f"hedge venceu em {duracao:.2f}s (modelo lento leva 3s)")
+    verificar(duracao < 1.0 and router.hedges == 1, "um hedge disparado apos o prazo de 300 ms")
+
+    print("hedge no streaming (tempo ate o primeiro chunk)")
+    inicio = time.monotonic()
+    stream = await router.abrir_stream(messages=mensagens)
+    texto = "".join([c.choices[0].delta.content or "" async for c in stream if c.choices])
+    await stream.close()
+    duracao = time.monotonic() - inicio
+    verificar(stream.modelo == "modelo/rapido" and texto == "resposta de modelo/rapido", f"stream do hedge em {duracao:.2f}s")
+    print(json.dumps(router.metricas(), indent=2))
+
+    await llm_clients.fechar()
+    server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,226 @@
+"""
+Verifica com EXPLAIN que as consultas quentes usam indice (migracao Alembic 0002).
+
+Popula uma massa de dados realista (colaboradores com matricula IDX-*, um ano de
+refeicoes, medicoes semanais, historico de planos, alertas e cardapios de varias
+plataformas), roda ANALYZE e chama cada endpoint/tool pela aplicacao real. O SQL
+emitido e capturado no engine e explicado duas vezes: com os parametros da
+chamada (plano custom) e com EXPLAIN (GENERIC_PLAN), o plano que o Postgres
+passa a reutilizar nos prepared statements do asyncpg. Falha (exit 1) se algum
+acesso a tabela alvo nao for index scan pelo indice esperado para a consulta
+(um Seq Scan ou a volta de um indice de coluna unica). Os dados criados sao
+removidos ao final, exceto com --manter.
+
+Requer PostgreSQL 16+ (GENERIC_PLAN) com o schema em `alembic upgrade head`.
+
+Uso (a partir de backend/): python scripts/verificar_indices.py [--colaboradores 300] [--dias 365] [--manter]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+
+import httpx
+from sqlalchemy import event, text
+
+from app.auth import get_current_user
+from app.database import async_session, engine
+from app.main import app
+from app.rate_limit import limiter
+from app.services.tools_handler import ToolsHandler
+
+PREFIXO = "IDX-"
+PLATAFORMAS = 20
+SCANS_INDICE = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+POPULAR = [
+    """INSERT INTO colaboradores (id, matricula, nome, data_nascimento, sexo, altura_cm)
+       SELECT gen_random_uuid(), :prefixo || lpad(n::text, 5, '0'), 'Colaborador ' || n,
+              DATE '1980-01-01' + (n % 7000), CASE WHEN n % 3 = 0 THEN 'F' ELSE 'M' END, 160 + n % 30
+       FROM generate_series(1, :colaboradores) n""",
+    """CREATE TEMP TABLE idx_colab AS SELECT id FROM colaboradores WHERE matricula LIKE :prefixo || '%'""",
+    """INSERT INTO refeicoes_log (colaborador_id, data, refeicao, itens_consumidos, calorias_estimadas,
+                                 proteina_g, carboidratos_g, gorduras_g, aderencia_percentual, created_at)
+       SELECT c.id, CURRENT_DATE - d, (ARRAY['cafe_manha','almoco','lanche_tarde','jantar'])[r],
+              jsonb_build_array(jsonb_build_object('alimento', 'Arroz integral', 'quantidade', '150g', 'calorias_estimadas', 180),
+                                jsonb_build_object('alimento', 'Frango grelhado', 'quantidade', '120g', 'calorias_estimadas', 220)),
+              300 + (d * r) % 500, 10 + r * 5, 30 + d % 50, 5 + r * 3, (d * 7 + r) % 101,
+              (CURRENT_DATE - d) + make_interval(hours => 5 + r * 4)
+       FROM idx_colab c, generate_series(0, :dias - 1) d, generate_series(1, 4) r""",
+    """INSERT INTO consumo_diario (colaborador_id, data, calorias, proteina_g, carboidratos_g, gorduras_g,
+                                  refeicoes, aderencia_soma, aderencia_registros)
+       SELECT colaborador_id, data, sum(calorias_estimadas), sum(proteina_g), sum(carboidratos_g), sum(gorduras_g),
+              count(*), sum(aderencia_percentual), count(aderencia_percentual)
+       FROM refeicoes_log WHERE colaborador_id IN (SELECT id FROM idx_colab) GROUP BY colaborador_id, data""",
+    """INSERT INTO medicoes (colaborador_id, data_medicao, peso_kg, circunferencia_abdominal_cm)
+       SELECT c.id, CURRENT_DATE - s * 7, 70 + (s % 10), 85 + (s % 6)
+       FROM idx_colab c, generate_series(0, :dias / 7) s""",
+    """INSERT INTO planos_nutricionais (colaborador_id, meta_calorica, proteina_g, carboidratos_g, gorduras_g,
+                                       objetivo, data_inicio, ativo)
+       SELECT c.id, 2000 + v * 100, 120, 250, 70, 'manutencao', CURRENT_DATE - (6 - v) * 60, v = 6
+       FROM idx_colab c, generate_series(1, 6) v""",
+    """INSERT INTO alertas_medicos (colaborador_id, tipo, motivo, status, created_at)
+       SELECT c.id, 'amarelo', 'Alerta de verificacao de indice',
+              CASE WHEN a % 40 = 0 THEN 'aberto' WHEN a % 5 = 0 THEN 'visualizado' ELSE 'resolvido' END,
+              now() - make_interval(days => a * 12)
+       FROM idx_colab c, generate_series(1, 30) a""",
+    """INSERT INTO cardapios (plataforma_id, data, refeicao, itens)
+       SELECT md5('idx-plataforma-' || p)::uuid, CURRENT_DATE - d, r,
+              '[{"item": "Arroz branco", "categoria": "carboidrato", "calorias_porcao": 200}]'::jsonb
+       FROM generate_series(1, :plataformas) p, generate_series(0, :dias - 1) d,
+            unnest(ARRAY['cafe_manha', 'almoco', 'jantar']) r""",
+]
+
+LIMPAR = [
+    """DELETE FROM cardapios WHERE plataforma_id IN (SELECT md5('idx-plataforma-' || p)::uuid FROM generate_series(1, :plataformas) p)""",
+    """DELETE FROM colaboradores WHERE matricula LIKE :prefixo || '%'""",
+]
+
+TABELAS = ["colaboradores", "refeicoes_log", "consumo_diario", "medicoes", "planos_nutricionais", "alertas_medicos", "cardapios"]
+
+
+class Captura:
+    """Guarda o SQL (e parametros) emitido pelo engine enquanto ativa"""
+
+    def __init__(self):
+        self.ativa = False
+        self.comandos: list[tuple[str, tuple]] = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._registrar)
+
+    def _registrar(self, conn, cursor, statement, parameters, context, executemany):
+        if self.ativa:
+            self.comandos.append((statement, tuple(parameters or ())))
+
+    async def executar(self, chamada) -> list[tuple[str, tuple]]:
+        self.comandos, self.ativa = [], True
+        try:
+            await chamada()
+        finally:
+            self.ativa = False
+        return self.comandos
+
+
+def indices_bitmap(plano: dict) -> list[str]:
+    """Indices sob um Bitmap Heap Scan (inclusive dentro de BitmapAnd/BitmapOr)"""
+    nomes = []
+    for filho in plano.get("Plans", []):
+        if filho["Node Type"] == "Bitmap Index Scan":
+            nomes.append(filho["Index Name"])
+        elif filho["Node Type"] in ("BitmapAnd", "BitmapOr"):
+            nomes += indices_bitmap(filho)
+    return nomes
+
+
+def varrer(plano: dict, tabela: str, achados: list) -> None:
+    """Acumula (tipo do no, indices) de cada acesso a tabela na arvore do plano"""
+    if plano.get("Relation Name") == tabela:
+        indices = [plano["Index Name"]] if plano.get("Index Name") else indices_bitmap(plano)
+        achados.append((plano["Node Type"], indices))
+    for filho in plano.get("Plans", []):
+        varrer(filho, tabela, achados)
+
+
+async def explicar(sql: str, parametros: tuple, generico: bool) -> dict:
+    async with engine.connect() as conn:
+        driver = (await conn.get_raw_connection()).driver_connection
+        # com GENERIC_PLAN os valores sao ignorados, mas o protocolo estendido exige o bind
+        opcoes = "GENERIC_PLAN, FORMAT JSON" if generico else "FORMAT JSON"
+        bruto = await driver.fetchval(f"EXPLAIN ({opcoes}) {sql}", *parametros)
+    # a conexao da aplicacao ja registra codec de json; o driver puro devolve texto
+    return (json.loads(bruto) if isinstance(bruto, str) else bruto)[0]["Plan"]
+
+
+async def main(colaboradores: int, dias: int, manter: bool) -> None:
+    valores = {"prefixo": PREFIXO, "colaboradores": colaboradores, "dias": dias, "plataformas": PLATAFORMAS}
+    async with async_session() as db:
+        for sql in LIMPAR + POPULAR:
+            await db.execute(text(sql), {k: v for k, v in valores.items() if f":{k}" in sql})
+        await db.commit()
+        cid = str((await db.execute(text("SELECT id FROM colaboradores WHERE matricula = :m"), {"m": f"{PREFIXO}00001"})).scalar())
+        plataforma = str((await db.execute(text("SELECT md5('idx-plataforma-1')::uuid"))).scalar())
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE " + ", ".join(TABELAS)))
+        await conn.commit()
+    print(f"massa: {colaboradores} colaboradores, {dias} dias, {colaboradores * dias * 4} refeicoes, {PLATAFORMAS} plataformas")
+
+    logging.getLogger("app").setLevel(logging.WARNING)
+    app.dependency_overrides[get_current_user] = lambda: {"sub": cid}
+    limiter.enabled = False
+    cliente = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://verificacao")
+    hoje = date.today()
+
+    async def get(url: str):
+        resposta = await cliente.get(f"/api/v1{url}")
+        assert resposta.status_code == 200, f"{url}: {resposta.status_code} {resposta.text[:200]}"
+
+    async def tool(nome: str, params: dict):
+        async with async_session() as db:
+            await getattr(ToolsHandler(db), f"_{nome}")({"colaborador_id": cid, **params})
+
+    # (consulta, tabela alvo, indices aceitos, chamada). cardapios por (plataforma_id, data) e servido
+    # por uq_cardapio; com as linhas do dia contiguas o planner pode preferir idx_cardapios_data
+    casos = [
+        ("refeicoes do dia", "refeicoes_log", {"idx_refeicoes_colaborador_data"},
+         lambda: get(f"/refeicoes/colaborador/{cid}/dia/{hoje - timedelta(days=3)}")),
+        ("tool get_historico_refeicoes", "refeicoes_log", {"idx_refeicoes_colaborador_data"},
+         lambda: tool("get_historico_refeicoes", {"periodo": 30})),
+        ("resumo semanal", "consumo_diario", {"consumo_diario_pkey"}, lambda: get(f"/refeicoes/colaborador/{cid}/resumo-semanal")),
+        ("consumo do periodo", "consumo_diario", {"consumo_diario_pkey"},
+         lambda: get(f"/refeicoes/colaborador/{cid}/consumo?inicio={hoje - timedelta(days=90)}&fim={hoje}")),
+        ("medicoes do colaborador", "medicoes", {"idx_medicoes_colaborador_data"}, lambda: get(f"/colaboradores/{cid}/medicoes")),
+        ("tool get_historico_peso", "medicoes", {"idx_medicoes_colaborador_data"}, lambda: tool("get_historico_peso", {"periodo": 90})),
+        ("tool get_colaborador_profile", "medicoes", {"idx_medicoes_colaborador_data"}, lambda: tool("get_colaborador_profile", {})),
+        ("plano ativo", "planos_nutricionais", {"idx_planos_colaborador_ativo"}, lambda: get(f"/planos/colaborador/{cid}/ativo")),
+        ("alertas abertos", "alertas_medicos", {"idx_alertas_abertos"}, lambda: get("/alertas/?status=aberto")),
+        ("alertas visualizados", "alertas_medicos", {"idx_alertas_status_created"}, lambda: get("/alertas/?status=visualizado")),
+        ("alertas do colaborador", "alertas_medicos", {"idx_alertas_colaborador_created"}, lambda: get(f"/alertas/colaborador/{cid}")),
+        ("cardapio do dia da plataforma", "cardapios", {"uq_cardapio", "idx_cardapios_data"},
+         lambda: get(f"/cardapios/dia/{hoje - timedelta(days=10)}?plataforma_id={plataforma}")),
+    ]
+
+    captura = Captura()
+    falhas = 0
+    try:
+        print(f"{'consulta':<32} {'tabela':<20} {'plano':<7} {'acesso':<18} indice")
+        for nome, tabela, esperados, chamada in casos:
+            comandos = [(s, p) for s, p in await captura.executar(chamada) if tabela in s and s.lstrip().upper().startswith("SELECT")]
+            if not comandos:
+                print(f"{nome:<32} {tabela:<20} nenhuma consulta capturada")
+                falhas += 1
+                continue
+            for sql, parametros in comandos:
+                for generico in (False, True):
+                    achados = []
+                    varrer(await explicar(sql, parametros, generico), tabela, achados)
+                    for tipo, indices in achados:
+                        ok = tipo in SCANS_INDICE and bool(esperados.intersection(indices))
+                        falhas += not ok
+                        print(f"{nome:<32} {tabela:<20} {'generic' if generico else 'custom':<7} {tipo:<18} "
+                              f"{', '.join(indices) or '-'}{'' if ok else '  <-- FALHA (esperado: ' + ' ou '.join(sorted(esperados)) + ')'}")
+    finally:
+        await cliente.aclose()
+        if not manter:
+            async with async_session() as db:
+                for sql in LIMPAR:
+                    await db.execute(text(sql), {k: v for k, v in valores.items() if f":{k}" in sql})
+                await db.commit()
+        await engine.dispose()
+
+    print("OK: todas as consultas usam o indice esperado" if not falhas else f"{falhas} acesso(s) fora do indice esperado")
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--colaboradores", type=int, default=300)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--manter", action="store_true", help="mantem a massa de dados no banco")
+    args = parser.parse_args()
+    asyncio.run(main(args.colaboradores, args.dias, args.manter))
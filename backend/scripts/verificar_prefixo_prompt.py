@@ -0,0 +1,191 @@
+"""
+Verifica que o prefixo do prompt (tools + instrucoes de sistema) e estavel para o cache do provedor.
+
+Roda o app (ASGI em processo) com um LLM falso que captura cada requisicao e
+informa usage com prompt_tokens_details.cached_tokens. Dois colaboradores
+temporarios conversam (JSON e stream, com rodada de tools e conversa continuada)
+e o script verifica que:
+  - tools + primeira mensagem de sistema sao iguais byte a byte em todas as
+    chamadas da mesma mensagem (mesma selecao de tools), de qualquer
+    colaborador e rodada; o ID do colaborador so aparece depois desse prefixo;
+  - o corte do historico (ContextWindow) mantem instrucoes e contexto do colaborador;
+  - cache_control so e adicionado nos modelos de LLM_CACHE_CONTROL_PREFIXOS;
+  - os cached_tokens informados chegam ao ledger (/api/v1/chat/uso) e as metricas.
+Os colaboradores criados sao removidos. Sai com codigo 1 se algo falhar.
+
+Uso (a partir de backend/, com o schema em head):
+    python scripts/verificar_prefixo_prompt.py
+"""
+import asyncio
+import json
+import os
+import sys
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+os.environ["OPENROUTER_MODEL"] = "anthropic/claude-teste"
+os.environ["OPENROUTER_FALLBACK_MODELS"] = ""
+os.environ["LLM_CACHE_CONTROL_PREFIXOS"] = "anthropic/"
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["AUTH_ENABLED"] = "false"
+os.environ["LLM_HEDGE_ENABLED"] = "false"
+
+import httpx
+from sqlalchemy import delete
+
+from app.agent.system_prompt import SYSTEM_PROMPT, mensagens_iniciais
+from app.database import async_session, engine
+from app.main import app
+from app.models.colaborador import Colaborador
+from app.rate_limit import limiter
+from app.services.context_window import ContextWindow
+from app.services.llm_service import com_cache_control, llm_clients
+from app.services.tokens_service import registro_tokens
+
+PROMPT, CACHED, COMPLETION = 1000, 800, 50
+
+
+def _usage():
+    return SimpleNamespace(
+        prompt_tokens=PROMPT, completion_tokens=COMPLETION,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=CACHED),
+    )
+
+
+class LLMCaptura:
+    """Guarda model/tools/messages de cada chamada; tool call no primeiro round de cada turno"""
+
+    def __init__(self):
+        self.requisicoes: list[dict] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, stream=False, tools=None, **kwargs):
+        self.requisicoes.append({"model": model, "tools": tools, "messages": messages})
+        contexto = messages[1]["content"] if len(messages) > 1 else ""
+        colaborador_id = contexto.split(": ")[-1].split("\n")[0]
+        ultima = messages[-1]
+        pediu_tool = ultima["role"] == "user" and kwargs.get("tool_choice") != "none"
+        args = json.dumps({"colaborador_id": colaborador_id})
+        if not stream:
+            tool_calls = [SimpleNamespace(id="call_0", function=SimpleNamespace(name="get_colaborador_profile", arguments=args))] if pediu_tool else None
+            mensagem = SimpleNamespace(content=None if pediu_tool else "resposta", tool_calls=tool_calls)
+            return SimpleNamespace(model=model, usage=_usage(), choices=[SimpleNamespace(message=mensagem, finish_reason="stop")])
+        return self._stream(pediu_tool, args)
+
+    async def _stream(self, pediu_tool: bool, args: str):
+        if pediu_tool:
+            tc = SimpleNamespace(index=0, id="call_0", function=SimpleNamespace(name="get_colaborador_profile", arguments=args))
+            delta = SimpleNamespace(content=None, tool_calls=[tc])
+        else:
+            delta = SimpleNamespace(content="resposta", tool_calls=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=_usage())
+
+
+def prefixo(requisicao: dict) -> str:
+    """Bytes do prefixo cacheavel: tools e primeira mensagem de sistema (sem o marcador cache_control)"""
+    primeira = requisicao["messages"][0]
+    conteudo = primeira["content"]
+    if isinstance(conteudo, list):
+        conteudo = "".join(parte["text"] for parte in conteudo)
+    return json.dumps(requisicao["tools"], ensure_ascii=False) + json.dumps({"role": primeira["role"], "content": conteudo}, ensure_ascii=False)
+
+
+async def conversar(cliente: httpx.AsyncClient, colaborador_id: str, stream: bool, conversa_id=None):
+    corpo = {"colaborador_id": colaborador_id, "mensagem": "como esta meu plano?", "conversa_id": conversa_id}
+    if not stream:
+        r = await cliente.post("/api/v1/chat/mensagem", json=corpo)
+        return r.json()["conversa_id"]
+    async with cliente.stream("POST", "/api/v1/chat/mensagem/stream", json=corpo) as r:
+        async for linha in r.aiter_lines():
+            if linha.startswith("data: {") and '"conversa_id"' in linha:
+                conversa_id = json.loads(linha[6:]).get("conversa_id") or conversa_id
+    return conversa_id
+
+
+async def main() -> None:
+    limiter.enabled = False
+    llm = LLMCaptura()
+    llm_clients.substituir(llm)
+    falhas = []
+
+    # 1. Corte do historico: instrucoes e contexto do colaborador sempre ficam
+    janela = ContextWindow(max_tokens=len(SYSTEM_PROMPT) // 2)
+    historico = mensagens_iniciais("colab-x") + [{"role": "user", "content": f"mensagem antiga {i} " * 50} for i in range(30)]
+    cortado = janela.ajustar(historico)
+    print(f"corte: {len(historico)} -> {len(cortado)} mensagens")
+    if cortado[:2] != historico[:2] or cortado[-1] is not historico[-1]:
+        falhas.append("o corte do historico perdeu o prefixo de sistema ou a ultima mensagem")
+
+    # 2. cache_control so nos modelos configurados, sem alterar a lista original
+    kwargs = {"messages": mensagens_iniciais("colab-x")}
+    marcada = com_cache_control("anthropic/claude-teste", kwargs)["messages"][0]["content"]
+    if not (isinstance(marcada, list) and marcada[0].get("cache_control") == {"type": "ephemeral"}):
+        falhas.append("cache_control ausente no modelo configurado")
+    if com_cache_control("openai/gpt-teste", kwargs) is not kwargs or not isinstance(kwargs["messages"][0]["content"], str):
+        falhas.append("cache_control aplicado em modelo sem suporte (ou alterou a requisicao original)")
+
+    # 3. Conversas reais pelo app
+    async with async_session() as db:
+        colaboradores = [
+            Colaborador(matricula=f"PFX-{uuid.uuid4().hex[:8]}", nome=f"Prefixo {i}", data_nascimento=date(1990, 1, 1), sexo="M")
+            for i in range(2)
+        ]
+        db.add_all(colaboradores)
+        await db.commit()
+        ids = [str(c.id) for c in colaboradores]
+
+    try:
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://prefixo", timeout=60) as cliente:
+            for colaborador_id in ids:
+                conversa_id = await conversar(cliente, colaborador_id, stream=False)
+                await conversar(cliente, colaborador_id, stream=True, conversa_id=conversa_id)
+                await conversar(cliente, colaborador_id, stream=True)
+            await registro_tokens.fechar()
+            usos = [(await cliente.get(f"/api/v1/chat/uso/{c}")).json() for c in ids]
+
+        prefixos = {prefixo(r) for r in llm.requisicoes}
+        rodadas = {len([m for m in r["messages"] if m["role"] == "tool"]) for r in llm.requisicoes}
+        print(f"chamadas ao LLM: {len(llm.requisicoes)} ({len(ids)} colaboradores, rodadas com {sorted(rodadas)} tools); "
+              f"prefixos distintos: {len(prefixos)}")
+        if len(prefixos) != 1:
+            falhas.append("tools + instrucoes variam entre chamadas")
+        if any(c in p for p in prefixos for c in ids):
+            falhas.append("ID do colaborador dentro do prefixo cacheavel")
+        for r in llm.requisicoes:
+            contexto = r["messages"][1]
+            if contexto["role"] != "system" or not any(c in contexto["content"] for c in ids):
+                falhas.append("contexto do colaborador fora da segunda mensagem")
+                break
+        if any(not isinstance(r["messages"][0]["content"], list) for r in llm.requisicoes):
+            falhas.append("chamada ao modelo configurado sem cache_control")
+
+        por_colaborador = len(llm.requisicoes) // len(ids)
+        for uso in usos:
+            cached = sum(d["cached_tokens"] for d in uso["por_dia"])
+            print(f"ledger {uso['colaborador_id'][:8]}: prompt={sum(d['prompt_tokens'] for d in uso['por_dia'])} cached={cached}")
+            if cached != por_colaborador * CACHED:
+                falhas.append("cached_tokens do provedor nao chegaram ao ledger")
+        metricas = registro_tokens.metricas()["prefixo_cache"]
+        print(f"metricas prefixo_cache: {metricas}")
+        if not metricas or any(m["taxa"] != round(CACHED / PROMPT, 3) for m in metricas.values()):
+            falhas.append("metricas de cache por rodada incorretas")
+    finally:
+        await registro_tokens.fechar()
+        async with async_session() as db:
+            await db.execute(delete(Colaborador).where(Colaborador.id.in_(ids)))
+            await db.commit()
+        await engine.dispose()
+
+    if falhas:
+        print("FALHA: " + "; ".join(dict.fromkeys(falhas)))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,12 @@
+"""Configuracao comum dos testes (a partir de backend/: python -m pytest)"""
+import os
+
+# app.config exige DATABASE_URL; os testes daqui nao abrem conexao
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/nutrioffshore")
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
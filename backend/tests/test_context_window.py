@@ -0,0 +1,137 @@
+"""ContextWindow.ajustar: o que o corte do historico preserva e o cache de contagens"""
+from collections import OrderedDict
+
+import pytest
+
+from app.services import context_window
+from app.services.context_window import TOKENS_POR_MENSAGEM, ContextWindow
+
+
+class TokenizerPalavras:
+    """Um token por palavra; guarda os textos tokenizados"""
+
+    nome = "palavras"
+
+    def __init__(self):
+        self.textos: list[str] = []
+
+    def contar(self, texto: str) -> int:
+        self.textos.append(texto)
+        return len(texto.split())
+
+
+@pytest.fixture(autouse=True)
+def contagens_limpas(monkeypatch):
+    monkeypatch.setattr(context_window, "_contagens", OrderedDict())
+
+
+def msg(role: str, palavras: int, **extra) -> dict:
+    return {"role": role, "content": " ".join([role] * palavras), **extra}
+
+
+def rodada_de_tool(k: int, palavras: int = 20) -> list[dict]:
+    chamada = {"id": f"call_{k}", "type": "function", "function": {"name": "get_cardapio_dia", "arguments": "{}"}}
+    return [
+        {"role": "assistant", "content": "", "tool_calls": [chamada]},
+        msg("tool", palavras, tool_call_id=f"call_{k}"),
+    ]
+
+
+def conversa(turnos: int) -> list[dict]:
+    messages = [msg("system", 50), msg("system", 10)]
+    for k in range(turnos):
+        messages += [msg("user", 10), *rodada_de_tool(k), msg("assistant", 15)]
+    return messages
+
+
+def janela(max_tokens: int, **kwargs) -> ContextWindow:
+    return ContextWindow(max_tokens, tokenizer=TokenizerPalavras(), **kwargs)
+
+
+def test_abaixo_do_limite_devolve_a_mesma_lista():
+    messages = conversa(2)
+    assert janela(10_000).ajustar(messages) is messages
+
+
+def test_mantem_prefixo_de_sistema_e_ultima_mensagem_do_usuario():
+    messages = conversa(30)
+    # A ultima pergunta fica antes de varias rodadas de tool do turno atual
+    messages += [msg("user", 10)] + [m for k in range(30, 40) for m in rodada_de_tool(k, palavras=60)]
+    cortado = janela(400).ajustar(messages)
+    assert len(cortado) < len(messages)
+    assert cortado[:2] == messages[:2] and cortado[0] is messages[0] and cortado[1] is messages[1]
+    ultima_pergunta = max(i for i, m in enumerate(messages) if m["role"] == "user")
+    assert any(m is messages[ultima_pergunta] for m in cortado)
+    assert cortado[-1] is messages[-1]
+
+
+def test_cabe_no_limite():
+    janela_ = janela(400)
+    cortado = janela_.ajustar(conversa(30))
+    assert sum(janela_.tokens(m) for m in cortado) <= 400
+
+
+@pytest.mark.parametrize("max_tokens", range(150, 400, 7))
+def test_nunca_deixa_tool_sem_o_assistant_que_a_pediu(max_tokens):
+    cortado = janela(max_tokens).ajustar(conversa(30))
+    pedidas = set()
+    for m in cortado:
+        pedidas.update(tc["id"] for tc in m.get("tool_calls") or [])
+        if m["role"] == "tool":
+            assert m["tool_call_id"] in pedidas
+
+
+def test_sumarizador_recebe_as_descartadas():
+    recebidas = []
+
+    def sumarizador(descartadas):
+        recebidas.extend(descartadas)
+        return "resumo"
+
+    messages = conversa(30)
+    cortado = janela(400, sumarizador=sumarizador).ajustar(messages)
+    assert cortado[2] == {"role": "system", "content": "resumo"}
+    mantidas = {id(m) for m in cortado}
+    assert recebidas and all(id(m) not in mantidas for m in recebidas)
+    assert {id(m) for m in recebidas} | mantidas | {id(cortado[2])} >= {id(m) for m in messages}
+
+
+def test_incremental_entre_rodadas_igual_ao_corte_do_zero():
+    messages = conversa(30)
+    janela_ = janela(400)
+    janela_.ajustar(messages)
+    for k in range(30, 35):
+        messages += rodada_de_tool(k)
+        assert janela_.ajustar(messages) == janela(400).ajustar(list(messages))
+
+
+def test_contagem_compartilhada_entre_turnos_pelo_digest():
+    tokenizer = TokenizerPalavras()
+    texto = "resultado de tool " * 2000
+    # Turnos diferentes recarregam o historico do banco: dicts novos, mesmo texto
+    for _ in range(3):
+        ContextWindow(10_000, tokenizer=tokenizer).tokens({"role": "tool", "content": texto})
+    assert tokenizer.textos.count(texto) == 1
+    # A chave guarda o digest, nao o texto
+    ((nome, digest),) = context_window._contagens.keys()
+    assert nome == "palavras" and isinstance(digest, bytes) and len(digest) == 16
+
+
+def test_contagem_por_tokenizer():
+    outro = TokenizerPalavras()
+    outro.nome = "outro"
+    for tokenizer in (TokenizerPalavras(), outro):
+        assert ContextWindow(100, tokenizer=tokenizer).tokens(msg("user", 3)) == TOKENS_POR_MENSAGEM + 3
+    assert len(context_window._contagens) == 2
+
+
+def test_cache_de_contagens_limitado(monkeypatch):
+    monkeypatch.setattr(context_window, "MAX_CONTAGENS", 10)
+    tokenizer = TokenizerPalavras()
+    janela_ = ContextWindow(100, tokenizer=tokenizer)
+    for i in range(25):
+        janela_.tokens({"role": "user", "content": f"mensagem {i}"})
+    assert len(context_window._contagens) == 10
+    # As mais antigas sairam (LRU): voltam a ser tokenizadas
+    ContextWindow(100, tokenizer=tokenizer).tokens({"role": "user", "content": "mensagem 0"})
+    assert tokenizer.textos.count("mensagem 0") == 2
@@ -0,0 +1,73 @@
+"""Classificacao de erros do ModelRouter: so erros do provedor fazem failover e abrem o circuito"""
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.config import get_settings
+from app.services.llm_service import LLMClientManager, ModelRouter, erro_transitorio
+
+pytestmark = pytest.mark.anyio
+settings = get_settings()
+
+
+def _erro(classe, status: int) -> openai.APIStatusError:
+    resposta = httpx.Response(status, request=httpx.Request("POST", "http://llm/v1/chat/completions"))
+    return classe(f"erro {status}", response=resposta, body=None)
+
+
+class ClienteFalso:
+    """Levanta o erro configurado para cada modelo; os demais respondem"""
+
+    def __init__(self, erros: dict):
+        self.erros = erros
+        self.chamadas: list[str] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, **kwargs):
+        self.chamadas.append(model)
+        if model in self.erros:
+            raise self.erros[model]
+        return SimpleNamespace(model=model)
+
+
+def router_com(erros: dict, modelos: list[str]) -> tuple[ModelRouter, ClienteFalso]:
+    cliente = ClienteFalso(erros)
+    manager = LLMClientManager()
+    manager.substituir(cliente)
+    return ModelRouter(modelos, client_manager=manager), cliente
+
+
+@pytest.mark.parametrize("erro, transitorio", [
+    (_erro(openai.BadRequestError, 400), False),
+    (_erro(openai.AuthenticationError, 401), False),
+    (_erro(openai.PermissionDeniedError, 403), False),
+    (_erro(openai.UnprocessableEntityError, 422), False),
+    (_erro(openai.RateLimitError, 429), True),
+    (_erro(openai.InternalServerError, 500), True),
+    (_erro(openai.APIStatusError, 503), True),
+    (openai.APITimeoutError(httpx.Request("POST", "http://llm")), True),
+    (openai.APIConnectionError(request=httpx.Request("POST", "http://llm")), True),
+])
+def test_erro_transitorio(erro, transitorio):
+    assert erro_transitorio(erro) is transitorio
+
+
+async def test_400_sobe_sem_failover_e_mantem_o_circuito_fechado():
+    router, cliente = router_com({"modelo/a": _erro(openai.BadRequestError, 400)}, ["modelo/a", "modelo/b"])
+    for _ in range(settings.LLM_CIRCUIT_FALHAS + 1):
+        with pytest.raises(openai.BadRequestError):
+            await router.completar(messages=[])
+    assert cliente.chamadas == ["modelo/a"] * (settings.LLM_CIRCUIT_FALHAS + 1)
+    estado = router.metricas()["modelos"]["modelo/a"]
+    assert estado["circuito"] == "fechado" and estado["falhas"] == 0
+    assert router.failovers == 0
+
+
+async def test_rate_limit_faz_failover_e_abre_o_circuito():
+    router, cliente = router_com({"modelo/a": _erro(openai.RateLimitError, 429)}, ["modelo/a", "modelo/b"])
+    for _ in range(settings.LLM_CIRCUIT_FALHAS + 1):
+        assert (await router.completar(messages=[])).model == "modelo/b"
+    assert cliente.chamadas.count("modelo/a") == settings.LLM_CIRCUIT_FALHAS
+    assert router.metricas()["modelos"]["modelo/a"]["circuito"] == "aberto"
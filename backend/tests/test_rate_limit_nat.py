@@ -0,0 +1,126 @@
+"""
+Troca de turno de uma plataforma inteira atras de um unico IP (NAT).
+
+Um app FastAPI com as dependencias reais de rate limit (limitar("llm") e
+limitar("leve")) recebe, do mesmo IP de cliente, a rajada de chat e de consultas
+leves de USUARIOS colaboradores autenticados (subs distintos). Relogio injetado:
+sem sleep, banco nem LLM.
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, Header
+
+from app.auth import get_current_user
+from app.config import get_settings
+from app.rate_limit import Balde, MemoryBucketStore, RateLimiter
+
+pytestmark = pytest.mark.anyio
+
+IP_PLATAFORMA = "10.0.0.1"
+USUARIOS = 200
+settings = get_settings()
+CHATS = int(settings.RATE_LIMIT_LLM_RAJADA)
+LEVES = int(settings.RATE_LIMIT_LEVE_RAJADA) // 2
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self) -> float:
+        return self.agora
+
+
+def montar_app(limiter: RateLimiter, por_ip: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/chat", dependencies=[Depends(limiter.dependencia("llm"))])
+    async def chat():
+        return {"ok": True}
+
+    @app.get("/leve", dependencies=[Depends(limiter.dependencia("leve"))])
+    async def leve():
+        return {"ok": True}
+
+    def usuario(x_sub: str = Header("")) -> dict:
+        # Sem sub (modo por_ip) o limiter cai no IP, como o slowapi fazia
+        return {"sub": "anonymous", "auth_disabled": True} if por_ip else {"sub": x_sub}
+
+    app.dependency_overrides[get_current_user] = usuario
+    return app
+
+
+def novo_limiter(relogio: Relogio, fator_ip: float) -> RateLimiter:
+    return RateLimiter(
+        [
+            Balde("llm", settings.RATE_LIMIT_LLM_RAJADA, settings.RATE_LIMIT_LLM_POR_MINUTO),
+            Balde("leve", settings.RATE_LIMIT_LEVE_RAJADA, settings.RATE_LIMIT_LEVE_POR_MINUTO),
+        ],
+        store=MemoryBucketStore(settings.RATE_LIMIT_MAX_CHAVES, relogio=relogio),
+        fator_ip=fator_ip,
+    )
+
+
+def cliente_para(app: FastAPI) -> httpx.AsyncClient:
+    transporte = httpx.ASGITransport(app=app, client=(IP_PLATAFORMA, 40000))
+    return httpx.AsyncClient(transport=transporte, base_url="http://plataforma")
+
+
+async def troca_de_turno(cliente: httpx.AsyncClient) -> list[int]:
+    """Cada colaborador manda CHATS mensagens e LEVES consultas, todos ao mesmo tempo"""
+    async def colaborador(i: int) -> list[int]:
+        headers = {"x-sub": f"colaborador-{i}"}
+        respostas = [await cliente.post("/chat", headers=headers) for _ in range(CHATS)]
+        respostas += [await cliente.get("/leve", headers=headers) for _ in range(LEVES)]
+        return [r.status_code for r in respostas]
+
+    return [c for lista in await asyncio.gather(*(colaborador(i) for i in range(USUARIOS))) for c in lista]
+
+
+@pytest.fixture
+def relogio() -> Relogio:
+    return Relogio()
+
+
+@pytest.fixture
+def limiter(relogio: Relogio) -> RateLimiter:
+    return novo_limiter(relogio, settings.RATE_LIMIT_FATOR_IP)
+
+
+async def test_chave_por_sub_nao_recusa_a_troca_de_turno(limiter):
+    async with cliente_para(montar_app(limiter, por_ip=False)) as cliente:
+        codigos = await troca_de_turno(cliente)
+    assert len(codigos) == USUARIOS * (CHATS + LEVES)
+    assert codigos.count(429) == 0
+
+
+async def test_chave_so_por_ip_barra_a_troca_de_turno():
+    # Comportamento anterior, sem o fator de folga: a tripulacao divide um balde
+    async with cliente_para(montar_app(novo_limiter(Relogio(), 1.0), por_ip=True)) as cliente:
+        codigos = await troca_de_turno(cliente)
+    assert codigos.count(429) > len(codigos) // 2
+
+
+async def test_abusivo_barrado_sem_afetar_vizinhos(limiter):
+    abusivo = {"x-sub": "colaborador-abusivo"}
+    async with cliente_para(montar_app(limiter, por_ip=False)) as cliente:
+        codigos = [(await cliente.post("/chat", headers=abusivo)).status_code for _ in range(CHATS * 4)]
+        barrada = await cliente.post("/chat", headers=abusivo)
+        vizinhos = [(await cliente.post("/chat", headers={"x-sub": f"colaborador-{i}"})).status_code for i in range(USUARIOS)]
+    assert codigos.count(200) == CHATS
+    assert barrada.status_code == 429
+    assert int(barrada.headers["retry-after"]) > 0
+    assert vizinhos.count(429) == 0
+
+
+async def test_balde_reposto_apos_retry_after(limiter, relogio):
+    abusivo = {"x-sub": "colaborador-abusivo"}
+    async with cliente_para(montar_app(limiter, por_ip=False)) as cliente:
+        for _ in range(CHATS):
+            assert (await cliente.post("/chat", headers=abusivo)).status_code == 200
+        barrada = await cliente.post("/chat", headers=abusivo)
+        assert barrada.status_code == 429
+        relogio.agora += int(barrada.headers["retry-after"])
+        assert (await cliente.post("/chat", headers=abusivo)).status_code == 200
@@ -0,0 +1,92 @@
+"""ResponseCache: so reaproveita respostas cujas tools reexecutadas dao o mesmo resultado"""
+import pytest
+
+from app.services import agent_service
+from app.services.agent_service import AgentService
+from app.services.cache_service import ResponseCache
+
+pytestmark = pytest.mark.anyio
+
+PERGUNTA = "Qual o cardápio de hoje?"
+CARDAPIO = ("get_cardapio_dia", {"data": "2026-10-18"}, '{"refeicoes": ["almoco"]}')
+
+
+class Executor:
+    """Reexecucao das tools no acerto: devolve resultados fixos e guarda as chamadas"""
+
+    def __init__(self, resultados: list[str]):
+        self.resultados = resultados
+        self.chamadas: list[list] = []
+
+    async def __call__(self, calls):
+        self.chamadas.append(calls)
+        return self.resultados
+
+
+@pytest.fixture
+def cache() -> ResponseCache:
+    return ResponseCache(ttl=3600)
+
+
+async def test_acerto_quando_os_resultados_sao_iguais(cache):
+    await cache.gravar(PERGUNTA, "c1", [CARDAPIO], "Arroz e feijao", llm_calls=2, tokens=900)
+    executor = Executor([CARDAPIO[2]])
+    # Normalizacao: acento, caixa, pontuacao e palavras vazias nao mudam a chave
+    assert await cache.buscar("oi, qual o cardapio de HOJE", "c2", executor) == "Arroz e feijao"
+    assert executor.chamadas == [[("get_cardapio_dia", {"data": "2026-10-18"})]]
+    assert cache.acertos == 1 and cache.llm_calls_evitadas == 2 and cache.tokens_evitados == 900
+
+
+async def test_resultado_divergente_invalida_a_entrada(cache):
+    await cache.gravar(PERGUNTA, "c1", [CARDAPIO], "Arroz e feijao", llm_calls=2, tokens=900)
+    assert await cache.buscar(PERGUNTA, "c1", Executor(['{"refeicoes": ["jantar"]}'])) is None
+    assert cache.divergentes == 1 and cache.erros == 1
+    # A entrada foi descartada: nem o resultado antigo volta a acertar
+    assert await cache.buscar(PERGUNTA, "c1", Executor([CARDAPIO[2]])) is None
+
+
+async def test_resultado_com_erro_nao_e_gravado(cache):
+    erro = ("get_cardapio_dia", {"data": "2026-10-18"}, '{"error": "Cardápio não cadastrado"}')
+    await cache.gravar(PERGUNTA, "c1", [erro], "Nao ha cardapio", llm_calls=2, tokens=900)
+    assert cache.gravacoes == 0
+    assert await cache.buscar(PERGUNTA, "c1", Executor([erro[2]])) is None
+
+
+async def test_turno_com_tool_mutavel_nao_e_gravado(cache, monkeypatch):
+    monkeypatch.setattr(agent_service, "resposta_cache", cache)
+    registro = ("log_refeicao", {"colaborador_id": "c1", "tipo_refeicao": "almoco"}, '{"success": true}')
+    await AgentService()._gravar_resposta_cache("c1", PERGUNTA, [CARDAPIO, registro], "Registrado", 2, 900)
+    assert cache.gravacoes == 0
+    await AgentService()._gravar_resposta_cache("c1", PERGUNTA, [CARDAPIO], "Arroz e feijao", 2, 900)
+    assert cache.gravacoes == 1
+
+
+async def test_resposta_pessoal_fica_no_escopo_do_colaborador(cache):
+    perfil = ("get_colaborador_profile", {"colaborador_id": "c1"}, '{"nome": "Ana"}')
+    await cache.gravar("Quais sao meus dados?", "c1", [perfil], "Voce e a Ana", llm_calls=2, tokens=500)
+    executor = Executor([perfil[2]])
+    assert await cache.buscar("Quais sao meus dados?", "c1", executor) == "Voce e a Ana"
+    # O ID gravado como $colaborador_id volta substituido pelo de quem pergunta
+    assert executor.chamadas == [[("get_colaborador_profile", {"colaborador_id": "c1"})]]
+    # Outro colaborador nao encontra a resposta pessoal (nem no escopo global)
+    outro = Executor([perfil[2]])
+    assert await cache.buscar("Quais sao meus dados?", "c2", outro) is None
+    assert outro.chamadas == []
+
+
+async def test_resposta_sem_dados_do_colaborador_e_global(cache):
+    await cache.gravar(PERGUNTA, "c1", [CARDAPIO], "Arroz e feijao", llm_calls=2, tokens=900)
+    assert await cache.buscar(PERGUNTA, "c2", Executor([CARDAPIO[2]])) == "Arroz e feijao"
+
+
+async def test_invalidar_colaborador_descarta_as_respostas_pessoais(cache):
+    perfil = ("get_colaborador_profile", {"colaborador_id": "c1"}, '{"nome": "Ana"}')
+    await cache.gravar("Quais sao meus dados?", "c1", [perfil], "Voce e a Ana", llm_calls=2, tokens=500)
+    await cache.gravar(PERGUNTA, "c1", [CARDAPIO], "Arroz e feijao", llm_calls=2, tokens=900)
+    cache.invalidar_colaborador("c1")
+    assert await cache.buscar("Quais sao meus dados?", "c1", Executor([perfil[2]])) is None
+    # As globais continuam valendo
+    assert await cache.buscar(PERGUNTA, "c1", Executor([CARDAPIO[2]])) == "Arroz e feijao"
+    # Depois da invalidacao, uma nova gravacao volta a acertar
+    await cache.gravar("Quais sao meus dados?", "c1", [perfil], "Voce e a Ana", llm_calls=2, tokens=500)
+    assert await cache.buscar("Quais sao meus dados?", "c1", Executor([perfil[2]])) == "Voce e a Ana"
@@ -0,0 +1,94 @@
+"""SnapshotCache/MemoryCacheBackend: TTL, LRU, copia por leitura e invalidacao do perfil"""
+import pytest
+
+from app.services import cache_service
+from app.services.cache_service import MemoryCacheBackend, SnapshotCache, invalidar_colaborador, perfil_cache, resposta_cache
+from app.services.tools_handler import ToolsHandler
+
+pytestmark = pytest.mark.anyio
+
+PERFIL = {"colaborador": {"id": "c1", "nome": "Ana"}, "preferencias": [{"tipo": "alergia", "item": "amendoim"}]}
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self) -> float:
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch) -> Relogio:
+    relogio = Relogio()
+    monkeypatch.setattr(cache_service.time, "monotonic", relogio)
+    return relogio
+
+
+@pytest.fixture
+async def perfil_limpo():
+    await perfil_cache.backend.clear()
+    yield perfil_cache
+    await perfil_cache.backend.clear()
+
+
+async def test_entrada_expira_no_ttl(relogio):
+    cache = SnapshotCache("teste", ttl=60)
+    await cache.set("c1", PERFIL)
+    relogio.agora += 59
+    assert await cache.get("c1") == PERFIL
+    relogio.agora += 1
+    assert await cache.get("c1") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache.backend) == 0
+
+
+async def test_ttl_por_entrada(relogio):
+    cache = SnapshotCache("teste", ttl=60)
+    await cache.set("curta", 1, ttl=5)
+    await cache.set("padrao", 2)
+    relogio.agora += 10
+    assert await cache.get("curta") is None
+    assert await cache.get("padrao") == 2
+
+
+async def test_lru_descarta_a_menos_usada(relogio):
+    cache = SnapshotCache("teste", ttl=60, backend=MemoryCacheBackend(max_entries=2))
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    assert await cache.get("a") == 1  # "a" passa a ser a mais recente
+    await cache.set("c", 3)
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1 and await cache.get("c") == 3
+    assert cache.metricas()["entradas"] == 2
+
+
+async def test_get_devolve_copia():
+    cache = SnapshotCache("teste", ttl=60)
+    original = {"colaborador": {"nome": "Ana"}, "preferencias": []}
+    await cache.set("c1", original)
+    original["colaborador"]["nome"] = "alterado depois do set"
+    lido = await cache.get("c1")
+    lido["colaborador"]["nome"] = "Bia"
+    lido["preferencias"].append({"item": "leite"})
+    assert await cache.get("c1") == {"colaborador": {"nome": "Ana"}, "preferencias": []}
+    assert await cache.get("c1") is not await cache.get("c1")
+
+
+async def test_tool_de_perfil_nao_expoe_o_snapshot(perfil_limpo):
+    await perfil_limpo.set("c1", PERFIL)
+    handler = ToolsHandler(db=object(), authorized_colaborador_id="c1")
+    perfil = await handler._get_colaborador_profile({"colaborador_id": "c1"})
+    perfil["preferencias"].clear()
+    perfil["colaborador"]["nome"] = "Outro"
+    assert await handler._get_colaborador_profile({"colaborador_id": "c1"}) == PERFIL
+
+
+async def test_invalidar_colaborador_descarta_o_perfil(perfil_limpo):
+    await perfil_limpo.set("c1", PERFIL)
+    await perfil_limpo.set("c2", PERFIL)
+    geracao = resposta_cache._geracao.get("c1", 0)
+    await invalidar_colaborador("c1")
+    assert await perfil_limpo.get("c1") is None
+    assert await perfil_limpo.get("c2") == PERFIL
+    assert resposta_cache._geracao["c1"] == geracao + 1
@@ -0,0 +1,32 @@
+"""SSEStream: agrupamento de deltas de texto por tamanho em bytes (UTF-8)"""
+import json
+
+import pytest
+
+from app.services.sse_service import SSEStream
+
+pytestmark = pytest.mark.anyio
+
+
+async def eventos(deltas: list[str]):
+    for delta in deltas:
+        yield {"type": "text", "content": delta}
+
+
+async def frames_de_texto(deltas: list[str], max_bytes: int) -> list[str]:
+    # flush_ms alto: so o limite de bytes (ou o fim do stream) fecha um frame
+    stream = SSEStream(eventos(deltas), flush_ms=60_000, max_bytes=max_bytes)
+    frames = [f async for f in stream.frames_sse()]
+    return [json.loads(f[6:])["content"] for f in frames if f.startswith("data: {")]
+
+
+async def test_agrupa_ate_o_limite_em_bytes():
+    textos = await frames_de_texto(["ab"] * 10, max_bytes=8)
+    assert textos == ["abababab", "abababab", "abab"]
+
+
+async def test_texto_acentuado_conta_bytes_e_nao_caracteres():
+    # "ção" tem 3 caracteres e 5 bytes em UTF-8
+    textos = await frames_de_texto(["ção"] * 6, max_bytes=10)
+    assert textos == ["çãoção", "çãoção", "çãoção"]
+    assert all(len(t.encode("utf-8")) <= 10 for t in textos)
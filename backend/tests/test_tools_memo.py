@@ -0,0 +1,59 @@
+"""MemoTurno: tools somente leitura repetidas no turno nao voltam ao banco"""
+import json
+
+import pytest
+
+from app.services.tools_handler import ToolsHandler
+
+pytestmark = pytest.mark.anyio
+
+CARDAPIO = ("get_cardapio_dia", {"data": "2026-10-18"})
+
+
+@pytest.fixture
+def handler() -> ToolsHandler:
+    """Handler com sessao fixa (sem banco) e tools trocadas por contadores"""
+    handler = ToolsHandler(db=object(), authorized_colaborador_id="c1")
+    handler.execucoes = []
+    handler.resposta_cardapio = {"refeicoes": ["almoco"]}
+
+    async def cardapio(params):
+        handler.execucoes.append("get_cardapio_dia")
+        return handler.resposta_cardapio
+
+    async def registrar(params):
+        handler.execucoes.append("log_refeicao")
+        return {"success": True}
+
+    handler._get_cardapio_dia = cardapio
+    handler._log_refeicao = registrar
+    return handler
+
+
+async def test_chamadas_iguais_usam_o_memo(handler):
+    primeira = await handler.handle_tool_call(*CARDAPIO)
+    # Mesmos argumentos em outra ordem de chaves: mesma entrada
+    segunda = await handler.handle_tool_call("get_cardapio_dia", dict(reversed(list(CARDAPIO[1].items()))))
+    assert primeira == segunda == json.dumps({"refeicoes": ["almoco"]})
+    assert handler.execucoes == ["get_cardapio_dia"]
+    assert (handler.memo.hits, handler.memo.misses) == (1, 1)
+    # Outros argumentos sao outra entrada
+    await handler.handle_tool_call("get_cardapio_dia", {"data": "2026-10-19"})
+    assert handler.execucoes == ["get_cardapio_dia"] * 2
+
+
+async def test_erro_nao_e_memorizado(handler):
+    handler.resposta_cardapio = {"error": "Cardápio não cadastrado"}
+    await handler.handle_tool_call(*CARDAPIO)
+    handler.resposta_cardapio = {"refeicoes": ["almoco"]}
+    assert json.loads(await handler.handle_tool_call(*CARDAPIO)) == {"refeicoes": ["almoco"]}
+    assert handler.execucoes == ["get_cardapio_dia"] * 2
+
+
+async def test_tool_mutavel_esvazia_o_memo_no_mesmo_turno(handler):
+    await handler.handle_tool_call(*CARDAPIO)
+    await handler.handle_tool_call("log_refeicao", {"colaborador_id": "c1", "tipo_refeicao": "almoco"})
+    await handler.handle_tool_call(*CARDAPIO)
+    assert handler.execucoes == ["get_cardapio_dia", "log_refeicao", "get_cardapio_dia"]
+    assert handler.memo.invalidacoes == 1
+
@@ -0,0 +1,94 @@
+"""handle_tool_calls: leituras em paralelo com sessoes proprias, gravacoes como barreira"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.services import tools_handler
+from app.services.tools_handler import ToolsHandler
+
+pytestmark = pytest.mark.anyio
+
+
+class Agenda:
+    """Registra inicio/fim de cada tool e a sessao em que ela rodou"""
+
+    def __init__(self):
+        self.eventos: list[tuple[str, str]] = []
+        self.sessoes: dict[str, object] = {}
+        self.em_andamento = 0
+        self.max_concorrentes = 0
+
+    async def executar(self, nome: str, db, atraso: float) -> dict:
+        self.sessoes[nome] = db
+        self.eventos.append(("inicio", nome))
+        self.em_andamento += 1
+        self.max_concorrentes = max(self.max_concorrentes, self.em_andamento)
+        await asyncio.sleep(atraso)
+        self.em_andamento -= 1
+        self.eventos.append(("fim", nome))
+        return {"tool": nome}
+
+
+@pytest.fixture
+def agenda(monkeypatch) -> Agenda:
+    agenda = Agenda()
+
+    @asynccontextmanager
+    async def sessao_falsa():
+        yield object()
+
+    async def leitura(self, params):
+        # Atrasos decrescentes: a ultima termina primeiro, a ordem dos resultados nao pode mudar
+        return await agenda.executar(params["nome"], self.db, params["atraso"])
+
+    async def gravacao(self, params):
+        return await agenda.executar(params["nome"], self.db, 0.01)
+
+    monkeypatch.setattr(tools_handler, "async_session", sessao_falsa)
+    monkeypatch.setattr(ToolsHandler, "_get_cardapio_dia", leitura)
+    monkeypatch.setattr(ToolsHandler, "_log_refeicao", gravacao)
+    return agenda
+
+
+def leitura(nome: str, atraso: float) -> tuple[str, dict]:
+    return "get_cardapio_dia", {"nome": nome, "atraso": atraso}
+
+
+async def test_leituras_concorrentes_mantem_a_ordem(agenda):
+    calls = [leitura("l1", 0.03), leitura("l2", 0.02), leitura("l3", 0.01)]
+    resultados = await ToolsHandler().handle_tool_calls(calls)
+    assert resultados == ['{"tool": "l1"}', '{"tool": "l2"}', '{"tool": "l3"}']
+    assert agenda.max_concorrentes == 3
+    assert [n for tipo, n in agenda.eventos if tipo == "fim"] == ["l3", "l2", "l1"]
+
+
+async def test_gravacao_e_barreira_entre_lotes(agenda):
+    calls = [
+        leitura("l1", 0.02), leitura("l2", 0.01),
+        ("log_refeicao", {"nome": "g"}),
+        leitura("l3", 0.02), leitura("l4", 0.01),
+    ]
+    resultados = await ToolsHandler().handle_tool_calls(calls)
+    assert [r.split('"')[3] for r in resultados] == ["l1", "l2", "g", "l3", "l4"]
+    ordem = agenda.eventos
+    inicio_g, fim_g = ordem.index(("inicio", "g")), ordem.index(("fim", "g"))
+    # Tudo antes da gravacao terminou antes dela; nada depois comecou antes do fim dela
+    assert fim_g == inicio_g + 1
+    assert {("fim", "l1"), ("fim", "l2")} <= set(ordem[:inicio_g])
+    assert {("inicio", "l3"), ("inicio", "l4")} <= set(ordem[fim_g:])
+    assert agenda.max_concorrentes == 2
+
+
+async def test_cada_leitura_usa_sessao_propria(agenda):
+    calls = [leitura("l1", 0.01), leitura("l2", 0.01), leitura("l3", 0.01)]
+    await ToolsHandler().handle_tool_calls(calls)
+    sessoes = [agenda.sessoes[n] for n in ("l1", "l2", "l3")]
+    assert len({id(s) for s in sessoes}) == 3
+
+
+async def test_gravacao_usa_a_sessao_principal(agenda):
+    principal = object()
+    await ToolsHandler(db=principal).handle_tool_calls([leitura("l1", 0.01), leitura("l2", 0.01), ("log_refeicao", {"nome": "g"})])
+    assert agenda.sessoes["g"] is principal
+    assert agenda.sessoes["l1"] is not principal and agenda.sessoes["l1"] is not agenda.sessoes["l2"]
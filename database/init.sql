@@ -1,5 +1,7 @@
 -- NutriOffshore AI - Database Schema
--- Alinhado com os models SQLAlchemy
+-- Alinhado com os models SQLAlchemy. O schema e versionado pelo Alembic
+-- (backend/alembic): este arquivo equivale a head e registra a revisao em
+-- alembic_version. Toda revisao nova tambem atualiza este arquivo.
 
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
@@ -16,6 +18,7 @@ CREATE TABLE IF NOT EXISTS colaboradores (
     turno_atual VARCHAR(10) DEFAULT 'diurno',
     regime_embarque VARCHAR(10) DEFAULT '14x14',
     meta_principal VARCHAR(30) DEFAULT 'saude_geral',
+    senha_hash VARCHAR,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -88,10 +91,33 @@ CREATE TABLE IF NOT EXISTS cardapios (
     data DATE NOT NULL,
     refeicao VARCHAR(20) NOT NULL,
     itens JSONB NOT NULL,
+    kcal_total FLOAT,
+    proteina_total_g FLOAT,
+    carb_total_g FLOAT,
+    gordura_total_g FLOAT,
+    indexado_em TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT uq_cardapio UNIQUE(plataforma_id, data, refeicao)
 );
 
+-- Itens do cardapio com nutricao por porcao normalizada (indice de cardapios.itens)
+CREATE TABLE IF NOT EXISTS cardapio_itens (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    cardapio_id UUID NOT NULL REFERENCES cardapios(id) ON DELETE CASCADE,
+    plataforma_id UUID NOT NULL,
+    data DATE NOT NULL,
+    refeicao VARCHAR(20) NOT NULL,
+    posicao INTEGER NOT NULL,
+    item VARCHAR(200) NOT NULL,
+    categoria VARCHAR(50),
+    kcal FLOAT NOT NULL,
+    proteina_g FLOAT NOT NULL,
+    carb_g FLOAT NOT NULL,
+    gordura_g FLOAT NOT NULL,
+    indice_glicemico VARCHAR(10),
+    estimado BOOLEAN NOT NULL DEFAULT FALSE
+);
+
 -- Refeicoes Log (meal logs)
 CREATE TABLE IF NOT EXISTS refeicoes_log (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -110,6 +136,35 @@ CREATE TABLE IF NOT EXISTS refeicoes_log (
     CONSTRAINT check_aderencia CHECK (aderencia_percentual BETWEEN 0 AND 100)
 );
 
+-- Consumo Diario (totais do dia por colaborador, mantidos a cada refeicao registrada)
+CREATE TABLE IF NOT EXISTS consumo_diario (
+    colaborador_id UUID NOT NULL REFERENCES colaboradores(id) ON DELETE CASCADE,
+    data DATE NOT NULL,
+    calorias INTEGER NOT NULL DEFAULT 0,
+    proteina_g INTEGER NOT NULL DEFAULT 0,
+    carboidratos_g INTEGER NOT NULL DEFAULT 0,
+    gorduras_g INTEGER NOT NULL DEFAULT 0,
+    refeicoes INTEGER NOT NULL DEFAULT 0,
+    aderencia_soma INTEGER NOT NULL DEFAULT 0,
+    aderencia_registros INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (colaborador_id, data)
+);
+
+-- Ledger de tokens do LLM (colaborador x dia x modelo x rodada de tools)
+CREATE TABLE IF NOT EXISTS uso_tokens (
+    colaborador_id UUID NOT NULL REFERENCES colaboradores(id) ON DELETE CASCADE,
+    data DATE NOT NULL,
+    modelo VARCHAR(100) NOT NULL,
+    rodada INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    chamadas INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (colaborador_id, data, modelo, rodada)
+);
+
 -- Alertas Medicos (medical alerts)
 CREATE TABLE IF NOT EXISTS alertas_medicos (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -128,22 +183,43 @@ CREATE TABLE IF NOT EXISTS conversas_agente (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     colaborador_id UUID NOT NULL REFERENCES colaboradores(id) ON DELETE CASCADE,
     messages JSONB NOT NULL DEFAULT '[]'::jsonb,
+    total_mensagens INTEGER NOT NULL DEFAULT 0,
     tokens_utilizados INTEGER DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Indexes
-CREATE INDEX IF NOT EXISTS idx_medicoes_colaborador ON medicoes(colaborador_id);
+-- Mensagens das Conversas (append-only, uma linha por mensagem)
+CREATE TABLE IF NOT EXISTS mensagens_conversa (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    conversa_id UUID NOT NULL REFERENCES conversas_agente(id) ON DELETE CASCADE,
+    ordem INTEGER NOT NULL,
+    role VARCHAR(20) NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_mensagem_conversa_ordem UNIQUE(conversa_id, ordem)
+);
+
+-- Indexes (no formato das consultas; mantidos pelo Alembic, backend/alembic/versions)
+CREATE INDEX IF NOT EXISTS idx_medicoes_colaborador_data ON medicoes(colaborador_id, data_medicao);
 CREATE INDEX IF NOT EXISTS idx_medicoes_data ON medicoes(data_medicao);
 CREATE INDEX IF NOT EXISTS idx_condicoes_colaborador ON condicoes_saude(colaborador_id);
 CREATE INDEX IF NOT EXISTS idx_preferencias_colaborador ON preferencias_alimentares(colaborador_id);
 CREATE INDEX IF NOT EXISTS idx_planos_colaborador ON planos_nutricionais(colaborador_id);
-CREATE INDEX IF NOT EXISTS idx_planos_ativo ON planos_nutricionais(ativo);
+CREATE INDEX IF NOT EXISTS idx_planos_colaborador_ativo ON planos_nutricionais(colaborador_id) WHERE ativo;
 CREATE INDEX IF NOT EXISTS idx_cardapios_data ON cardapios(data);
-CREATE INDEX IF NOT EXISTS idx_cardapios_plataforma ON cardapios(plataforma_id);
-CREATE INDEX IF NOT EXISTS idx_refeicoes_colaborador ON refeicoes_log(colaborador_id);
+CREATE INDEX IF NOT EXISTS idx_cardapio_itens_plataforma_data ON cardapio_itens(plataforma_id, data, refeicao);
+CREATE INDEX IF NOT EXISTS idx_cardapio_itens_cardapio ON cardapio_itens(cardapio_id);
+CREATE INDEX IF NOT EXISTS idx_refeicoes_colaborador_data ON refeicoes_log(colaborador_id, data, created_at);
 CREATE INDEX IF NOT EXISTS idx_refeicoes_data ON refeicoes_log(data);
-CREATE INDEX IF NOT EXISTS idx_alertas_colaborador ON alertas_medicos(colaborador_id);
-CREATE INDEX IF NOT EXISTS idx_alertas_status ON alertas_medicos(status);
-CREATE INDEX IF NOT EXISTS idx_conversas_colaborador ON conversas_agente(colaborador_id);
+CREATE INDEX IF NOT EXISTS idx_alertas_abertos ON alertas_medicos(created_at) WHERE status = 'aberto';
+CREATE INDEX IF NOT EXISTS idx_alertas_status_created ON alertas_medicos(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_alertas_colaborador_created ON alertas_medicos(colaborador_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_conversas_colab_updated ON conversas_agente(colaborador_id, updated_at);
+
+-- Revisao do Alembic equivalente a este schema (conferida no startup da API)
+CREATE TABLE IF NOT EXISTS alembic_version (
+    version_num VARCHAR(32) NOT NULL,
+    CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
+);
+INSERT INTO alembic_version (version_num) SELECT '0009' WHERE NOT EXISTS (SELECT 1 FROM alembic_version);
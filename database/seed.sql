@@ -179,6 +179,13 @@ INSERT INTO refeicoes_log (colaborador_id, plano_id, data, refeicao, itens_consu
     '[{"alimento": "Arroz branco", "quantidade": "200g", "calorias_estimadas": 260}, {"alimento": "Bife acebolado", "quantidade": "180g", "calorias_estimadas": 280}, {"alimento": "Feijão", "quantidade": "120g", "calorias_estimadas": 120}, {"alimento": "Batata frita", "quantidade": "100g", "calorias_estimadas": 270}]'::jsonb,
     930, 35, 80, 35, 55);
 
+-- Agregado diario das refeicoes acima (a API mantem consumo_diario a cada registro)
+INSERT INTO consumo_diario (colaborador_id, data, calorias, proteina_g, carboidratos_g, gorduras_g, refeicoes, aderencia_soma, aderencia_registros)
+SELECT colaborador_id, data, COALESCE(SUM(calorias_estimadas), 0), COALESCE(SUM(proteina_g), 0), COALESCE(SUM(carboidratos_g), 0),
+       COALESCE(SUM(gorduras_g), 0), COUNT(*), COALESCE(SUM(aderencia_percentual), 0), COUNT(aderencia_percentual)
+FROM refeicoes_log
+GROUP BY colaborador_id, data;
+
 -- =============================================
 -- ALERTAS demo
 -- =============================================
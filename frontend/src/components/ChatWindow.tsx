@@ -34,6 +34,10 @@ export default function ChatWindow() {
         if (chunk.type === "text") {
           fullContent += chunk.content;
           updateLastAssistantMessage(fullContent);
+        } else if (chunk.type === "fila" && !fullContent) {
+          updateLastAssistantMessage(
+            `Aguardando na fila (posicao ${chunk.posicao}, cerca de ${chunk.espera_estimada_s} s)...`
+          );
         } else if (chunk.type === "done" && chunk.conversa_id) {
           setConversaId(chunk.conversa_id);
         } else if (chunk.type === "error") {
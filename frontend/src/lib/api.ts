@@ -12,8 +12,10 @@ import type {
   ConversaDetail,
   CardapioDia,
   CardapioSemana,
+  SugestaoCardapio,
   Refeicao,
   ResumoDiario,
+  ConsumoPeriodo,
   AlertaMedico,
 } from "./types";
 
@@ -118,6 +120,9 @@ export const api = {
   cardapioSemana: (): Promise<CardapioSemana> =>
     fetchAPI<CardapioSemana>("/api/v1/cardapios/semana"),
 
+  sugestaoCardapio: (data: string, colaboradorId: string): Promise<SugestaoCardapio> =>
+    fetchAPI<SugestaoCardapio>(`/api/v1/cardapios/dia/${data}/sugestao/${colaboradorId}`),
+
   // Refeicoes
   refeicoesdia: (colaboradorId: string, data: string): Promise<Refeicao[]> =>
     fetchAPI<Refeicao[]>(`/api/v1/refeicoes/colaborador/${colaboradorId}/dia/${data}`),
@@ -128,6 +133,11 @@ export const api = {
   resumoSemanal: (colaboradorId: string): Promise<ResumoDiario[]> =>
     fetchAPI<ResumoDiario[]>(`/api/v1/refeicoes/colaborador/${colaboradorId}/resumo-semanal`),
 
+  consumoPeriodo: (colaboradorId: string, inicio: string, fim?: string): Promise<ConsumoPeriodo> =>
+    fetchAPI<ConsumoPeriodo>(
+      `/api/v1/refeicoes/colaborador/${colaboradorId}/consumo?inicio=${inicio}${fim ? `&fim=${fim}` : ""}`
+    ),
+
   // Chat
   enviarMensagem: (
     colaboradorId: string,
@@ -150,8 +160,11 @@ export const api = {
   historicoConversas: (colaboradorId: string): Promise<Conversa[]> =>
     fetchAPI<Conversa[]>(`/api/v1/chat/historico/${colaboradorId}`),
 
-  buscarConversa: (conversaId: string): Promise<ConversaDetail> =>
-    fetchAPI<ConversaDetail>(`/api/v1/chat/conversa/${conversaId}`),
+  // Sem antesDe: historico inteiro. Com antesDe (proximo_cursor da pagina anterior): pagina de ate `limit` mensagens
+  buscarConversa: (conversaId: string, antesDe?: number, limit = 50): Promise<ConversaDetail> =>
+    fetchAPI<ConversaDetail>(
+      `/api/v1/chat/conversa/${conversaId}` + (antesDe !== undefined ? `?antes_de=${antesDe}&limit=${limit}` : "")
+    ),
 
   // Chat Streaming (120s timeout, AbortController signal passed through)
   enviarMensagemStream: async function* (
@@ -174,6 +187,19 @@ export const api = {
         signal: controller.signal,
       });
 
+      // Fila do agente cheia: o servidor recusa na hora com Retry-After
+      if (res.status === 429) {
+        const retryAfter = Number(res.headers.get("Retry-After")) || undefined;
+        yield {
+          type: "error",
+          content: retryAfter
+            ? `Muitas conversas em andamento. Tente novamente em ${retryAfter} s.`
+            : "Muitas conversas em andamento. Tente novamente em instantes.",
+          retry_after: retryAfter,
+        };
+        return;
+      }
+
       const reader = res.body?.getReader();
       const decoder = new TextDecoder();
       if (!reader) return;
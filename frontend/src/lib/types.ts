@@ -103,10 +103,13 @@ export interface ChatResponse {
 }
 
 export interface ChatStreamChunk {
-  type: "text" | "error" | "tool_call" | "done";
+  type: "text" | "error" | "tool_call" | "done" | "fila";
   content?: string;
   tool?: string;
   conversa_id?: string;
+  posicao?: number;
+  espera_estimada_s?: number;
+  retry_after?: number;
 }
 
 export interface Conversa {
@@ -121,6 +124,8 @@ export interface ConversaDetail {
   id: string;
   colaborador_id: string;
   messages: ChatMessage[];
+  total_mensagens?: number;
+  proximo_cursor?: number | null;
   tokens: number;
   created_at: string;
 }
@@ -135,6 +140,21 @@ export interface ResumoDiario {
   aderencia_media: number | null;
 }
 
+export interface ConsumoPeriodo {
+  colaborador_id: string;
+  inicio: string;
+  fim: string;
+  dias_registrados: number;
+  total_calorias: number;
+  total_proteina_g: number;
+  total_carboidratos_g: number;
+  total_gorduras_g: number;
+  refeicoes_registradas: number;
+  media_calorias_dia: number | null;
+  aderencia_media: number | null;
+  dias: ResumoDiario[];
+}
+
 export interface ItemCardapio {
   item: string;
   categoria: string;
@@ -143,16 +163,61 @@ export interface ItemCardapio {
   carb_g: number | null;
   gordura_g: number | null;
   indice_glicemico: string | null;
+  estimado?: boolean;
+}
+
+export interface TotaisRefeicao {
+  itens: number;
+  kcal: number;
+  proteina_g: number;
+  carb_g: number;
+  gordura_g: number;
+}
+
+export interface CardapioRefeicao {
+  id: string;
+  itens: ItemCardapio[];
+  totais: TotaisRefeicao;
 }
 
 export interface CardapioDia {
   data: string;
-  itens: ItemCardapio[];
+  refeicoes: Record<string, CardapioRefeicao>;
+}
+
+export interface ItemSugerido {
+  item: string;
+  categoria: string | null;
+  porcoes: number;
+  kcal: number;
+  proteina_g: number;
+  carb_g: number;
+  gordura_g: number;
+}
+
+export interface SugestaoRefeicao {
+  meta: Omit<TotaisRefeicao, "itens">;
+  itens: ItemSugerido[];
+  totais: Omit<TotaisRefeicao, "itens">;
+  desvio_kcal_pct: number | null;
+}
+
+export interface SugestaoCardapio {
+  colaborador_id: string;
+  data: string;
+  plano_id: string | null;
+  refeicoes: Record<string, SugestaoRefeicao>;
+  totais_dia: Omit<TotaisRefeicao, "itens">;
+  meta_refeicoes_servidas_kcal: number;
+  meta_calorica_dia: number;
+  excluidos: { refeicao: string; item: string; motivo: string }[];
 }
 
 export interface CardapioSemana {
-  semana: string;
-  dias: CardapioDia[];
+  inicio: string;
+  fim: string;
+  cardapios: Record<string, Record<string, ItemCardapio[]>>;
+  totais: Record<string, Record<string, TotaisRefeicao>>;
 }
 
 export interface Refeicao {